@@ -0,0 +1,143 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from typing import List
+
+from quom import Quom, Stats
+
+from .generator import Project, ProjectConfig, generate_project
+from .memory import create_memory_benchmarks, print_memory_result
+from .parse import create_parse_benchmarks, print_parse_results
+from .speed import create_benchmarks
+from .startup import create_startup_benchmarks
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              check=True, universal_newlines=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results: dict, baseline: dict):
+    print('\n{:<28} {:>12} {:>12} {:>8}'.format('benchmark', 'baseline', 'current', 'ratio'))
+    for name, result in results['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            continue
+        old = baseline['benchmarks'][name]['median']
+        new = result['median']
+        print('{:<28} {:>11.4f}s {:>11.4f}s {:>8.2f}'.format(name, old, new, new / old if old else float('nan')))
+
+
+def input_project(main_path: Path, include_directories: List[Path], source_directories: List[Path]) -> Project:
+    # Finds all files of a user supplied project by amalgamating it once.
+    stats = Stats()
+    source_directories = [path.resolve() for path in source_directories]
+    Quom(main_path, StringIO(), include_directories=include_directories,
+         source_directories=source_directories or None, hooks=stats)
+    return Project(main_path.parent, main_path, include_directories, source_directories,
+                   [file.file_path for file in stats.files])
+
+
+def main(args: List[str]):
+    parser = argparse.ArgumentParser(prog='benchmarks', description='Benchmarks of the tokenizer and Quom.')
+    parser.add_argument('--output', '-o', type=Path, default=None,
+                        help='File path of the JSON results. Default: benchmark_results.json or '
+                             '<mode>_results.json')
+    parser.add_argument('--compare', '-c', type=Path, default=None,
+                        help='JSON results of a previous run to compare with.')
+    parser.add_argument('--filter', '-k', type=str, default='',
+                        help='Only run benchmarks containing this text.')
+    parser.add_argument('--repeat', '-r', type=int, default=5, help='Runs per benchmark. Default: %(default)s')
+    parser.add_argument('--memory', '-m', action='store_true',
+                        help='Measure the memory usage instead of the time.')
+    parser.add_argument('--startup', action='store_true',
+                        help='Measure the startup and import time of the command line tool with -X importtime.')
+    parser.add_argument('--parse', action='store_true',
+                        help='Measure the output size and the compiler (CXX or c++) parse time of every minify level.')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Number of reported allocation sites in memory mode. Default: %(default)s')
+    parser.add_argument('--input', type=Path, default=None,
+                        help='Main file of a project to use instead of the generated ones.')
+    parser.add_argument('--include_directory', '-I', type=Path, action='append', default=[],
+                        help='Include directories of the input project.')
+    parser.add_argument('--source_directory', '-S', type=Path, action='append', default=[],
+                        help='Source directories of the input project.')
+    parser.add_argument('--header_count', type=int, default=40, help='Default: %(default)s')
+    parser.add_argument('--fan_out', type=int, default=3, help='Default: %(default)s')
+    parser.add_argument('--depth', type=int, default=4, help='Default: %(default)s')
+    parser.add_argument('--file_size', type=int, default=4000, help='Default: %(default)s')
+    parser.add_argument('--comment_density', type=float, default=0.2, help='Default: %(default)s')
+    parser.add_argument('--raw_string_density', type=float, default=0.02, help='Default: %(default)s')
+    parser.add_argument('--macro_density', type=float, default=0.05, help='Default: %(default)s')
+    parser.add_argument('--splice_frequency', type=float, default=0.01, help='Default: %(default)s')
+    parser.add_argument('--seed', type=int, default=0, help='Default: %(default)s')
+    args = parser.parse_args(args)
+
+    config = ProjectConfig(args.header_count, args.fan_out, args.depth, args.file_size, args.comment_density,
+                           args.raw_string_density, args.macro_density, args.splice_frequency, seed=args.seed)
+
+    results = {'revision': git_revision(), 'python': platform.python_version(), 'platform': platform.platform(),
+               'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'mode': 'memory' if args.memory else 'startup' if args.startup else 'parse' if args.parse else 'speed',
+               'config': vars(config) if not args.input else {'input': str(args.input)}, 'benchmarks': {}}
+
+    with tempfile.TemporaryDirectory() as root:
+        if args.startup:
+            # Startup benchmarks do not need a project.
+            projects = {}
+        elif args.input:
+            projects = {'input': input_project(args.input, args.include_directory, args.source_directory)}
+        else:
+            projects = {'flat': generate_project(Path(root) / 'flat', config),
+                        'directories': generate_project(Path(root) / 'directories', config, use_directories=True)}
+
+        if args.memory:
+            benchmarks = create_memory_benchmarks(projects)
+        elif args.startup:
+            benchmarks = create_startup_benchmarks()
+        elif args.parse:
+            benchmarks = create_parse_benchmarks(projects, Path(root))
+        else:
+            benchmarks = create_benchmarks(projects, config if not args.input else None)
+
+        for benchmark in benchmarks:
+            if args.filter not in benchmark.name:
+                continue
+            if args.memory:
+                result = benchmark.run(args.top)
+                print_memory_result(benchmark.name, result)
+            elif args.parse:
+                result = benchmark.run(args.repeat)
+            elif args.startup:
+                result = benchmark.run(args.repeat)
+                print('{:<28} {:>9.4f}s (min {:.4f}s, {:>8.1f} ms importing quom)'.format(
+                    benchmark.name, result['median'], result['min'], result['import_time'] / 1000))
+            else:
+                result = benchmark.run(args.repeat)
+                print('{:<28} {:>9.4f}s (min {:.4f}s, {:>12.0f} chars/s)'.format(
+                    benchmark.name, result['median'], result['min'], result['size_per_second'] or 0))
+            results['benchmarks'][benchmark.name] = result
+
+        if args.parse:
+            print_parse_results(results['benchmarks'])
+
+    output = args.output or Path('{}_results.json'.format(results['mode']) if results['mode'] != 'speed' else
+                                 'benchmark_results.json')
+    with output.open('w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+
+    if args.compare and not args.memory:
+        with args.compare.open(encoding='utf-8') as file:
+            compare(results, json.load(file))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,174 @@
+import random
+from pathlib import Path
+from typing import List, Union
+
+
+class ProjectConfig:
+    def __init__(self, header_count: int = 40, fan_out: int = 3, depth: int = 4, file_size: int = 4000,
+                 comment_density: float = 0.2, raw_string_density: float = 0.02, macro_density: float = 0.05,
+                 splice_frequency: float = 0.01, source_ratio: float = 0.5, seed: int = 0):
+        self.header_count = header_count
+        # Number of headers included by every header and the number of include levels below the main header.
+        self.fan_out = fan_out
+        self.depth = depth
+        # Approximate number of characters of every file.
+        self.file_size = file_size
+        # Probabilities of a block being a comment, raw string or macro.
+        self.comment_density = comment_density
+        self.raw_string_density = raw_string_density
+        self.macro_density = macro_density
+        # Probability of a line splice after a code token.
+        self.splice_frequency = splice_frequency
+        # Fraction of headers with a source file.
+        self.source_ratio = source_ratio
+        self.seed = seed
+
+
+class Project:
+    def __init__(self, root: Path, main_path: Path, include_directories: List[Path], source_directories: List[Path],
+                 files: List[Path]):
+        self.root = root
+        self.main_path = main_path
+        self.include_directories = include_directories
+        self.source_directories = source_directories
+        self.files = files
+
+    @property
+    def size(self) -> int:
+        return sum(file.stat().st_size for file in self.files)
+
+
+class ContentGenerator:
+    def __init__(self, config: ProjectConfig, rng: random.Random):
+        self.config = config
+        self.rng = rng
+        self.counter = 0
+
+    def name(self, prefix: str) -> str:
+        self.counter += 1
+        return '{}_{}'.format(prefix, self.counter)
+
+    def code_line(self) -> str:
+        rng = self.rng
+        tokens = rng.choice([
+            ['int', self.name('value'), '=', str(rng.randrange(1_000_000)), ';'],
+            ['double', self.name('ratio'), '=',
+             '{}.{}e-{}'.format(rng.randrange(100), rng.randrange(1000), rng.randrange(10)), ';'],
+            ['const', 'char*', self.name('text'), '=', '"lorem \\"ipsum\\" {}"'.format(rng.randrange(100)), ';'],
+            ['char', self.name('letter'), '=', "'\\n'", ';'],
+            ['unsigned', 'long', self.name('mask'), '=', "0xFF'FF'{:02X}u".format(rng.randrange(256)), ';'],
+            ['int', self.name('function') + '(int', 'a,', 'int', 'b)', '{', 'return', 'a', '*', 'b', '+',
+             str(rng.randrange(100)) + ';', '}'],
+        ])
+        # Splice lines only between tokens of the same line.
+        line = tokens[0]
+        for token in tokens[1:]:
+            line += ' \\\n' if rng.random() < self.config.splice_frequency else ' '
+            line += token
+        return line + '\n'
+
+    def comment(self) -> str:
+        words = ' '.join(self.rng.choice(['the', 'quick', 'brown', 'fox', "doesn't", 'jump', '"over"', '42'])
+                         for _ in range(self.rng.randrange(4, 16)))
+        if self.rng.random() < 0.5:
+            return '// {}\n'.format(words)
+        return '/*\n * {}\n * {}\n */\n'.format(words, words[::-1])
+
+    def raw_string(self) -> str:
+        body = '\n'.join('line "{}" \\ ) {}'.format(i, self.name('raw')) for i in range(self.rng.randrange(1, 6)))
+        return 'const char* {} = R"delim({})delim";\n'.format(self.name('raw_string'), body)
+
+    def macro(self) -> str:
+        name = self.name('MACRO').upper()
+        if self.rng.random() < 0.5:
+            return '#define {} {}\n'.format(name, self.rng.randrange(1000))
+        return '#define {}(a, b) \\\n    do {{ \\\n        (a) += (b); \\\n    }} while (0)\n'.format(name)
+
+    def block(self) -> str:
+        config = self.config
+        value = self.rng.random()
+        if value < config.comment_density:
+            return self.comment()
+        value -= config.comment_density
+        if value < config.raw_string_density:
+            return self.raw_string()
+        value -= config.raw_string_density
+        if value < config.macro_density:
+            return self.macro()
+        return self.code_line()
+
+    def content(self) -> str:
+        blocks = []
+        size = 0
+        while size < self.config.file_size:
+            block = self.block()
+            if self.rng.random() < 0.1:
+                block += '\n'
+            blocks.append(block)
+            size += len(block)
+        return ''.join(blocks)
+
+
+def write_file(path: Path, content: str, files: List[Path]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding='utf-8')
+    files.append(path)
+
+
+def generate_project(root: Union[Path, str], config: ProjectConfig = None, use_directories: bool = False) -> Project:
+    # Generates a library of headers included level by level from the main header. With directories, the headers
+    # are placed in include/lib/ and the sources in src/, which needs -I include and -S src.
+    config = config or ProjectConfig()
+    root = Path(root)
+    rng = random.Random(config.seed)
+    generator = ContentGenerator(config, rng)
+
+    if use_directories:
+        header_directory = root / 'include' / 'lib'
+        source_directory = root / 'src'
+        include_prefix = 'lib/'
+        include_directories = [root / 'include']
+        source_directories = [source_directory]
+    else:
+        header_directory = source_directory = root
+        include_prefix = ''
+        include_directories = []
+        source_directories = []
+
+    # Distribute the headers on the levels, every level includes headers of the next one.
+    depth = max(1, min(config.depth, config.header_count))
+    levels = []
+    for level in range(depth):
+        count = config.header_count * (level + 1) // depth - config.header_count * level // depth
+        levels.append(['header_{}_{}'.format(level, i) for i in range(count)])
+
+    includes = {}
+    for level, headers in enumerate(levels):
+        children = levels[level + 1] if level + 1 < depth else []
+        for header in headers:
+            includes[header] = []
+        # Every child is included at least once, the remaining includes are chosen at random.
+        for i, child in enumerate(children):
+            includes[headers[i % len(headers)]].append(child)
+        for header in headers:
+            candidates = [child for child in children if child not in includes[header]]
+            count = max(0, min(config.fan_out - len(includes[header]), len(candidates)))
+            includes[header].extend(rng.sample(candidates, count))
+
+    files = []
+    for header, children in includes.items():
+        content = '#pragma once\n\n#include <cstddef>\n'
+        content += ''.join('#include "{}{}.hpp"\n'.format(include_prefix, child) for child in children)
+        content += '\n' + generator.content()
+        write_file(header_directory / (header + '.hpp'), content, files)
+
+        if rng.random() < config.source_ratio:
+            content = '#include "{}{}.hpp"\n\n#include <vector>\n\n'.format(include_prefix, header)
+            write_file(source_directory / (header + '.cpp'), content + generator.content(), files)
+
+    main_path = header_directory / 'main.hpp'
+    content = '#pragma once\n\n'
+    content += ''.join('#include "{}{}.hpp"\n'.format(include_prefix, header) for header in levels[0])
+    write_file(main_path, content, files)
+
+    return Project(root, main_path, include_directories, source_directories, files)
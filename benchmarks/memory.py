@@ -0,0 +1,155 @@
+import gc
+import linecache
+import os
+import threading
+import tracemalloc
+from collections import Counter
+from io import StringIO
+from pathlib import Path
+from typing import Callable, Dict, List, Union
+
+from quom import Quom, QuomHooks
+from quom.tokenizer import tokenize, Token
+from quom.tokenizer.iterator import Iterable, RawIterator, Span
+
+from .generator import Project
+
+# Objects of the tokenizer which are counted while alive.
+TOKENIZER_TYPES = (Token, RawIterator, Iterable, Span)
+
+
+def rss() -> int:
+    # Current resident set size in bytes or 0 if unknown.
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, interval: float = 0.002):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = rss()
+        self.__stopped = threading.Event()
+
+    def run(self):
+        while not self.__stopped.wait(self.interval):
+            self.peak = max(self.peak, rss())
+
+    def stop(self) -> int:
+        self.__stopped.set()
+        self.join()
+        self.peak = max(self.peak, rss())
+        return self.peak
+
+
+class Probe(QuomHooks):
+    # Takes a snapshot of the traced memory whenever it reaches a new maximum at a sampling point. As Quom hooks,
+    # the end of every file (while the tokens of all including files are alive) is a sampling point.
+    def __init__(self):
+        self.current = 0
+        self.snapshot = None
+        self.live_objects = Counter()
+        self.chars_in = 0
+
+    def sample(self):
+        current = tracemalloc.get_traced_memory()[0]
+        if current <= self.current:
+            return
+        self.current = current
+        self.snapshot = tracemalloc.take_snapshot()
+        self.live_objects = Counter(type(obj).__name__ for obj in gc.get_objects()
+                                    if isinstance(obj, TOKENIZER_TYPES))
+
+    def on_file_end(self, file_path, stats):
+        self.chars_in += stats.chars_in
+        self.sample()
+
+
+class MemoryBenchmark:
+    def __init__(self, name: str, function: Callable[[Probe], object], size: int = None):
+        self.name = name
+        self.function = function
+        # Number of input characters, if None the characters read by Quom.
+        self.size = size
+
+    def run(self, top: int = 10) -> Dict[str, object]:
+        # Measure the resident set size without the overhead of tracing.
+        gc.collect()
+        base_rss = rss()
+        sampler = RssSampler()
+        sampler.start()
+        result = self.function(Probe())
+        peak_rss = sampler.stop()
+        del result
+        gc.collect()
+
+        probe = Probe()
+        tracemalloc.start(4)
+        try:
+            result = self.function(probe)
+            probe.sample()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        del result
+
+        size = self.size if self.size is not None else probe.chars_in
+        return {'size': size, 'peak': peak, 'peak_per_char': peak / size if size else None,
+                'rss': peak_rss - base_rss if base_rss else None, 'live_objects': dict(probe.live_objects),
+                'allocation_sites': allocation_sites(probe.snapshot, top) if probe.snapshot else []}
+
+
+def format_frame(frame: tracemalloc.Frame) -> str:
+    return '{}:{} {}'.format(Path(frame.filename).name, frame.lineno,
+                             linecache.getline(frame.filename, frame.lineno).strip())
+
+
+def allocation_sites(snapshot: tracemalloc.Snapshot, top: int) -> List[Dict[str, object]]:
+    # The biggest live allocations of Quom at the sampling point, with their callers.
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(True, '*{}quom{}*'.format(os.sep, os.sep),
+                                                          all_frames=True)])
+    return [{'size': statistic.size, 'count': statistic.count,
+             'traceback': [format_frame(frame) for frame in reversed(statistic.traceback)]}
+            for statistic in snapshot.statistics('traceback')[:top]]
+
+
+def quom_function(main_path: Path, include_directories: List[Path], source_directories: Union[List[Path], None]):
+    def run(probe: Probe):
+        Quom(main_path, StringIO(), include_directories=include_directories,
+             source_directories=source_directories or None, hooks=probe)
+
+    return run
+
+
+def tokenize_function(src: str):
+    def run(probe: Probe):
+        tokens = tokenize(src)
+        probe.sample()
+        return tokens
+
+    return run
+
+
+def create_memory_benchmarks(projects: Dict[str, Project]) -> List[MemoryBenchmark]:
+    benchmarks = []
+    for name, project in projects.items():
+        src = max((path.read_text(encoding='utf-8') for path in project.files), key=len)
+        benchmarks.append(MemoryBenchmark('tokenize.' + name, tokenize_function(src), len(src)))
+        benchmarks.append(MemoryBenchmark('quom.' + name, quom_function(
+            project.main_path, project.include_directories, project.source_directories)))
+    return benchmarks
+
+
+def print_memory_result(name: str, result: Dict[str, object]):
+    print('{}: peak {:.1f} KiB traced ({:.1f} bytes per char), {} RSS'.format(
+        name, result['peak'] / 1024, result['peak_per_char'] or 0,
+        '{:.1f} KiB'.format(result['rss'] / 1024) if result['rss'] is not None else 'unknown'))
+    print('  live objects: {}'.format(', '.join('{} {}'.format(name, count) for name, count in
+                                                sorted(result['live_objects'].items(), key=lambda x: -x[1]))))
+    for site in result['allocation_sites']:
+        print('  {:>10.1f} KiB {:>8}x  {}'.format(site['size'] / 1024, site['count'], site['traceback'][0]))
+        for frame in site['traceback'][1:]:
+            print('  {:>24}  <- {}'.format('', frame))
@@ -0,0 +1,67 @@
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from typing import Dict, List, Union
+
+from quom import Quom
+
+from .generator import Project
+
+MINIFY_LEVELS = (0, 1, 2)
+
+
+def find_compiler() -> Union[str, None]:
+    return shutil.which(os.environ.get('CXX', 'c++'))
+
+
+class ParseBenchmark:
+    # Size of the amalgamation of a project with a minify level and the time a compiler needs to parse it.
+    def __init__(self, name: str, project: Project, minify: int, output_path: Path, compiler: Union[str, None]):
+        self.name = name
+        self.project = project
+        self.minify = minify
+        self.output_path = output_path
+        self.compiler = compiler
+
+    def amalgamate(self) -> int:
+        with self.output_path.open('w', encoding='utf-8') as file:
+            Quom(self.project.main_path, file, include_directories=self.project.include_directories,
+                 source_directories=self.project.source_directories or None, minify=self.minify)
+        return self.output_path.stat().st_size
+
+    def run(self, repeat: int) -> Dict[str, object]:
+        size = self.amalgamate()
+        times = []
+        if self.compiler:
+            # Like a user, compile a translation unit including the amalgamation.
+            unit_path = self.output_path.with_suffix('.cpp')
+            unit_path.write_text('#include "{}"\n'.format(self.output_path.name), encoding='utf-8')
+            command = [self.compiler, '-fsyntax-only', str(unit_path)]
+            # The first run warms up the caches.
+            subprocess.run(command, check=True)
+            for _ in range(repeat):
+                start = perf_counter()
+                subprocess.run(command, check=True)
+                times.append(perf_counter() - start)
+        return {'minify': self.minify, 'size': size, 'compiler': self.compiler, 'times': times,
+                'min': min(times) if times else None, 'median': median(times) if times else None}
+
+
+def create_parse_benchmarks(projects: Dict[str, Project], directory: Path) -> List[ParseBenchmark]:
+    compiler = find_compiler()
+    return [ParseBenchmark('parse.{}.minify_{}'.format(name, level), project, level,
+                           directory / '{}_minify_{}.hpp'.format(name, level), compiler)
+            for name, project in projects.items() for level in MINIFY_LEVELS]
+
+
+def print_parse_results(results: Dict[str, Dict[str, object]]):
+    # Size and parse time relative to the unminified output of the same project.
+    for name, result in results.items():
+        baseline = results.get(name.rpartition('.')[0] + '.minify_0', result)
+        print('{:<28} {:>10} bytes ({:>6.1%}), {}'.format(
+            name, result['size'], result['size'] / baseline['size'] if baseline['size'] else 1,
+            'parse {:.4f}s ({:.1%})'.format(result['median'], result['median'] / baseline['median'])
+            if result['median'] else 'no compiler found'))
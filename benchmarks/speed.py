@@ -0,0 +1,128 @@
+import random
+from io import StringIO
+from statistics import median
+from time import perf_counter
+from typing import Callable, Dict, List
+
+from quom import FileCache, MemoryFileSystem, Quom
+from quom.tokenizer import tokenize, StartToken
+from quom.tokenizer.comment_tokenizer import scan_for_comment
+from quom.tokenizer.iterator import LineWrapIterator
+from quom.tokenizer.number_tokenizer import scan_for_number
+from quom.tokenizer.preprocessor_tokenizer import scan_for_preprocessor
+from quom.tokenizer.quote_tokenizer import scan_for_quote
+from quom.tokenizer.remaining_tokenizer import scan_for_remaining
+from quom.tokenizer.whitespace_tokenizer import scan_for_whitespace
+
+from .generator import ContentGenerator, Project, ProjectConfig
+
+
+class Benchmark:
+    def __init__(self, name: str, function: Callable[[], object], size: int):
+        self.name = name
+        self.function = function
+        # Number of input characters (or bytes of a project) processed by one call.
+        self.size = size
+
+    def run(self, repeat: int) -> Dict[str, object]:
+        times = []
+        for _ in range(repeat):
+            start = perf_counter()
+            self.function()
+            times.append(perf_counter() - start)
+        return {'times': times, 'min': min(times), 'median': median(times), 'size': self.size,
+                'size_per_second': self.size / min(times) if min(times) else None}
+
+
+def scan_all(scanner: Callable, src: str):
+    # Scans all tokens the scanner recognizes and skips every other character.
+    it = LineWrapIterator(src)
+    tokens = [StartToken(it, it)]
+    while it.curr != '\0':
+        if not scanner(tokens, it):
+            it.next()
+    return tokens
+
+
+def step_all(src: str):
+    it = LineWrapIterator(src)
+    while it.next():
+        pass
+
+
+def scanner_sources(config: ProjectConfig) -> Dict[str, str]:
+    # Inputs mostly consisting of the tokens a scanner recognizes.
+    rng = random.Random(config.seed)
+    generator = ContentGenerator(config, rng)
+    count = max(1, config.file_size // 10)
+    return {
+        'whitespace': ''.join(rng.choice([' ', '\t', '  ', '\n']) + 'x' for _ in range(count)),
+        'comment': ''.join(generator.comment() for _ in range(count // 8)),
+        'quote': ''.join(rng.choice(['"abc \\" def" ', "'\\n' ", "'a' "]) for _ in range(count)) +
+        ''.join(generator.raw_string() for _ in range(count // 20)),
+        'number': ''.join(rng.choice(['42 ', '0x1F ', "1'000'000 ", '3.14e-10 ', '.5f ']) for _ in range(count)),
+        'preprocessor': ''.join(rng.choice(['#include "a.hpp"\n', '#include <vector>\n', '#pragma once\n',
+                                            '#ifndef GUARD_HPP\n', '#endif // GUARD_HPP\n']) +
+                                generator.macro() for _ in range(count // 4)),
+        'remaining': ''.join(rng.choice(['identifier ', 'a+b ', '(x) ', '{}; ', 'std::vector<int> '])
+                             for _ in range(count)),
+        'splice': ''.join(rng.choice(['a', 'b \\\n', '\\\r\n', '\\\\\\\n']) for _ in range(count * 4)),
+    }
+
+
+SCANNERS = {
+    'whitespace': scan_for_whitespace,
+    'comment': scan_for_comment,
+    'quote': scan_for_quote,
+    'number': scan_for_number,
+    'preprocessor': scan_for_preprocessor,
+    'remaining': scan_for_remaining,
+}
+
+
+def quom_benchmark(name: str, project: Project, cache: FileCache = None) -> Benchmark:
+    # With a cache, all but the first run reuse the tokens like a persistent worker.
+    def run():
+        Quom(project.main_path, StringIO(), include_directories=project.include_directories,
+             source_directories=project.source_directories or None, cache=cache)
+
+    return Benchmark(name, run, project.size)
+
+
+def token_writer_benchmark(name: str, src: str) -> Benchmark:
+    # Amalgamates a single file from memory with the default options: the tokenizer and the token loop of Quom. The
+    # #pragma once keeps the file from being copied verbatim, its local includes are removed.
+    lines = [line for line in src.splitlines(keepends=True) if not line.lstrip().startswith('#include "')]
+    file_system = MemoryFileSystem({'main.hpp': '#pragma once\n' + ''.join(lines)})
+
+    def run():
+        Quom('main.hpp', StringIO(), file_system=file_system)
+
+    return Benchmark(name, run, len(src))
+
+
+def create_benchmarks(projects: Dict[str, Project], config: ProjectConfig = None) -> List[Benchmark]:
+    # Benchmarks the tokenizer and Quom for every project and with a config also every scanner.
+    benchmarks = []
+
+    # The biggest file of a project is a representative input for the tokenizer.
+    biggest_files = {name: max((path.read_text(encoding='utf-8') for path in project.files), key=len)
+                     for name, project in projects.items()}
+    for name, src in biggest_files.items():
+        benchmarks.append(Benchmark('tokenize.' + name, lambda src=src: tokenize(src), len(src)))
+    for name, src in biggest_files.items():
+        benchmarks.append(token_writer_benchmark('quom_tokens.' + name, src))
+
+    if config:
+        for name, src in scanner_sources(config).items():
+            if name == 'splice':
+                benchmarks.append(Benchmark('iterator.splice', lambda src=src: step_all(src), len(src)))
+            else:
+                benchmarks.append(Benchmark('scan_for_' + name, lambda src=src, scanner=SCANNERS[name]:
+                                            scan_all(scanner, src), len(src)))
+
+    for name, project in projects.items():
+        benchmarks.append(quom_benchmark('quom.' + name, project))
+    for name, project in projects.items():
+        benchmarks.append(quom_benchmark('quom_cached.' + name, project, FileCache()))
+    return benchmarks
@@ -0,0 +1,53 @@
+import re
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+# A line of -X importtime: self and cumulative time in microseconds, the indentation shows the nesting.
+IMPORT_TIME_REGEX = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$', re.MULTILINE)
+
+
+def import_times(args: List[str]) -> List[Tuple[str, int, int]]:
+    # Module name, nesting level and cumulative import time in microseconds of every module imported by a new
+    # interpreter running the arguments, in the order of -X importtime.
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + args, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    return [(match.group(4), len(match.group(3)) // 2, int(match.group(2)))
+            for match in IMPORT_TIME_REGEX.finditer(process.stderr)]
+
+
+def quom_import_time(times: List[Tuple[str, int, int]]) -> int:
+    # Time of all top level imports starting with quom, i.e. without the startup of the interpreter.
+    names = [name for name, _, _ in times]
+    if 'quom' not in names:
+        return 0
+    return sum(time for _, level, time in times[names.index('quom'):] if level == 0)
+
+
+class StartupBenchmark:
+    def __init__(self, name: str, args: List[str]):
+        self.name = name
+        # Arguments of the Python interpreter.
+        self.args = args
+
+    def run(self, repeat: int) -> Dict[str, object]:
+        times = []
+        import_time = []
+        for _ in range(repeat):
+            start = perf_counter()
+            subprocess.run([sys.executable] + self.args, stdout=subprocess.DEVNULL, check=True)
+            times.append(perf_counter() - start)
+            modules = import_times(self.args)
+            import_time.append(quom_import_time(modules))
+        return {'times': times, 'min': min(times), 'median': median(times), 'import_time': median(import_time),
+                'modules': sorted(name for name, _, _ in modules)}
+
+
+def create_startup_benchmarks() -> List[StartupBenchmark]:
+    return [
+        StartupBenchmark('startup.import', ['-c', 'import quom']),
+        StartupBenchmark('startup.version', ['-m', 'quom', '--version']),
+        StartupBenchmark('startup.import_quom', ['-c', 'from quom import Quom']),
+    ]
@@ -1,21 +1,70 @@
 # flake8: noqa Q003
 import sys
 
-from . import tokenizer
-from .quom import Quom
-from .quom_error import QuomError
-
-if sys.version_info[:2] >= (3, 8):
-    # TODO: Import directly (no need for conditional) when `python_requires = >= 3.8`
-    from importlib.metadata import PackageNotFoundError, version  # pragma: no cover
-else:
-    from importlib_metadata import PackageNotFoundError, version  # pragma: no cover
-
-try:
-    # Change here if project is renamed and does not equal the package name
-    dist_name = 'quom'
-    __version__ = version(dist_name)
-except PackageNotFoundError:
-    __version__ = 'unknown'  # pragma: no cover
-finally:
-    del version, PackageNotFoundError
+# Public names and the modules defining them. They are imported on first access to keep the startup of the command
+# line tool fast, e.g. `quom --version` needs neither the tokenizer nor Quom.
+_LAZY_ATTRIBUTES = {
+    'tokenizer': ('tokenizer', None),
+    'FileCache': ('file_cache', 'FileCache'),
+    'FileSystem': ('file_system', 'FileSystem'),
+    'OsFileSystem': ('file_system', 'OsFileSystem'),
+    'MemoryFileSystem': ('file_system', 'MemoryFileSystem'),
+    'ArchiveFileSystem': ('file_system', 'ArchiveFileSystem'),
+    'OverlayFileSystem': ('file_system', 'OverlayFileSystem'),
+    'QuomHooks': ('hooks', 'QuomHooks'),
+    'FileStats': ('hooks', 'FileStats'),
+    'Quom': ('quom', 'Quom'),
+    'QuomError': ('quom_error', 'QuomError'),
+    'QuomSession': ('quom', 'QuomSession'),
+    'SourceMap': ('source_map', 'SourceMap'),
+    'locate': ('source_map', 'locate'),
+    'Stats': ('stats', 'Stats'),
+    'Transform': ('transform', 'Transform'),
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def _import(module_name: str):
+    # Same as the import statement, unlike importlib.import_module it shows up in -X importtime.
+    __import__(module_name, globals(), level=1)
+    return sys.modules['{}.{}'.format(__name__, module_name)]
+
+
+def _version() -> str:
+    if sys.version_info[:2] >= (3, 8):
+        # TODO: Import directly (no need for conditional) when `python_requires = >= 3.8`
+        from importlib.metadata import PackageNotFoundError, version  # pragma: no cover
+    else:
+        from importlib_metadata import PackageNotFoundError, version  # pragma: no cover
+
+    try:
+        # Change here if project is renamed and does not equal the package name
+        dist_name = 'quom'
+        return version(dist_name)
+    except PackageNotFoundError:  # pragma: no cover
+        return 'unknown'
+
+
+def __getattr__(name: str):
+    if name == '__version__':
+        value = _version()
+    elif name in _LAZY_ATTRIBUTES:
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+        module = _import(module_name)
+        value = getattr(module, attribute) if attribute else module
+    else:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    # Cache the value, following accesses do not reach __getattr__ anymore.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | {'__version__'})
+
+
+if sys.version_info[:2] < (3, 7):
+    # Module level __getattr__ is not supported, resolve everything eagerly.
+    for _name in list(_LAZY_ATTRIBUTES) + ['__version__']:  # pragma: no cover
+        __getattr__(_name)
@@ -1,22 +1,36 @@
 import argparse
+import os
 import sys
+from contextlib import ExitStack, redirect_stderr, redirect_stdout
+from io import StringIO
 from pathlib import Path
-from typing import List
+from typing import TextIO, Tuple
 
-from quom import Quom
+# Name of the main file read from stdin.
+STDIN_NAME = '<stdin>'
 
-try:
-    from quom import __version__
-except ImportError:
-    __version__ = 'unknown'
 
+class VersionAction(argparse.Action):
+    # Like the version action of argparse but resolves the version only if requested.
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS, help=None):
+        super().__init__(option_strings=option_strings, dest=dest, default=default, nargs=0, help=help)
 
-def main(args: List[str]):
+    def __call__(self, parser, namespace, values, option_string=None):
+        try:
+            from quom import __version__
+        except ImportError:
+            __version__ = 'unknown'
+        print('quom {ver}'.format(ver=__version__))
+        parser.exit()
+
+
+def create_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog='quom', description='Single header generator for C/C++ libraries.')
-    parser.add_argument('--version', action='version', version='quom {ver}'.format(ver=__version__))
-    parser.add_argument('input_path', metavar='input', type=Path, help='Input file path of the main file.')
+    parser.add_argument('--version', action=VersionAction, help="show program's version number and exit")
+    parser.add_argument('input_path', metavar='input', type=Path,
+                        help='Input file path of the main file or - to read it from stdin.')
     parser.add_argument('output_path', metavar='output', type=Path,
-                        help='Output file path of the generated single header file.')
+                        help='Output file path of the generated single header file or - to stream it to stdout.')
     parser.add_argument('--stitch', '-s', metavar='format', type=str, default=None,
                         help='Format of the comment where the source files should be placed (e.g. // ~> stitch <~). \
                         Default: %(default)s (at the end of the main file)')
@@ -26,13 +40,122 @@ def main(args: List[str]):
                         help='Reduce continuous line breaks to one. Default: %(default)s')
     parser.add_argument('--include_directory', '-I', type=Path, action='append', default=[],
                         help='Add include directories for header files.')
+    parser.add_argument('--keep_include', metavar='glob', type=str, action='append', default=[],
+                        help='Keep local includes with a path matching the glob (e.g. nlohmann/*) as they are instead '
+                             'of inlining them. A glob without / also matches the file name.')
     parser.add_argument('--source_directory', '-S', type=str, action='append', default=['.'],
                         help='Set the source directories for source files. '
                              'Use ./ or .\\ in front of a path to mark as relative to the header file.')
+    parser.add_argument('--define', '-D', metavar='NAME[=VALUE]', type=str, action='append', default=[],
+                        help='Define a macro. Branches of conditional blocks which are dead with the defined and '
+                             'undefined macros are removed.')
+    parser.add_argument('--undefine', '-U', metavar='NAME', type=str, action='append', default=[],
+                        help='Undefine a macro, see --define.')
+    parser.add_argument('--archive', metavar='path', type=Path, default=None,
+                        help='Read the input and all included files from this zip or tar archive. Their paths are '
+                             'relative to the root of the archive.')
+    parser.add_argument('--base_dir', metavar='path', type=Path, default=Path('.'),
+                        help='Directory of the main file read from stdin, its includes are resolved against it. '
+                             'Default: the working directory')
     parser.add_argument('--encoding', '-e', type=str, default='utf-8',
                         help='The encoding used to read and write all files.')
+    parser.add_argument('--stats', action='store_true',
+                        help='Print statistics and the slowest files to stderr.')
+    parser.add_argument('--stats_top', metavar='N', type=int, default=10,
+                        help='Number of the slowest files printed by --stats. Default: %(default)s')
+    parser.add_argument('--trace', metavar='path', type=Path, default=None,
+                        help='Write the processing steps of all files in the Chrome trace event format.')
+    parser.add_argument('--report', metavar='path', type=Path, default=None,
+                        help='Write the bytes, lines and token kinds every file contributes to the output as JSON '
+                             'and print the 20 biggest files to stderr.')
+    parser.add_argument('--minify', '-m', action='store_true',
+                        help='Remove comments and empty lines (see --minify_level).')
+    parser.add_argument('--minify_level', metavar='level', type=int, default=1, choices=[1, 2],
+                        help='1: Remove comments and empty lines. 2: Also reduce whitespace to single spaces. '
+                             'Default: %(default)s')
+    parser.add_argument('--keep_comment', metavar='regex', type=str, default=None,
+                        help='Keep comments matching the regex (e.g. "Copyright|License") when minifying.')
+    parser.add_argument('--hoist_includes', action='store_true',
+                        help='Write every system include outside of conditional blocks once after the #pragma once '
+                             'of the main file or at --hoist_location.')
+    parser.add_argument('--hoist_location', metavar='format', type=str, default=None,
+                        help='Format of the comment where the hoisted includes should be placed '
+                             '(e.g. // ~> includes <~).')
+    parser.add_argument('--dedupe_content', action='store_true',
+                        help='Skip files with the same content as an already processed file with #pragma once or '
+                             'include guard. --stats lists the merged files.')
+    parser.add_argument('--dedupe_comments', action='store_true',
+                        help='Write every distinct block of comments at the start of files (e.g. a license) once. '
+                             '--stats shows the saved characters.')
+    parser.add_argument('--dedupe_comment_regex', metavar='regex', type=str, default=None,
+                        help='Also write comments matching the regex (e.g. Copyright) once with --dedupe_comments.')
+    parser.add_argument('--source_map', metavar='path', type=Path, default=None,
+                        help='Write a binary map of the output lines to the input files and lines '
+                             '(see quom.locate).')
+    parser.add_argument('--line_directives', action='store_true',
+                        help='Write #line directives into the output, so compilers report the input files and lines.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Keep an index of the output next to it (output.quom-index) and copy the files, which '
+                             'did not change since, from the previous output.')
+    parser.add_argument('--source_output', metavar='path', type=Path, default=None,
+                        help='Write the source files to this file instead of the output. It includes the output.')
+    parser.add_argument('--shards', metavar='N', type=int, default=0,
+                        help='Write the source files balanced to N files (source_output_0.cpp, ...). Every shard '
+                             'includes the output.')
+    parser.add_argument('--compress', metavar='codec', type=str, default=None,
+                        choices=['gzip', 'bz2', 'lzma', 'none'],
+                        help='Compress the outputs with gzip, bz2 or lzma on a background thread while writing. '
+                             'Default: by the file extension (.gz, .bz2, .xz)')
+    parser.add_argument('--read_ahead', action='store_true',
+                        help='Read included files in background threads ahead.')
+    parser.add_argument('--read_ahead_threads', metavar='N', type=int, default=4,
+                        help='Number of threads used by --read_ahead. Default: %(default)s')
+    parser.add_argument('--persistent_worker', action='store_true',
+                        help='Keep running and read requests (JSON with the arguments) line by line from stdin.')
+    return parser
+
+
+def include_path(file_path: Path, directory: Path) -> str:
+    # Path to include the file from a file in the directory.
+    return Path(os.path.relpath(str(file_path.resolve()), str(directory.resolve()))).as_posix()
+
+
+def split_codec_suffix(file_path: Path) -> Tuple[Path, str]:
+    # The path without and the extension of a compressed file: lib.hpp.gz -> lib.hpp, .gz
+    from quom.compress import CODEC_SUFFIXES
+
+    if file_path.suffix in CODEC_SUFFIXES:
+        return file_path.with_suffix(''), file_path.suffix
+    return file_path, ''
+
+
+def is_stdio(file_path: Path) -> bool:
+    # The input is read from stdin and the output written to stdout.
+    return str(file_path) == '-'
+
+
+def read_stdin(encoding: str) -> str:
+    # Same line breaks as a file read in text mode.
+    buffer = getattr(sys.stdin, 'buffer', None)
+    text = buffer.read().decode(encoding) if buffer else sys.stdin.read()
+    return StringIO(text, newline=None).read()
+
+
+def open_output(file_path: Path, args: argparse.Namespace) -> TextIO:
+    from quom.compress import CompressingWriter, output_codec
+    from quom.stream import StreamWriter
+
+    if is_stdio(file_path):
+        return StreamWriter(sys.stdout, args.encoding)
+    codec = output_codec(file_path, args.compress)
+    if codec:
+        return CompressingWriter(file_path.open('wb'), codec, args.encoding)
+    return file_path.open('w+', encoding=args.encoding)
+
 
-    args = parser.parse_args(args)
+def amalgamate(args: argparse.Namespace, cache=None, hooks=None):
+    # Imported after parsing, --help and --version do not need them.
+    from quom import ArchiveFileSystem, OverlayFileSystem, Quom, QuomError, SourceMap, Stats
 
     # Transform source directories to distingue between:
     # - relative from header file (starting with dot)
@@ -45,11 +168,146 @@ def main(args: List[str]):
         if src == '.' or src.startswith('./') or src.startswith('.\\'):
             relative_source_directories.append(path)
         else:
-            source_directories.append(path.resolve())
+            # Paths in an archive are relative to its root.
+            source_directories.append(path if args.archive else path.resolve())
+
+    # The cache only works with the file system of the OS.
+    file_system = ArchiveFileSystem(args.archive) if args.archive else None
+    # The main file read from stdin is placed in the base directory.
+    input_path = args.input_path
+    if is_stdio(input_path):
+        if file_system:
+            raise QuomError('The main file can only be read from stdin without an archive.')
+        input_path = args.base_dir / STDIN_NAME
+        file_system = OverlayFileSystem({input_path: read_stdin(args.encoding)})
+    if file_system:
+        cache = None
+
+    # The given hooks have to be Stats, if statistics are requested.
+    stats = hooks
+    if stats is None and (args.stats or args.trace or args.report):
+        stats = Stats()
+
+    # The extension of a compressed output (lib.hpp.gz) is kept for the source outputs (lib.cpp.gz), the source
+    # outputs include the decompressed output (lib.hpp).
+    header_path, codec_suffix = split_codec_suffix(args.output_path)
+
+    # Shards are named after the source output or the output: lib.cpp -> lib_0.cpp, lib_1.cpp, ...
+    source_output_path = args.source_output or header_path.with_suffix('.cpp' + codec_suffix)
+    if args.shards:
+        path, suffix = split_codec_suffix(source_output_path)
+        source_output_paths = [path.with_name('{}_{}{}{}'.format(path.stem, i, path.suffix, suffix))
+                               for i in range(args.shards)]
+    else:
+        source_output_paths = [args.source_output] if args.source_output else []
+
+    if is_stdio(args.output_path):
+        if source_output_paths:
+            raise QuomError('Source outputs need an output file to include.')
+        if args.incremental:
+            raise QuomError('Incremental output needs an output file.')
+        if args.compress not in (None, 'none'):
+            raise QuomError('The output to stdout is not compressed, pipe it into a compressor instead.')
+
+    # The previous output is read before it is overwritten.
+    index = None
+    if args.incremental:
+        from quom.compress import output_codec
+        from quom.incremental import index_path, load_index
+        if output_codec(args.output_path, args.compress):
+            raise QuomError('Incremental output does not work with compressed outputs.')
+        index = load_index(index_path(args.output_path), args.output_path, args.encoding)
+    source_map = SourceMap() if args.source_map else None
+
+    with ExitStack() as stack:
+        file = stack.enter_context(open_output(args.output_path, args))
+        source_files = [stack.enter_context(open_output(path, args)) for path in source_output_paths]
+        header_include = include_path(header_path, source_output_paths[0].parent) if source_files else None
+        Quom(input_path, file, args.stitch, args.include_guard, args.trim, args.include_directory,
+             relative_source_directories, source_directories, args.encoding, stats, cache,
+             args.read_ahead_threads if args.read_ahead else 0, source_dsts=source_files or None,
+             header_include=header_include, minify=args.minify_level if args.minify else 0,
+             keep_comment_format=args.keep_comment, hoist_includes=args.hoist_includes or bool(args.hoist_location),
+             hoist_format=args.hoist_location, defines=args.define, undefines=args.undefine,
+             dedupe_content=args.dedupe_content, file_system=file_system, index=index, source_map=source_map,
+             line_directives=args.line_directives, dedupe_comments=args.dedupe_comments,
+             dedupe_comment_format=args.dedupe_comment_regex, keep_includes=args.keep_include)
+    if index:
+        index.save(index_path(args.output_path))
+    if source_map:
+        source_map.save(args.source_map)
+
+    if args.stats:
+        stats.write_summary(sys.stderr, args.stats_top)
+    if args.trace:
+        with args.trace.open('w', encoding='utf-8') as file:
+            stats.write_trace(file)
+    if args.report:
+        import json
+        with args.report.open('w', encoding='utf-8') as file:
+            json.dump(stats.report(), file, indent=2)
+        stats.write_report(sys.stderr, 20)
+
+
+def worker(stdin: TextIO, stdout: TextIO):
+    # Persistent worker: every line of stdin is a request {"arguments": [...], "requestId": 0} with the command line
+    # arguments, every response {"exitCode": 0, "output": "", "requestId": 0, "inputs": [...]} is written as one line
+    # to stdout. Resolved includes, contents and tokens of files are kept between the requests.
+    import json
+    from quom import FileCache, QuomError, Stats
+    from quom.hooks import InputFiles
+
+    parser = create_parser()
+    cache = FileCache()
+    for line in stdin:
+        if not line.strip():
+            continue
+
+        request_id = 0
+        exit_code = 1
+        inputs = []
+        output = StringIO()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('Request must be a JSON object.')
+            request_id = request.get('requestId', 0)
+            # Nothing but the responses may be written to stdout, an output to stdout is returned as output.
+            with redirect_stdout(output), redirect_stderr(output):
+                arguments = parser.parse_args(request.get('arguments', []))
+                if is_stdio(arguments.input_path):
+                    raise QuomError('The persistent worker reads the requests from stdin, not the main file.')
+                # The files are only measured if the statistics are requested, otherwise only their paths recorded.
+                if arguments.stats or arguments.trace or arguments.report:
+                    stats = Stats()
+                    amalgamate(arguments, cache, stats)
+                    input_paths = [file.file_path for file in stats.files] + list(stats.resources)
+                else:
+                    input_files = InputFiles()
+                    amalgamate(arguments, cache, input_files)
+                    input_paths = input_files.file_paths
+            exit_code = 0
+            inputs = [str(file_path) for file_path in input_paths]
+        except SystemExit as error:
+            # Invalid arguments (already reported by argparse), --help or --version.
+            exit_code = error.code if isinstance(error.code, int) else 1 if error.code else 0
+        except (QuomError, OSError, ValueError) as error:
+            output.write('quom: error: {}\n'.format(error))
+        except Exception:
+            import traceback
+            output.write(traceback.format_exc())
+
+        stdout.write(json.dumps({'exitCode': exit_code, 'output': output.getvalue(), 'requestId': request_id,
+                                 'inputs': inputs}) + '\n')
+        stdout.flush()
+
+
+def main(args: list):
+    if '--persistent_worker' in args:
+        worker(sys.stdin, sys.stdout)
+        return
 
-    with args.output_path.open('w+', encoding=args.encoding) as file:
-        Quom(args.input_path, file, args.stitch, args.include_guard, args.trim, args.include_directory,
-             relative_source_directories, source_directories, args.encoding)
+    amalgamate(create_parser().parse_args(args))
 
 
 def run():
@@ -0,0 +1,98 @@
+import queue
+import threading
+from pathlib import Path
+from typing import BinaryIO, Union
+
+# Codecs of the standard library by the file extension of the output.
+CODEC_SUFFIXES = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'lzma'}
+CODECS = ('gzip', 'bz2', 'lzma')
+
+# Characters collected before they are passed to the compression and number of waiting chunks.
+CHUNK_SIZE = 1 << 16
+QUEUE_SIZE = 8
+
+
+def output_codec(file_path: Path, compress: Union[str, None]) -> Union[str, None]:
+    # The codec given (none for no compression) or the one of the file extension.
+    if compress is not None:
+        return compress if compress != 'none' else None
+    return CODEC_SUFFIXES.get(file_path.suffix)
+
+
+def open_compressed(file: BinaryIO, codec: str) -> BinaryIO:
+    # The codec modules are only imported if needed.
+    if codec == 'gzip':
+        import gzip
+        # Without name and time, the same input compresses to the same output.
+        return gzip.GzipFile(filename='', mode='wb', fileobj=file, mtime=0)
+    if codec == 'bz2':
+        import bz2
+        return bz2.BZ2File(file, 'wb')
+    if codec == 'lzma':
+        import lzma
+        return lzma.LZMAFile(file, 'wb')
+    raise ValueError('Unknown codec: {}'.format(codec))
+
+
+class CompressingWriter:
+    # Text output which is encoded and compressed on a background thread while Quom goes on. The text is passed in
+    # chunks, so only a few of them are held at once.
+    def __init__(self, file: BinaryIO, codec: str, encoding: str = 'utf-8'):
+        self.__file = file
+        self.__compressed = open_compressed(file, codec)
+        self.__encoding = encoding
+        self.__chunk = []
+        self.__chunk_size = 0
+        self.__queue = queue.Queue(QUEUE_SIZE)
+        self.__error = None
+        self.__thread = threading.Thread(target=self.__compress, name='quom-compress', daemon=True)
+        self.__thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, text: str) -> int:
+        self.__chunk.append(text)
+        self.__chunk_size += len(text)
+        if self.__chunk_size >= CHUNK_SIZE:
+            self.__pass_chunk()
+        return len(text)
+
+    def close(self):
+        if self.__file.closed:
+            return
+        try:
+            if not self.__error:
+                self.__pass_chunk()
+        finally:
+            self.__queue.put(None)
+            self.__thread.join()
+            try:
+                self.__compressed.close()
+            finally:
+                self.__file.close()
+        if self.__error:
+            raise self.__error
+
+    def __pass_chunk(self):
+        if self.__error:
+            raise self.__error
+        if self.__chunk:
+            self.__queue.put(''.join(self.__chunk))
+            self.__chunk = []
+            self.__chunk_size = 0
+
+    def __compress(self):
+        try:
+            text = self.__queue.get()
+            while text is not None:
+                self.__compressed.write(text.encode(self.__encoding))
+                text = self.__queue.get()
+        except Exception as error:
+            # Reported by the next write, drain the queue until then.
+            self.__error = error
+            while self.__queue.get() is not None:
+                pass
@@ -0,0 +1,372 @@
+import operator
+import re
+from typing import Dict, List, Set, Union
+
+from .directives import find_include_guard, macro_name
+from .quom_error import QuomError
+from .tokenizer import tokenize, Token, CommentToken, PreprocessorToken, LinebreakWhitespaceToken
+
+# State of a branch, the state of a position is the highest state of all enclosing branches.
+LIVE = 0
+UNDECIDED = 1
+DEAD = 2
+
+# Directives which must be seen by the evaluator, also if a file would be copied verbatim.
+CONDITIONAL_DIRECTIVES = ('if', 'ifdef', 'ifndef', 'elif', 'elifdef', 'elifndef', 'else', 'endif', 'define', 'undef')
+
+IDENTIFIER_REGEX = re.compile(r'[A-Za-z_]\w*\Z')
+MACRO_REGEX = re.compile(r'\s*([A-Za-z_]\w*)(\()?')
+DEFINE_OPTION_REGEX = re.compile(r'([A-Za-z_]\w*)(\([^)]*\))?(?:=([\s\S]*))?\Z')
+EXPRESSION_TOKEN_REGEX = re.compile(r'\s*(?:(\.?\d(?:[eEpP][+-]|[\w.]|\'(?=\w))*)|((?:u8|[uUL])?\'(?:[^\'\\]|\\.)*\')|'
+                                    r'([A-Za-z_]\w*)|(\|\||&&|<<|>>|<=|>=|==|!=|[-+*/%<>!~&|^?:()]))')
+NUMBER_REGEX = re.compile(r'(?:0[xX]([0-9a-fA-F]+)|0[bB]([01]+)|(0[0-7]*)|([1-9]\d*))([lLzZ]*)\Z')
+
+UNARY_OPERATIONS = {'+': operator.pos, '-': operator.neg, '!': operator.not_, '~': operator.invert}
+BINARY_PRECEDENCE = {'*': 10, '/': 10, '%': 10, '+': 9, '-': 9, '<<': 8, '>>': 8, '<': 7, '<=': 7, '>': 7, '>=': 7,
+                     '==': 6, '!=': 6, '&': 5, '^': 4, '|': 3, '&&': 2, '||': 1}
+
+
+class UndecidableError(Exception):
+    pass
+
+
+def parse_number(text: str) -> Union[int, None]:
+    # Value of an integer literal. Unsigned (their arithmetic differs) and floating point literals are undecidable.
+    match = NUMBER_REGEX.match(text.replace("'", ''))
+    if not match:
+        return None
+    hexadecimal, binary, octal, decimal, _ = match.groups()
+    if hexadecimal:
+        return int(hexadecimal, 16)
+    if binary:
+        return int(binary, 2)
+    if octal:
+        return int(octal, 8)
+    return int(decimal)
+
+
+def lex_expression(text: str) -> list:
+    # Operators and identifiers as strings, literals as their value (None if undecidable).
+    tokens = []
+    pos = 0
+    while text[pos:].strip():
+        match = EXPRESSION_TOKEN_REGEX.match(text, pos)
+        if not match:
+            raise UndecidableError()
+        number, character, identifier, operator_ = match.groups()
+        if number:
+            tokens.append(parse_number(number))
+        elif character:
+            tokens.append(None)
+        else:
+            tokens.append(identifier or operator_)
+        pos = match.end()
+    return tokens
+
+
+def binary_operation(operator_: str, left: Union[int, None], right: Union[int, None]) -> Union[int, None]:
+    # Logical operators are decidable if one side decides them.
+    if operator_ == '&&':
+        if left == 0 or right == 0:
+            return 0
+        return None if left is None or right is None else 1
+    if operator_ == '||':
+        if left or right:
+            return 1
+        return None if left is None or right is None else 0
+
+    if left is None or right is None:
+        return None
+    if operator_ in ('/', '%'):
+        if right == 0:
+            return None
+        # Division truncates towards zero.
+        quotient = abs(left) // abs(right) * (1 if (left < 0) == (right < 0) else -1)
+        return quotient if operator_ == '/' else left - right * quotient
+    if operator_ in ('<<', '>>'):
+        if not 0 <= right < 64:
+            return None
+        return left << right if operator_ == '<<' else left >> right
+    return int({'*': operator.mul, '+': operator.add, '-': operator.sub, '<': operator.lt, '<=': operator.le,
+                '>': operator.gt, '>=': operator.ge, '==': operator.eq, '!=': operator.ne, '&': operator.and_,
+                '^': operator.xor, '|': operator.or_}[operator_](left, right))
+
+
+class Expression:
+    # Parser and evaluator of an expanded #if expression. Undecidable values are None and propagate.
+    def __init__(self, tokens: list):
+        self.__tokens = tokens
+        self.__pos = 0
+
+    def evaluate(self) -> Union[int, None]:
+        value = self.__conditional()
+        if self.__pos != len(self.__tokens):
+            raise UndecidableError()
+        return value
+
+    def __peek(self):
+        return self.__tokens[self.__pos] if self.__pos < len(self.__tokens) else ''
+
+    def __next(self):
+        token = self.__peek()
+        self.__pos += 1
+        return token
+
+    def __expect(self, expected: str):
+        if self.__next() != expected:
+            raise UndecidableError()
+
+    def __conditional(self) -> Union[int, None]:
+        condition = self.__binary(1)
+        if self.__peek() != '?':
+            return condition
+        self.__pos += 1
+        true_value = self.__conditional()
+        self.__expect(':')
+        false_value = self.__conditional()
+        if condition is None:
+            return true_value if true_value == false_value else None
+        return true_value if condition else false_value
+
+    def __binary(self, min_precedence: int) -> Union[int, None]:
+        left = self.__unary()
+        while True:
+            operator_ = self.__peek()
+            precedence = BINARY_PRECEDENCE.get(operator_, 0) if isinstance(operator_, str) else 0
+            if precedence < min_precedence:
+                return left
+            self.__pos += 1
+            left = binary_operation(operator_, left, self.__binary(precedence + 1))
+            # Values outside of intmax_t would overflow.
+            if left is not None and not -2 ** 63 <= left < 2 ** 63:
+                left = None
+
+    def __unary(self) -> Union[int, None]:
+        token = self.__next()
+        if token == '(':
+            value = self.__conditional()
+            self.__expect(')')
+            return value
+        if token in UNARY_OPERATIONS:
+            value = self.__unary()
+            return None if value is None else int(UNARY_OPERATIONS[token](value))
+        if isinstance(token, str):
+            raise UndecidableError()
+        return token
+
+
+def directive_text(token: PreprocessorToken) -> str:
+    # Arguments of a directive without comments, line splices and the line break.
+    return ''.join(' ' if isinstance(argument, CommentToken) else str(argument)
+                   for argument in token.preprocessor_arguments if not isinstance(argument, LinebreakWhitespaceToken))
+
+
+def rename_directive(token: PreprocessorToken, name: str) -> Token:
+    # Same directive with another name, e.g. #elif as #if.
+    instruction_name = token.preprocessor_instruction[-1]
+    return tokenize(''.join(name if x is instruction_name else x.raw for x in token.preprocessor_tokens))[1]
+
+
+class ConditionalFrame:
+    def __init__(self):
+        self.state = LIVE
+        # A branch was taken for sure, all following are dead.
+        self.taken = False
+        # The opening directive was written, the rest of the undecidable directives and #endif must be too.
+        self.emitted = False
+
+
+class Conditionals:
+    # Evaluates #if, #ifdef, #ifndef, #elif, #else and #endif with the given macros and the macros defined by the
+    # processed files. Decided directives and dead branches are removed, undecidable ones are kept untouched. Macros
+    # neither given nor defined before are undecidable, so are macros defined in undecidable branches.
+    def __init__(self, defines: List[str], undefines: List[str]):
+        self.__defines: Dict[str, str] = {}
+        self.__function_macros: Set[str] = set()
+        self.__undefines: Set[str] = set()
+        for define in defines:
+            match = DEFINE_OPTION_REGEX.match(define)
+            if not match:
+                raise QuomError('Invalid macro definition: "{}"'.format(define))
+            name, parameters, value = match.groups()
+            if parameters:
+                self.__define_function(name)
+            else:
+                self.__define(name, '1' if value is None else value)
+        for undefine in undefines:
+            if not IDENTIFIER_REGEX.match(undefine):
+                raise QuomError('Invalid macro name: "{}"'.format(undefine))
+            self.__undefine(undefine)
+
+        self.__frames: List[ConditionalFrame] = []
+        self.__file_depths: List[int] = []
+        self.__guard_tokens = set()
+        self.__state = LIVE
+
+    def save_macros(self) -> tuple:
+        # Copy of the known macros, e.g. of the header output every source output continues with.
+        return dict(self.__defines), set(self.__function_macros), set(self.__undefines)
+
+    def restore_macros(self, macros: tuple):
+        # Continues with macros of save_macros, which must not be used again.
+        self.__defines, self.__function_macros, self.__undefines = macros
+
+    def begin_file(self, tokens: List[Token]):
+        # Conditional blocks don't span files. An include guard around the whole file is not evaluated.
+        guard = find_include_guard(tokens)
+        if guard:
+            self.__guard_tokens.update(guard)
+        self.__file_depths.append(len(self.__frames))
+
+    def end_file(self):
+        # Close blocks left open by the file.
+        del self.__frames[self.__file_depths.pop():]
+        self.__update_state()
+
+    def process(self, token: Token) -> Union[Token, None]:
+        # Returns the token to write instead, or None if it must be removed.
+        if not isinstance(token, PreprocessorToken) or token in self.__guard_tokens:
+            return None if self.__state == DEAD else token
+
+        name = token.preprocessor_name
+        has_frame = len(self.__frames) > self.__file_depths[-1]
+        if name in ('if', 'ifdef', 'ifndef'):
+            return self.__begin(token, name)
+        elif name in ('elif', 'elifdef', 'elifndef', 'else') and has_frame:
+            return self.__else(token, name)
+        elif name == 'endif' and has_frame:
+            frame = self.__frames.pop()
+            self.__update_state()
+            return token if frame.emitted else None
+
+        if self.__state == DEAD:
+            return None
+        if name in ('define', 'undef'):
+            match = MACRO_REGEX.match(directive_text(token))
+            if match and self.__state == UNDECIDED:
+                self.__forget(match.group(1))
+            elif match and name == 'undef':
+                self.__undefine(match.group(1))
+            elif match and match.group(2):
+                self.__define_function(match.group(1))
+            elif match:
+                self.__define(match.group(1), directive_text(token)[match.end():].strip())
+        return token
+
+    def __begin(self, token: PreprocessorToken, name: str) -> Union[Token, None]:
+        frame = ConditionalFrame()
+        # Everything in a dead branch is dead.
+        frame.taken = self.__state == DEAD
+        self.__frames.append(frame)
+        if self.__enter_branch(frame, token, name):
+            frame.emitted = True
+            return token
+        return None
+
+    def __else(self, token: PreprocessorToken, name: str) -> Union[Token, None]:
+        frame = self.__frames[-1]
+        if not self.__enter_branch(frame, token, name):
+            return None
+        if frame.emitted:
+            return token
+        # All branches before were removed, the first undecidable one opens the block.
+        frame.emitted = True
+        return rename_directive(token, name[2:] if name.startswith('elif') else 'if')
+
+    def __enter_branch(self, frame: ConditionalFrame, token: PreprocessorToken, name: str) -> bool:
+        # Returns True if the directive must be kept.
+        if frame.taken:
+            frame.state = DEAD
+            self.__update_state()
+            return False
+
+        value = self.__condition(token, name)
+        if value is None:
+            frame.state = UNDECIDED
+        elif value:
+            # Taken for sure, but only if none of the undecidable branches before is.
+            frame.state = UNDECIDED if frame.emitted else LIVE
+            frame.taken = True
+        else:
+            frame.state = DEAD
+        self.__update_state()
+        return value is None or (bool(value) and frame.emitted)
+
+    def __condition(self, token: PreprocessorToken, name: str) -> Union[int, None]:
+        if name == 'else':
+            return 1
+        if name in ('ifdef', 'ifndef', 'elifdef', 'elifndef'):
+            macro = macro_name(token)
+            defined = self.__is_defined(macro) if IDENTIFIER_REGEX.match(macro) else None
+            if defined is None or name in ('ifdef', 'elifdef'):
+                return defined
+            return int(not defined)
+        try:
+            return Expression(self.__expand(lex_expression(directive_text(token)), set())).evaluate()
+        except UndecidableError:
+            return None
+
+    def __expand(self, tokens: list, hidden: Set[str]) -> list:
+        # Replaces every identifier with its value, None if undecidable.
+        expanded = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            i += 1
+            if not isinstance(token, str) or not IDENTIFIER_REGEX.match(token):
+                expanded.append(token)
+            elif token == 'defined':
+                if tokens[i:i + 1] == ['('] and tokens[i + 2:i + 3] == [')']:
+                    macro, i = tokens[i + 1], i + 3
+                elif i < len(tokens):
+                    macro, i = tokens[i], i + 1
+                else:
+                    raise UndecidableError()
+                if not isinstance(macro, str) or not IDENTIFIER_REGEX.match(macro):
+                    raise UndecidableError()
+                expanded.append(self.__is_defined(macro))
+            elif token in ('true', 'false'):
+                expanded.append(int(token == 'true'))
+            elif token in self.__defines and token not in hidden:
+                expanded.extend(self.__expand(lex_expression(self.__defines[token]), hidden | {token}))
+            elif tokens[i:i + 1] == ['(']:
+                # Function-like macros (e.g. __has_include) are not expanded.
+                depth = 0
+                for i in range(i, len(tokens)):
+                    depth += (tokens[i] == '(') - (tokens[i] == ')')
+                    if depth == 0:
+                        break
+                else:
+                    raise UndecidableError()
+                i += 1
+                expanded.append(None)
+            elif token in self.__undefines:
+                expanded.append(0)
+            else:
+                expanded.append(None)
+        return expanded
+
+    def __is_defined(self, name: str) -> Union[int, None]:
+        if name in self.__defines or name in self.__function_macros:
+            return 1
+        return 0 if name in self.__undefines else None
+
+    def __define(self, name: str, value: str):
+        self.__forget(name)
+        self.__defines[name] = value
+
+    def __define_function(self, name: str):
+        self.__forget(name)
+        self.__function_macros.add(name)
+
+    def __undefine(self, name: str):
+        self.__forget(name)
+        self.__undefines.add(name)
+
+    def __forget(self, name: str):
+        self.__defines.pop(name, None)
+        self.__function_macros.discard(name)
+        self.__undefines.discard(name)
+
+    def __update_state(self):
+        self.__state = max((frame.state for frame in self.__frames), default=LIVE)
@@ -0,0 +1,78 @@
+import re
+from typing import Dict, List
+
+from .digest import text_digest
+from .tokenizer import Token, CommentToken, LinebreakWhitespaceToken, PreprocessorPragmaOnceToken, WhitespaceToken
+
+
+def span_digest(first: Token, last: Token) -> bytes:
+    # Hash of the source from the start of the first to the end of the last token, sliced by their offsets.
+    return text_digest(first.start.src[first.start.position:last.end.position])
+
+
+def leading_comment_blocks(tokens: List[Token]) -> List[List[CommentToken]]:
+    # The comments before the code of a file (#pragma once may come first), split into blocks by empty lines.
+    blocks = []
+    line_breaks = 2
+    for token in tokens[1:-1]:
+        if isinstance(token, CommentToken):
+            if line_breaks >= 2 or not blocks:
+                blocks.append([])
+            blocks[-1].append(token)
+            line_breaks = 0
+        elif isinstance(token, LinebreakWhitespaceToken):
+            line_breaks += 1
+        elif isinstance(token, PreprocessorPragmaOnceToken):
+            line_breaks = 2
+        elif not isinstance(token, WhitespaceToken):
+            break
+    return blocks
+
+
+class CommentDeduplicator:
+    # Writes every distinct block of leading comments (e.g. a license banner) once and drops later identical copies.
+    # Comments matching the regex are deduplicated anywhere in the files. Only comments at the start of a line are
+    # dropped, together with the rest of the line if it is empty.
+    def __init__(self, comment_format: str = None):
+        self.__comment_format = re.compile(comment_format) if comment_format else None
+        self.__digests = set()
+        # The leading comments of the current file and if they are dropped.
+        self.__leading: Dict[Token, bool] = {}
+        self.__drop_line = False
+
+    def reset(self):
+        self.__digests = set()
+        self.__leading = {}
+        self.__drop_line = False
+
+    def begin_file(self, tokens: List[Token]):
+        self.__leading = {}
+        for block in leading_comment_blocks(tokens):
+            digest = span_digest(block[0], block[-1])
+            is_duplicate = digest in self.__digests
+            self.__digests.add(digest)
+            for token in block:
+                self.__leading[token] = is_duplicate
+
+    def drop(self, token: Token, at_line_start: bool) -> bool:
+        # Returns True if the token is a duplicate comment or the rest of its line and must not be written.
+        if at_line_start and isinstance(token, CommentToken) and self.__is_duplicate(token):
+            self.__drop_line = True
+            return True
+        if self.__drop_line and isinstance(token, WhitespaceToken):
+            self.__drop_line = not isinstance(token, LinebreakWhitespaceToken)
+            return True
+        self.__drop_line = False
+        return False
+
+    def __is_duplicate(self, token: CommentToken) -> bool:
+        if token in self.__leading:
+            return self.__leading[token]
+        if not self.__comment_format or not self.__comment_format.search(
+                token.content_start.src[token.content_start.position:token.content_end.position]):
+            return False
+        digest = span_digest(token, token)
+        if digest in self.__digests:
+            return True
+        self.__digests.add(digest)
+        return False
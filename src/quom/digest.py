@@ -0,0 +1,23 @@
+import hashlib
+
+
+class TextHash:
+    # Hash of texts compared by Quom: the output and files of an index, duplicate files and comments. Lone surrogates
+    # (of files decoded with errors='surrogateescape') are hashed as they are.
+    def __init__(self):
+        self.__hash = hashlib.blake2b(digest_size=16)
+
+    def update(self, text: str):
+        self.__hash.update(text.encode('utf-8', 'surrogatepass'))
+
+    def digest(self) -> bytes:
+        return self.__hash.digest()
+
+    def hexdigest(self) -> str:
+        return self.__hash.hexdigest()
+
+
+def text_digest(text: str) -> bytes:
+    text_hash = TextHash()
+    text_hash.update(text)
+    return text_hash.digest()
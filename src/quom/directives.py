@@ -0,0 +1,73 @@
+import re
+from typing import List, Tuple, Union
+
+from .tokenizer import Token, CommentToken, PreprocessorToken, PreprocessorDefineToken, PreprocessorEndIfToken, \
+    PreprocessorIfNotDefinedToken, RemainingToken, WhitespaceToken
+
+CONDITIONAL_START_DIRECTIVES = ('if', 'ifdef', 'ifndef')
+
+# Name and first argument of a directive line.
+DIRECTIVE_LINE_REGEX = re.compile(r'[ \t\v\f]*#[ \t\v\f]*(\w*)[ \t\v\f]*(\w*)')
+
+
+def conditional_depth_change(token: Token) -> int:
+    if not isinstance(token, PreprocessorToken):
+        return 0
+    name = token.preprocessor_name
+    if name in CONDITIONAL_START_DIRECTIVES:
+        return 1
+    if name == 'endif':
+        return -1
+    return 0
+
+
+def macro_name(token: PreprocessorToken) -> str:
+    # First argument of a directive, e.g. the macro of #define or #ifndef.
+    for argument in token.preprocessor_arguments:
+        if isinstance(argument, RemainingToken):
+            return str(argument).strip()
+    return ''
+
+
+def find_include_guard(tokens: List[Token]) -> Union[Tuple[Token, Token], None]:
+    # The #ifndef and #endif of an include guard around the whole file.
+    significant = [token for token in tokens[1:-1] if not isinstance(token, (WhitespaceToken, CommentToken))]
+    if len(significant) < 3:
+        return None
+    first, second, last = significant[0], significant[1], significant[-1]
+    if not isinstance(first, PreprocessorIfNotDefinedToken) or not isinstance(second, PreprocessorDefineToken) or \
+            not isinstance(last, PreprocessorEndIfToken) or macro_name(first) != macro_name(second):
+        return None
+
+    # The #endif must close the #ifndef.
+    depth = 1
+    for token in significant[1:-1]:
+        depth += conditional_depth_change(token)
+        if depth <= 0:
+            return None
+    return first, last
+
+
+def has_include_guard(src: str) -> bool:
+    # Line based equivalent of find_include_guard for a source copied verbatim, which has no block comments, line
+    # splices and multi-line quotes.
+    significant = [line for line in src.splitlines() if line.strip() and not line.lstrip().startswith('//')]
+    if len(significant) < 3:
+        return False
+    first, second, last = (DIRECTIVE_LINE_REGEX.match(line) for line in (significant[0], significant[1],
+                                                                         significant[-1]))
+    if not first or not second or not last or first.group(1) != 'ifndef' or second.group(1) != 'define' or \
+            last.group(1) != 'endif' or first.group(2) != second.group(2):
+        return False
+
+    # The #endif must close the #ifndef.
+    depth = 1
+    for line in significant[1:-1]:
+        match = DIRECTIVE_LINE_REGEX.match(line)
+        if match and match.group(1) in CONDITIONAL_START_DIRECTIVES:
+            depth += 1
+        elif match and match.group(1) == 'endif':
+            depth -= 1
+            if depth <= 0:
+                return False
+    return True
@@ -0,0 +1,95 @@
+import binascii
+import re
+from typing import Dict, List
+
+from .quom_error import QuomError
+from .tokenizer import Token, CommentToken, QuoteToken, WhitespaceToken
+
+# Bytes per line of the initializer.
+BYTES_PER_LINE = 16
+EMBED_PARAMETERS = ('limit', 'prefix', 'suffix', 'if_empty')
+
+PARAMETER_NAME_REGEX = re.compile(r'__(\w+)__|(\w+)')
+INTEGER_REGEX = re.compile(r"(0[xX][0-9a-fA-F']+|0[bB][01']+|0[0-7']*|[1-9][0-9']*)[uUlLzZ]*")
+
+
+def format_bytes(data: bytes, bytes_per_line: int = BYTES_PER_LINE) -> str:
+    # The bytes as comma-separated initializer (0x2a, 0x00, ...) with a line break after every bytes_per_line bytes.
+    # The hex digits are put into a template with slice assignments instead of formatting every byte.
+    if not data:
+        return ''
+    digits = binascii.hexlify(data)
+    text = bytearray(b'0x00, ') * len(data)
+    text[2::6] = digits[0::2]
+    text[3::6] = digits[1::2]
+    text[6 * bytes_per_line - 1::6 * bytes_per_line] = b'\n' * (len(data) // bytes_per_line)
+    # Without the separator after the last byte.
+    return str(memoryview(text)[:-2], 'ascii')
+
+
+def parse_integer(text: str) -> int:
+    match = INTEGER_REGEX.fullmatch(text.strip())
+    if not match:
+        raise QuomError('The #embed limit must be an integer literal: "{}"'.format(text.strip()))
+    digits = match.group(1).replace("'", '')
+    if len(digits) > 1 and digits[0] == '0' and digits[1] not in 'xXbB':
+        return int(digits, 8)
+    return int(digits, 0)
+
+
+def parse_parameters(tokens: List[Token]) -> Dict[str, str]:
+    # The standard parameters of #embed (__limit__ is limit) with the text of their clause, e.g. {'limit': '4'}.
+    # Quotes are kept as they are and comments become spaces.
+    parameters = {}
+    name = ''
+    clause = []
+    depth = 0
+    for token in tokens:
+        if isinstance(token, QuoteToken):
+            units = [str(token)]
+        elif isinstance(token, (WhitespaceToken, CommentToken)):
+            units = [' ']
+        else:
+            units = str(token)
+        for unit in units:
+            if depth == 0:
+                if unit == '(':
+                    if not name:
+                        raise QuomError('#embed parameter without name.')
+                    depth = 1
+                elif unit == ' ':
+                    if name and name[-1] != ' ':
+                        name += ' '
+                elif name.endswith(' '):
+                    raise QuomError('#embed parameter without clause: "{}"'.format(name.strip()))
+                else:
+                    name += unit
+                continue
+
+            depth += unit == '('
+            depth -= unit == ')'
+            if depth:
+                clause.append(unit)
+                continue
+            match = PARAMETER_NAME_REGEX.fullmatch(name.strip())
+            parameter = match and (match.group(1) or match.group(2))
+            if parameter not in EMBED_PARAMETERS:
+                raise QuomError('Unsupported #embed parameter: "{}"'.format(name.strip()))
+            parameters[parameter] = ''.join(clause).strip()
+            name = ''
+            clause = []
+
+    if depth or name.strip():
+        raise QuomError('#embed parameter without clause: "{}"'.format(name.strip()))
+    return parameters
+
+
+def embed_text(data: bytes, parameters: Dict[str, str]) -> str:
+    # Replacement of an #embed directive: prefix, the bytes and suffix or if_empty for no bytes.
+    if 'limit' in parameters:
+        data = data[:parse_integer(parameters['limit'])]
+    if not data:
+        return parameters.get('if_empty', '')
+    prefix = parameters.get('prefix', '')
+    suffix = parameters.get('suffix', '')
+    return prefix + format_bytes(data) + suffix
@@ -0,0 +1,109 @@
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+from .digest import text_digest
+from .tokenizer import tokenize, Token
+
+Signature = Tuple[int, int, int, int]
+
+
+def stat_signature(file_path: Path) -> Union[Signature, None]:
+    # Device, inode, size and modification time of a file or None if it does not exist.
+    try:
+        stat = os.stat(str(file_path))
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def read_file(file_path: Path, encoding: str) -> Tuple[Signature, str]:
+    # Same as Path.read_text, but also returns the stat signature of the read file.
+    fd = os.open(str(file_path), os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    with open(fd, encoding=encoding) as file:
+        stat = os.fstat(fd)
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns), file.read()
+
+
+class CachedFile:
+    def __init__(self, signature: Signature, encoding: str, src: str):
+        self.signature = signature
+        self.encoding = encoding
+        self.src = src
+        self.tokens = None
+        self.digest = None
+
+
+class FileCache:
+    # Keeps the include resolution, content and tokens of files between runs of Quom (e.g. of a persistent worker).
+    # Every entry is validated with the stat signature of the file before it is used, entries of changed or removed
+    # files are dropped. At most max_files files are kept, the least recently used ones are dropped first.
+    def __init__(self, max_files: int = 4096):
+        self.__max_files = max_files
+        self.__resolved: Dict[Tuple[str, Path], Tuple[Signature, Path]] = OrderedDict()
+        self.__files: Dict[Path, CachedFile] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, file_path: Path) -> Union[Path, None]:
+        # Resolved path of the file or None if it does not exist. Relative paths depend on the working directory.
+        signature = stat_signature(file_path)
+        key = (os.getcwd(), file_path)
+        if signature is None:
+            self.__resolved.pop(key, None)
+            return None
+        entry = self.__resolved.get(key)
+        if entry and entry[0] == signature:
+            self.__resolved.move_to_end(key)
+            return entry[1]
+        resolved = file_path.resolve()
+        self.__store(self.__resolved, key, (signature, resolved))
+        return resolved
+
+    def read_text(self, file_path: Path, encoding: str, prefetched: Tuple[Signature, str] = None) -> str:
+        # The prefetched signature and content of a read ahead are used if the file has not changed since.
+        signature = stat_signature(file_path)
+        cached_file = self.__files.get(file_path)
+        if cached_file and signature and cached_file.signature == signature and cached_file.encoding == encoding:
+            self.hits += 1
+            self.__files.move_to_end(file_path)
+            return cached_file.src
+
+        self.misses += 1
+        # The entry of a changed file is replaced, the one of a removed file dropped.
+        self.__files.pop(file_path, None)
+        if prefetched and prefetched[0] == signature:
+            src = prefetched[1]
+        else:
+            src = file_path.read_text(encoding=encoding)
+        self.__store(self.__files, file_path, CachedFile(signature, encoding, src))
+        return src
+
+    def tokenize(self, file_path: Path, src: str) -> List[Token]:
+        # Tokens of the source last returned by read_text.
+        cached_file = self.__files.get(file_path)
+        if not cached_file or cached_file.src is not src:
+            return tokenize(src)
+        if cached_file.tokens is None:
+            cached_file.tokens = tokenize(src)
+        return cached_file.tokens
+
+    def digest(self, file_path: Path, src: str) -> bytes:
+        # Digest of the source last returned by read_text.
+        cached_file = self.__files.get(file_path)
+        if not cached_file or cached_file.src is not src:
+            return text_digest(src)
+        if cached_file.digest is None:
+            cached_file.digest = text_digest(src)
+        return cached_file.digest
+
+    def clear(self):
+        self.__resolved.clear()
+        self.__files.clear()
+
+    def __store(self, entries: OrderedDict, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.__max_files:
+            entries.popitem(last=False)
@@ -0,0 +1,140 @@
+import os
+import posixpath
+import tarfile
+import zipfile
+from pathlib import Path, PurePath
+from typing import Dict, Tuple, Union
+
+from .file_cache import Signature, read_file
+from .quom_error import QuomError
+
+
+class FileSystem:
+    # Access of Quom to the files: include resolution, source file discovery and reading. Override to read from
+    # somewhere else than the file system of the OS.
+
+    def resolve(self, file_path: Path) -> Union[Path, None]:
+        # Absolute, normalized path of the file or None if it does not exist.
+        raise NotImplementedError()
+
+    def read_text(self, file_path: Path, encoding: str) -> str:
+        raise NotImplementedError()
+
+    def read_bytes(self, file_path: Path) -> bytes:
+        # Content of a resource of #embed.
+        raise NotImplementedError()
+
+    def read(self, file_path: Path, encoding: str) -> Tuple[Union[Signature, None], str]:
+        # Content of the file with the stat signature of the read file, if known.
+        return None, self.read_text(file_path, encoding)
+
+    def size(self, file_path: Path) -> int:
+        # Size of the file or 0 if unknown.
+        return 0
+
+
+class OsFileSystem(FileSystem):
+    def resolve(self, file_path: Path) -> Union[Path, None]:
+        return file_path.resolve() if file_path.exists() else None
+
+    def read_text(self, file_path: Path, encoding: str) -> str:
+        return file_path.read_text(encoding=encoding)
+
+    def read_bytes(self, file_path: Path) -> bytes:
+        return file_path.read_bytes()
+
+    def read(self, file_path: Path, encoding: str) -> Tuple[Union[Signature, None], str]:
+        return read_file(file_path, encoding)
+
+    def size(self, file_path: Path) -> int:
+        try:
+            return file_path.stat().st_size
+        except OSError:
+            return 0
+
+
+def normalize_path(file_path: Union[PurePath, str]) -> str:
+    # Absolute POSIX path, relative paths are relative to the root.
+    return posixpath.normpath('/' + PurePath(file_path).as_posix().lstrip('/'))
+
+
+class MemoryFileSystem(FileSystem):
+    # Files of a dict with the path as key and the content (text or bytes in the encoding of Quom) as value. Relative
+    # paths, of the dict as well as of Quom, are relative to the root.
+    def __init__(self, files: Dict[Union[PurePath, str], Union[str, bytes]]):
+        self.__files = {normalize_path(file_path): content for file_path, content in files.items()}
+
+    def resolve(self, file_path: Path) -> Union[Path, None]:
+        normalized_path = normalize_path(file_path)
+        return Path(normalized_path) if normalized_path in self.__files else None
+
+    def read_text(self, file_path: Path, encoding: str) -> str:
+        content = self.__content(file_path)
+        return content.decode(encoding) if isinstance(content, bytes) else content
+
+    def read_bytes(self, file_path: Path) -> bytes:
+        # Text is encoded as UTF-8.
+        content = self.__content(file_path)
+        return content if isinstance(content, bytes) else content.encode('utf-8')
+
+    def size(self, file_path: Path) -> int:
+        try:
+            return len(self.__content(file_path))
+        except FileNotFoundError:
+            return 0
+
+    def __content(self, file_path: Path) -> Union[str, bytes]:
+        try:
+            return self.__files[normalize_path(file_path)]
+        except KeyError:
+            raise FileNotFoundError("No such file: '{}'".format(file_path)) from None
+
+
+class OverlayFileSystem(FileSystem):
+    # Files of a dict with the path as key and the content as value in front of another file system, by default the one
+    # of the OS (e.g. the main file read from stdin). Relative paths are relative to the working directory.
+    def __init__(self, files: Dict[Union[PurePath, str], str], file_system: FileSystem = None):
+        self.__files = {absolute_path(file_path): content for file_path, content in files.items()}
+        self.__file_system = file_system or OsFileSystem()
+
+    def resolve(self, file_path: Path) -> Union[Path, None]:
+        path = absolute_path(file_path)
+        return path if path in self.__files else self.__file_system.resolve(file_path)
+
+    def read_text(self, file_path: Path, encoding: str) -> str:
+        content = self.__files.get(absolute_path(file_path))
+        return content if content is not None else self.__file_system.read_text(file_path, encoding)
+
+    def read_bytes(self, file_path: Path) -> bytes:
+        content = self.__files.get(absolute_path(file_path))
+        return content.encode('utf-8') if content is not None else self.__file_system.read_bytes(file_path)
+
+    def read(self, file_path: Path, encoding: str) -> Tuple[Union[Signature, None], str]:
+        content = self.__files.get(absolute_path(file_path))
+        return (None, content) if content is not None else self.__file_system.read(file_path, encoding)
+
+    def size(self, file_path: Path) -> int:
+        content = self.__files.get(absolute_path(file_path))
+        return len(content) if content is not None else self.__file_system.size(file_path)
+
+
+def absolute_path(file_path: Union[PurePath, str]) -> Path:
+    # Absolute, normalized path without resolving symbolic links, the file does not need to exist.
+    return Path(os.path.normpath(str(Path.cwd() / file_path)))
+
+
+class ArchiveFileSystem(MemoryFileSystem):
+    # Files of a zip or (compressed) tar archive, e.g. of a release. Paths are relative to the root of the archive.
+    # The files are read into memory at once, compressed tar archives can't be read at random.
+    def __init__(self, archive_path: Union[Path, str]):
+        super().__init__(read_archive(Path(archive_path)))
+
+
+def read_archive(archive_path: Path) -> Dict[str, bytes]:
+    if zipfile.is_zipfile(str(archive_path)):
+        with zipfile.ZipFile(str(archive_path)) as archive:
+            return {info.filename: archive.read(info) for info in archive.infolist() if not info.is_dir()}
+    if tarfile.is_tarfile(str(archive_path)):
+        with tarfile.open(str(archive_path)) as archive:
+            return {info.name: archive.extractfile(info).read() for info in archive if info.isfile()}
+    raise QuomError('Not a zip or tar archive: "{}"'.format(archive_path))
@@ -0,0 +1,34 @@
+from typing import List
+
+from .directives import conditional_depth_change, find_include_guard
+from .tokenizer import Token, PreprocessorIncludeToken
+
+
+class IncludeHoister:
+    # Collects the system includes outside of conditional blocks, include guards don't count as such.
+    def __init__(self):
+        self.includes: List[str] = []
+        self.__depth = 0
+        self.__guard_tokens = set()
+
+    def scan_file(self, tokens: List[Token]):
+        guard = find_include_guard(tokens)
+        if guard:
+            self.__guard_tokens.update(guard)
+
+    def hoist(self, token: Token) -> bool:
+        # Returns True if the token is a system include which was collected and must not be written.
+        if isinstance(token, PreprocessorIncludeToken) and not token.is_local_include:
+            if self.__depth > 0:
+                return False
+            include = '#include <{}>'.format(token.path)
+            if include not in self.includes:
+                self.includes.append(include)
+            return True
+
+        if token not in self.__guard_tokens:
+            self.__depth = max(0, self.__depth + conditional_depth_change(token))
+        return False
+
+    def text(self) -> str:
+        return ''.join(include + '\n' for include in self.includes)
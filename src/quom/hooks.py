@@ -0,0 +1,82 @@
+from pathlib import Path
+from typing import Dict, List, Union
+
+
+class FileStats:
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        # Timestamps (time.perf_counter) of the first and last processing step, including included files.
+        self.start = 0.0
+        self.end = 0.0
+        # Durations in seconds, excluding included files.
+        self.resolve_time = 0.0
+        self.read_time = 0.0
+        self.tokenize_time = 0.0
+        self.emit_time = 0.0
+        # Time spent in every transform stage by its name.
+        self.transform_times: Dict[str, float] = {}
+        # Number of top level tokens by token type name.
+        self.token_counts: Dict[str, int] = {}
+        # Characters read and written, the subtree includes the included files.
+        self.chars_in = 0
+        self.chars_out = 0
+        self.subtree_chars_out = 0
+        # Characters written by token kind (code, comment and whitespace) and lines, excluding included files.
+        self.chars_out_by_kind: Dict[str, int] = {}
+        self.lines_out = 0
+        self.subtree_lines_out = 0
+        # Bytes written in the encoding of Quom, the subtree includes the included files.
+        self.bytes_out = 0
+        self.subtree_bytes_out = 0
+        self.verbatim = False
+        # The already processed file with the same content, this one was skipped.
+        self.duplicate_of: Union[Path, None] = None
+        # Dropped repeated comments (e.g. license banners) and their characters, with the rest of their lines.
+        self.duplicate_comments = 0
+        self.duplicate_comment_chars = 0
+
+    @property
+    def transform_time(self) -> float:
+        return sum(self.transform_times.values())
+
+    @property
+    def time(self) -> float:
+        return self.resolve_time + self.read_time + self.tokenize_time + self.transform_time + self.emit_time
+
+
+class QuomHooks:
+    # Callbacks invoked by Quom while processing. Override the ones of interest.
+
+    # Measure every file for on_file_end, otherwise only the path of its FileStats is set. Measuring slows down Quom.
+    file_stats = True
+
+    def on_file_start(self, file_path: Path):
+        pass
+
+    def on_file_end(self, file_path: Path, stats: FileStats):
+        pass
+
+    def on_include_resolved(self, include_path: Path, file_path: Path, including_file_path: Union[Path, None]):
+        # Called for every resolved file, even if it was already processed. The including file is None for the
+        # main file and the source files.
+        pass
+
+    def on_resource_read(self, file_path: Path, including_file_path: Path, size: int):
+        # Called for every resource of #embed with its size in bytes, its data is part of the output of the including
+        # file.
+        pass
+
+
+class InputFiles(QuomHooks):
+    # Records the paths of the processed files, without measuring them.
+    file_stats = False
+
+    def __init__(self):
+        self.file_paths: List[Path] = []
+
+    def on_file_start(self, file_path: Path):
+        self.file_paths.append(file_path)
+
+    def on_resource_read(self, file_path: Path, including_file_path: Path, size: int):
+        if file_path not in self.file_paths:
+            self.file_paths.append(file_path)
@@ -0,0 +1,132 @@
+import json
+from pathlib import Path
+from typing import List, TextIO, Union
+
+from .digest import TextHash, text_digest
+
+INDEX_VERSION = 1
+
+
+def index_path(output_path: Path) -> Path:
+    # The sidecar index of an output: lib.hpp -> lib.hpp.quom-index
+    return output_path.with_name(output_path.name + '.quom-index')
+
+
+class HashingWriter:
+    # Counts and hashes the output, the index is only used together with the output it was written with.
+    def __init__(self, dst: TextIO):
+        self.dst = dst
+        self.count = 0
+        self.__hash = TextHash()
+
+    def write(self, text: str):
+        self.count += len(text)
+        self.__hash.update(text)
+        self.dst.write(text)
+
+    def hexdigest(self) -> str:
+        return self.__hash.hexdigest()
+
+
+class OutputIndex:
+    # Where the output of every file (including its includes) starts and ends in the output, with the state of the
+    # output (continuous line breaks and the pending token) before and after it. Everything the output of a file
+    # depends on is logged as events, in the order Quom processed them:
+    #   ['include', relative path, include path, resolved path, already processed]
+    #   ['file', path, stat signature or None, content digest]
+    #   ['source', header path, found source file path or None]
+    # A file can be copied from the previous output, if the events of it and its includes give the same result again
+    # and the output state before it is the same.
+    def __init__(self, previous_output: str = None, previous: dict = None):
+        self.previous_output = previous_output
+        self.__previous = previous if previous_output is not None else None
+        self.__previous_segments = {}
+        self.key = None
+        self.digest = None
+        self.events: List[list] = []
+        self.segments: List[dict] = []
+        self.__open_segments: List[dict] = []
+
+    def begin(self, key: list):
+        # Segments of another configuration are useless.
+        if self.__previous and self.__previous['key'] != key:
+            self.__previous = None
+        self.__previous_segments = {segment['path']: i for i, segment in enumerate(self.__previous['segments'])} \
+            if self.__previous else {}
+        self.key = key
+        self.events = []
+        self.segments = []
+        self.__open_segments = []
+
+    def find(self, file_path: Path) -> Union[dict, None]:
+        i = self.__previous_segments.get(str(file_path))
+        return self.__previous['segments'][i] if i is not None else None
+
+    def previous_events(self, segment: dict) -> List[list]:
+        start, end = segment['events']
+        return self.__previous['events'][start:end]
+
+    def add_event(self, event: list):
+        self.events.append(event)
+
+    def open_segment(self, file_path: Path, is_source_file: bool, is_main_header: bool, state: list, count: int):
+        segment = {'path': str(file_path), 'source': is_source_file, 'main': is_main_header, 'entry': state,
+                   'exit': None, 'stitch': False, 'flushed': False, 'start': count, 'end': count,
+                   'events': [len(self.events), len(self.events)]}
+        self.segments.append(segment)
+        self.__open_segments.append(segment)
+
+    def close_segment(self, state: list, count: int):
+        segment = self.__open_segments.pop()
+        segment['exit'] = state
+        # The first write of a file is the pending token before it, which is not part of its output.
+        if count > segment['start']:
+            segment['flushed'] = True
+            segment['start'] += len(segment['entry'][1])
+        segment['end'] = count
+        segment['events'][1] = len(self.events)
+
+    def invalidate_open_segments(self):
+        # The output of the open files depends on something not logged (e.g. the source files stitched into them).
+        for segment in self.__open_segments:
+            segment['stitch'] = True
+
+    def copy_segment(self, segment: dict, count: int) -> str:
+        # Takes over the previous segment and the ones of its includes, with their events, and returns its output.
+        start, end = segment['events']
+        event_offset = len(self.events) - start
+        output_offset = count - segment['start']
+        self.events.extend(self.__previous['events'][start:end])
+        for previous_segment in self.__previous['segments'][self.__previous_segments[segment['path']]:]:
+            if previous_segment['events'][0] >= end:
+                break
+            copied_segment = dict(previous_segment)
+            copied_segment['start'] += output_offset
+            copied_segment['end'] += output_offset
+            copied_segment['events'] = [x + event_offset for x in previous_segment['events']]
+            self.segments.append(copied_segment)
+        return self.previous_output[segment['start']:segment['end']]
+
+    def finish(self, digest: str):
+        self.digest = digest
+
+    def save(self, file_path: Path):
+        with file_path.open('w', encoding='utf-8') as file:
+            json.dump({'version': INDEX_VERSION, 'key': self.key, 'digest': self.digest, 'events': self.events,
+                       'segments': self.segments}, file, separators=(',', ':'))
+
+
+def load_index(file_path: Path, output_path: Path, encoding: str) -> OutputIndex:
+    # The index of the previous output, without anything to copy if one of them is missing, unreadable or they do not
+    # belong together.
+    try:
+        with file_path.open(encoding='utf-8') as file:
+            previous = json.load(file)
+        with output_path.open(encoding=encoding, newline='') as file:
+            previous_output = file.read()
+    except (OSError, ValueError):
+        return OutputIndex()
+    if not isinstance(previous, dict) or previous.get('version') != INDEX_VERSION or \
+            previous.get('digest') != text_digest(previous_output).hex():
+        return OutputIndex()
+    return OutputIndex(previous_output, previous)
@@ -0,0 +1,78 @@
+import re
+
+from .tokenizer import Token, CommentToken, PreprocessorToken, PreprocessorIncludeToken, WhitespaceToken, \
+    LinebreakWhitespaceToken
+from .tokenizer.iterator import RawIterator, Span
+
+MINIFY_COMMENTS = 1
+MINIFY_WHITESPACE = 2
+
+SPLICE_REGEX = re.compile(r'\\[\r\n]')
+
+
+class Minifier:
+    # Level 1 removes comments, empty lines and trailing whitespace. Level 2 also reduces every other whitespace to
+    # one space and removes the indentation. Literals and the tokens of directives are kept, a removed comment becomes
+    # a space, since the compiler treats it as one.
+    def __init__(self, level: int, keep_comment_format: str = None):
+        self.__level = level
+        # Comments matching this regex (e.g. licenses) are kept.
+        self.__keep_comment_format = re.compile(keep_comment_format) if keep_comment_format else None
+        # Whitespace and comments since the last written token, written in front of the next one on the same line.
+        self.__whitespace = ''
+
+    def reset(self):
+        self.__whitespace = ''
+
+    def minify(self, token: Token, at_line_start: bool) -> str:
+        if isinstance(token, PreprocessorIncludeToken):
+            return self.__minify_include(token, at_line_start)
+
+        if isinstance(token, PreprocessorToken):
+            # Minify the directive token by token.
+            text = ''
+            for preprocessor_token in token.preprocessor_tokens[1:-1]:
+                text += self.minify(preprocessor_token, at_line_start and not text)
+            return text
+
+        if isinstance(token, LinebreakWhitespaceToken):
+            # Drop trailing whitespace and empty lines.
+            self.__whitespace = ''
+            return '' if at_line_start else token.raw
+
+        if isinstance(token, CommentToken) and not self.__is_kept_comment(token):
+            if not self.__whitespace and not at_line_start:
+                self.__whitespace = ' '
+            return ''
+
+        if isinstance(token, WhitespaceToken):
+            # Whitespace with a line splice is reduced too, otherwise the splice could join the next line.
+            if self.__level >= MINIFY_WHITESPACE or SPLICE_REGEX.search(token.raw):
+                if not at_line_start:
+                    self.__whitespace = ' '
+            else:
+                self.__whitespace += token.raw
+            return ''
+
+        return self.__code(token.raw, at_line_start)
+
+    def __code(self, raw: str, at_line_start: bool) -> str:
+        whitespace = self.__whitespace
+        self.__whitespace = ''
+        if at_line_start and self.__level >= MINIFY_WHITESPACE:
+            whitespace = ''
+        return whitespace + raw
+
+    def __minify_include(self, token: PreprocessorIncludeToken, at_line_start: bool) -> str:
+        # The path of an include is not a token of its own, only a trailing comment is removed.
+        raw = token.raw
+        line_break = token.preprocessor_tokens[-2]
+        comment = token.preprocessor_tokens[-3] if isinstance(line_break, LinebreakWhitespaceToken) else line_break
+        if isinstance(comment, CommentToken) and not self.__is_kept_comment(comment):
+            raw = str(Span(RawIterator(token.start), RawIterator(comment.start))).rstrip(' \t\v\f')
+            if isinstance(line_break, LinebreakWhitespaceToken):
+                raw += line_break.raw
+        return self.__code(raw, at_line_start)
+
+    def __is_kept_comment(self, token: CommentToken) -> bool:
+        return bool(self.__keep_comment_format and self.__keep_comment_format.search(str(token.content)))
@@ -1,16 +1,48 @@
+import fnmatch
 import re
+from collections import Counter, deque
+from io import StringIO
 from pathlib import Path
-from queue import Queue
-from typing import TextIO, Union, List
-
+from time import perf_counter
+from typing import Dict, Pattern, TextIO, Tuple, Union, List
+
+from .conditionals import Conditionals, CONDITIONAL_DIRECTIVES
+from .dedupe_comments import CommentDeduplicator
+from .digest import text_digest
+from .directives import conditional_depth_change, find_include_guard, has_include_guard
+from .embed import embed_text, parse_parameters
+from .file_cache import FileCache, stat_signature
+from .file_system import FileSystem, OsFileSystem
+from .hooks import QuomHooks, FileStats
+from .hoist import IncludeHoister
+from .incremental import HashingWriter, OutputIndex
+from .minify import Minifier
 from .quom_error import QuomError
+from .read_ahead import ReadAhead
+from .source_map import MappingWriter, SourceMap, count_line_breaks, line_directive
 from .tokenizer import tokenize, Token, CommentToken, PreprocessorToken, PreprocessorIfNotDefinedToken, \
-    PreprocessorDefineToken, PreprocessorEndIfToken, PreprocessorIncludeToken, PreprocessorPragmaOnceToken, \
-    RemainingToken, LinebreakWhitespaceToken, EmptyToken, StartToken, EndToken, WhitespaceToken
+    PreprocessorDefineToken, PreprocessorEmbedToken, PreprocessorEndIfToken, PreprocessorIncludeToken, \
+    PreprocessorPragmaOnceToken, RemainingToken, LinebreakWhitespaceToken, StartToken, EndToken, WhitespaceToken
+from .transform import Transform, apply_transform
 
 CONTINUOUS_LINE_BREAK_START = 0
 CONTINUOUS_BREAK_REACHED = 3
 
+LINE_BREAK_REGEX = re.compile(r'\r\n|\r|\n')
+LEADING_LINE_BREAKS_REGEX = re.compile(r'(?:\r\n|\r|\n)+')
+TRAILING_LINE_BREAKS_REGEX = re.compile(r'(?:\r\n|\r|\n)+\Z')
+CONTINUOUS_LINE_BREAKS_REGEX = re.compile(r'((?:\r\n|\r|\n){2})(?:\r\n|\r|\n)+')
+
+# Constructs which would need the tokenizer to be copied byte-identical: C-style comments, raw strings and line
+# splices may span line breaks that must not be trimmed.
+VERBATIM_BLOCKER_REGEX = re.compile(r'/\*|R"|\\[\r\n]')
+# Mirrors how the tokenizer pairs quotes: comments, string and char literals and numbers with digit separators.
+VERBATIM_QUOTE_REGEX = re.compile(r'//[^\r\n]*|"(?:[^"\\]|\\[\s\S])*"|\'(?:[^\'\\]|\\[\s\S])*\'|'
+                                  r'(?:(?<![^ \t\v\f\r\n"\'])\d|\.\d)(?:[\w+\-.]|\'(?=[\w\'.]))*|["\']')
+VERBATIM_DIRECTIVE_REGEX = re.compile(r'#[ \t\v\f]*(\w*)([ \t\v\f]*)(\w+|.?)')
+LAST_LINE_REGEX = re.compile(r'([^\r\n]*)(\r\n|\r|\n)?\Z')
+WHITESPACE_REGEX = re.compile(r'\s')
+
 
 def find_token(tokens: List[Token], token_type: any):
     for i, token in enumerate(tokens):
@@ -26,76 +58,585 @@ def contains_only_whitespace_and_comment_tokens(tokens: List[Token]):
     return True
 
 
-class Quom:
-    def __init__(self, src_file_path: Union[Path, str], dst: TextIO, stitch_format: str = None,
-                 include_guard_format: str = None, trim: bool = True,
+def is_directive_line(line: str) -> bool:
+    # Checks if the tokenizer puts the line break after this line into a preprocessor token.
+    line = line.lstrip(' \t\v\f')
+    if not line.startswith('#'):
+        return False
+    name, _, following = VERBATIM_DIRECTIVE_REGEX.match(line).groups()
+    # Pragmas (except once) end after their first argument.
+    return name != 'pragma' or following in ('', '/')
+
+
+def can_copy_verbatim(src: str, stitch_format: Union[str, None], check_include_guard: bool,
+                      check_conditionals: bool = False) -> bool:
+    # Checks without tokenizing if the source contains nothing Quom would change.
+    if (stitch_format is not None and stitch_format in src) or VERBATIM_BLOCKER_REGEX.search(src):
+        return False
+
+    pos = src.find('#')
+    while pos != -1:
+        name, separator, following = VERBATIM_DIRECTIVE_REGEX.match(src, pos).groups()
+        # The tokenizer may split or join a directive name directly followed by something else (e.g. #pragma#define).
+        if name and not separator and following:
+            return False
+        if (name == 'include' and following == '"') or (name == 'pragma' and following == 'once') or \
+                name == 'embed' or \
+                (check_include_guard and name in ('ifndef', 'define', 'endif')) or \
+                (check_conditionals and name in CONDITIONAL_DIRECTIVES):
+            return False
+        # The tokenizer scans the directive name like a remaining token, even if it starts a quote or number.
+        if name[:1].isdigit() or (not name and following in ('"', "'")):
+            return False
+        pos = src.find('#', pos + 1)
+
+    # The last line break belongs to a directive on the last line, which must be recognizable without tokenizing.
+    last_line = LAST_LINE_REGEX.search(src).group(1)
+    if '#' in last_line and not last_line.lstrip(' \t\v\f').startswith('#'):
+        return False
+
+    # Quotes spanning line breaks (or not terminated at all) must be handled by the tokenizer.
+    for match in VERBATIM_QUOTE_REGEX.finditer(src):
+        quote = match.group()
+        if quote[0] in '"\'' and (len(quote) == 1 or '\n' in quote or '\r' in quote):
+            return False
+    return True
+
+
+def compile_include_globs(patterns: List[str]) -> Union[Pattern, None]:
+    # One regex for all patterns, a pattern without a slash also matches the file name of the include path.
+    regexes = []
+    for pattern in patterns:
+        regex = fnmatch.translate(pattern)
+        regexes.append(regex if '/' in pattern else r'(?:.*/)?' + regex)
+    return re.compile('|'.join(regexes)) if regexes else None
+
+
+def token_kind(token: Token) -> str:
+    if isinstance(token, CommentToken):
+        return 'comment'
+    if isinstance(token, WhitespaceToken):
+        return 'whitespace'
+    return 'code'
+
+
+def verbatim_kinds(src: str) -> Dict[str, int]:
+    # Characters by token kind of a source which can be copied verbatim (no C-style comments), without tokenizing it.
+    # Whitespace of literals is counted as whitespace.
+    comments = [match.group() for match in VERBATIM_QUOTE_REGEX.finditer(src) if match.group().startswith('//')]
+    comment = sum(len(x) for x in comments)
+    whitespace = len(WHITESPACE_REGEX.findall(src)) - sum(len(WHITESPACE_REGEX.findall(x)) for x in comments)
+    return {'code': len(src) - comment - whitespace, 'comment': comment, 'whitespace': whitespace}
+
+
+def is_included_once(tokens: List[Token]) -> bool:
+    # Checks if the file has a #pragma once or an include guard around the whole file.
+    return any(isinstance(token, PreprocessorPragmaOnceToken) for token in tokens) or \
+        find_include_guard(tokens) is not None
+
+
+class OutputState:
+    # Everything Quom needs to continue writing an output after writing to another one.
+    def __init__(self, dst: TextIO, processed_files: set, cont_lb: int, macros: Union[tuple, None]):
+        self.save(dst, processed_files, cont_lb, '', False, macros)
+
+    def save(self, dst: TextIO, processed_files: set, cont_lb: int, prev_raw: str, prev_is_line_break: bool,
+             macros: Union[tuple, None]):
+        self.dst = dst
+        self.processed_files = processed_files
+        self.cont_lb = cont_lb
+        self.prev_raw = prev_raw
+        self.prev_is_line_break = prev_is_line_break
+        # Macros of the conditionals, see Conditionals.save_macros.
+        self.macros = macros
+
+
+class CountingWriter:
+    def __init__(self, dst: TextIO):
+        self.dst = dst
+        self.count = 0
+
+    def write(self, text: str):
+        self.count += len(text)
+        self.dst.write(text)
+
+
+class QuomSession:
+    # Configuration and files kept between runs, e.g. of a tool amalgamating again after every change. Resolved
+    # includes, contents and tokens are kept in the cache (an own one, if none is given and keep_files is set) and
+    # validated before they are used again. Every run starts with an empty output state.
+    def __init__(self, stitch_format: str = None, include_guard_format: str = None, trim: bool = True,
                  include_directories: List[Union[Path, str]] = None,
                  relative_source_directories: List[Union[Path]] = None,
                  source_directories: List[Union[Path]] = None,
-                 encoding: str = 'utf-8'):
-        self.__dst = dst
+                 encoding: str = 'utf-8', hooks: QuomHooks = None, cache: FileCache = None, read_ahead: int = 0,
+                 minify: int = 0, keep_comment_format: str = None, hoist_includes: bool = False,
+                 hoist_format: str = None, defines: List[str] = None, undefines: List[str] = None,
+                 dedupe_content: bool = False, transforms: List[Transform] = None, file_system: FileSystem = None,
+                 keep_files: bool = True, line_directives: bool = False, dedupe_comments: bool = False,
+                 dedupe_comment_format: str = None, keep_includes: List[str] = None):
+        self.__hoist_includes = hoist_includes
+        self.__hoist_format = hoist_format
+        self.__hooks = hooks
+        # Only measure the files and the output if the hooks are interested.
+        self.__file_stats = hooks is not None and hooks.file_stats
+        # Files are resolved and read with the file system, the cache only works with the one of the OS.
+        self.__file_system = file_system or OsFileSystem()
+        is_os_file_system = isinstance(self.__file_system, OsFileSystem)
+        if cache and not is_os_file_system:
+            raise QuomError('The file cache only works with the file system of the OS.')
+        self.__cache = cache or (FileCache() if keep_files and is_os_file_system else None)
         self.__stitch_format = stitch_format
         self.__include_guard_format = re.compile('^{}$'.format(include_guard_format)) if include_guard_format else None
         self.__trim = trim
         self.__include_directories = [Path(x) for x in include_directories] if include_directories else []
+        # Local includes with a path matching one of these globs are written as they are, the files are not read.
+        self.__keep_include_regex = compile_include_globs(keep_includes or [])
         self.__relative_source_directories = relative_source_directories if relative_source_directories else [] \
             if source_directories else [Path('.')]
         self.__source_directories = source_directories if source_directories else [Path('.')]
         self.__encoding = encoding
+        self.__read_ahead_workers = read_ahead
+
+        # Minify the output with the given level, see Minifier.
+        self.__minifier = Minifier(minify, keep_comment_format) if minify else None
+        # Remove the branches of conditional blocks which are dead with these macros (NAME or NAME=VALUE) defined and
+        # undefined, see Conditionals.
+        self.__defines = defines or []
+        self.__undefines = undefines or []
+
+        # Stages applied in the given order to the tokens of every file before they are written, see Transform.
+        self.__transforms = transforms or []
+        self.__dedupe_content = dedupe_content
+        # Write repeated leading comment blocks (and comments matching the regex) once, see CommentDeduplicator.
+        self.__comment_deduplicator = CommentDeduplicator(dedupe_comment_format) \
+            if dedupe_comments or dedupe_comment_format else None
+
+        # Minifying, hoisting, transforming and deduplicating comments need the tokens of every file.
+        self.__copy_verbatim = not minify and not hoist_includes and not self.__transforms and \
+            not self.__comment_deduplicator
+        # Write a #line directive before every line of the main output which does not continue the line before.
+        self.__line_directives = line_directives
+
+        # Everything the output of a file depends on, besides the files, include resolutions, found source files and
+        # the output state logged in an OutputIndex. Options which carry state from file to file are not supported.
+        self.__index_key = [trim, stitch_format, include_guard_format, encoding,
+                            [str(x) for x in self.__include_directories],
+                            [str(x) for x in self.__relative_source_directories],
+                            [str(x) for x in self.__source_directories], keep_includes or []]
+        self.__supports_index = not minify and not hoist_includes and not defines and not undefines and \
+            not dedupe_content and not self.__transforms and not self.__comment_deduplicator
+
+    @property
+    def cache(self) -> Union[FileCache, None]:
+        return self.__cache
+
+    def run(self, src_file_path: Union[Path, str], dst: TextIO, source_dsts: List[TextIO] = None,
+            header_include: str = None, index: OutputIndex = None, source_map: SourceMap = None):
+        # Write the source files balanced to these outputs instead of the end of dst. Every output includes the header
+        # output under the given path.
+        if source_dsts and self.__stitch_format is not None:
+            raise QuomError('Source files can either be stitched or written to separate outputs.')
+        # Copy unchanged files from the previous output of the index and log the new output to it.
+        if index and (source_dsts or not self.__supports_index or source_map or self.__line_directives):
+            raise QuomError('Incremental output does not work with source outputs, minifying, hoisting, '
+                            'conditionals, deduplication, transforms, source maps or line directives.')
+        self.__index = index
+        if index:
+            index.begin(self.__index_key)
+        self.__source_dsts = [CountingWriter(x) if self.__file_stats else x for x in source_dsts] \
+            if source_dsts else None
+        self.__header_include = header_include
+
+        # Hoisted includes are only known at the end, the output is buffered until then.
+        self.__hoister = IncludeHoister() if self.__hoist_includes else None
+        self.__hoist_buffer = StringIO() if self.__hoist_includes else None
+        self.__hoist_position = None
+        # Map the lines of the main output to the input lines, see SourceMap.
+        self.__source_map = source_map if source_map is not None or not self.__line_directives else SourceMap()
+        self.__mapping_writer = MappingWriter(self.__hoist_buffer or dst, self.__source_map, self.__line_directives) \
+            if self.__source_map is not None else None
+        self.__map_files = []
+        self.__hoist_line = 1
+        # The token writer is chosen once, the default one has no checks of the disabled features.
+        self.__token_writer = self.__write_token if self.__file_stats or self.__hoister or self.__minifier or \
+            self.__comment_deduplicator or self.__mapping_writer else self.__write_plain_token
+        output = self.__mapping_writer or self.__hoist_buffer or dst
+        self.__dst = HashingWriter(dst) if index else CountingWriter(output) if self.__file_stats else output
+
+        if self.__minifier:
+            self.__minifier.reset()
+        if self.__comment_deduplicator:
+            self.__comment_deduplicator.reset()
+        self.__conditionals = Conditionals(self.__defines, self.__undefines) \
+            if self.__defines or self.__undefines else None
 
         self.__processed_files = set()
-        self.__source_files = Queue()
+        # Paths of the files by content hash and if they are included once, to skip identical copies of them.
+        self.__unique_files: Dict[bytes, list] = {} if self.__dedupe_content else None
+        self.__source_files = deque()
         self.__cont_lb = CONTINUOUS_LINE_BREAK_START
-        self.__prev_token = EmptyToken()
-
+        self.__prev_raw = ''
+        self.__prev_is_line_break = False
+        self.__stats_stack = []
+        self.__output = None
+
+        # Read included files with the given number of threads ahead.
+        self.__read_ahead = ReadAhead(self.__read_ahead_workers, self.__include_directories, self.__encoding,
+                                      self.__file_system) if self.__read_ahead_workers else None
+        try:
+            self.__process_all(src_file_path)
+        finally:
+            if self.__read_ahead:
+                self.__read_ahead.close()
+                self.__read_ahead = None
+
+        if self.__hoister:
+            self.__write_hoisted_includes(dst)
+        if index:
+            index.finish(self.__dst.hexdigest())
+
+    def __process_all(self, src_file_path: Union[Path, str]):
         self.__process_file(Path(), src_file_path, False, True)
 
-        if not self.__source_files.empty():
-            if stitch_format is not None:
+        if self.__source_dsts:
+            self.__write_last_token(False)
+            self.__process_source_outputs()
+        elif self.__source_files:
+            if self.__stitch_format is not None:
                 raise QuomError('Couldn\'t stitch source files. The stitch location "{}" was not found.'
-                                .format(stitch_format))
-            while not self.__source_files.empty():
-                self.__process_file(Path(), self.__source_files.get(), True)
-            # Write last token.
-            self.__write_token(self.__prev_token, True)
-        elif self.__cont_lb == CONTINUOUS_LINE_BREAK_START or not isinstance(self.__prev_token,
-                                                                             LinebreakWhitespaceToken):
+                                .format(self.__stitch_format))
+            while self.__source_files:
+                self.__process_file(Path(), self.__source_files.popleft(), True)
+            self.__write_last_token(True)
+        else:
+            self.__write_last_token(False)
+
+    def __write_hoisted_includes(self, dst: TextIO):
+        if self.__hoister.includes and self.__hoist_format is not None and self.__hoist_position is None:
+            raise QuomError('Couldn\'t hoist includes. The hoist location "{}" was not found.'
+                            .format(self.__hoist_format))
+        content = self.__hoist_buffer.getvalue()
+        position = self.__hoist_position or 0
+        text = self.__hoister.text()
+        if self.__source_map is not None and text:
+            # The lines after the includes continue where they were.
+            location = self.__source_map.locate(self.__hoist_line)
+            if self.__line_directives and location:
+                text += line_directive(location[1], location[0])
+            self.__source_map.insert_lines(self.__hoist_line, count_line_breaks(text))
+        dst.write(content[:position])
+        dst.write(text)
+        dst.write(content[position:])
+
+    def __mark_hoist_position(self):
+        # Write the pending token, the includes are placed after it.
+        self.__dst.write(self.__prev_raw)
+        self.__prev_raw = ''
+        self.__hoist_position = self.__hoist_buffer.tell()
+        if self.__mapping_writer:
+            self.__hoist_line = self.__mapping_writer.line
+
+    def __write_last_token(self, after_source_files: bool):
+        if after_source_files:
+            # Write last token, if not a continuous line break itself.
+            if self.__trim and self.__prev_is_line_break:
+                self.__cont_lb += 1
+            if not self.__prev_is_line_break or self.__cont_lb < CONTINUOUS_BREAK_REACHED:
+                self.__dst.write(self.__prev_raw)
+        elif self.__cont_lb == CONTINUOUS_LINE_BREAK_START or not self.__prev_is_line_break:
             # Write last token, if not a continuous line break.
-            self.__write_token(self.__prev_token, True)
+            self.__dst.write(self.__prev_raw)
+
+    def __process_source_outputs(self):
+        # Every output is compiled on its own and gets its own copy of the files already in the header output.
+        header_files = self.__processed_files
+        outputs = []
+        for dst in self.__source_dsts:
+            if self.__header_include is not None:
+                dst.write('#include "{}"\n'.format(self.__header_include))
+            # One empty line may follow the include, without include the output starts without any.
+            cont_lb = CONTINUOUS_LINE_BREAK_START + 1 if self.__header_include is not None else \
+                CONTINUOUS_BREAK_REACHED - 1
+            # Macros defined by the files of one output are not defined in the others.
+            macros = self.__conditionals.save_macros() if self.__conditionals else None
+            outputs.append(OutputState(dst, set(header_files), cont_lb, macros))
+
+        sizes = [0] * len(outputs)
+        assigned_files = set(header_files)
+        while self.__source_files:
+            # Sources found while processing a batch form the next one.
+            batch = []
+            while self.__source_files:
+                file_path = self.__source_files.popleft()
+                resolved_path = self.__resolve(file_path) or file_path
+                if resolved_path not in assigned_files:
+                    assigned_files.add(resolved_path)
+                    batch.append(file_path)
+
+            # Deterministic longest processing time first: the biggest file goes to the smallest output.
+            output_of = {}
+            for size, file_path in sorted(((self.__file_system.size(file_path), file_path) for file_path in batch),
+                                          key=lambda x: (-x[0], str(x[1]))):
+                i = sizes.index(min(sizes))
+                sizes[i] += size
+                output_of[file_path] = outputs[i]
+
+            for file_path in batch:
+                self.__select_output(output_of[file_path])
+                self.__process_file(Path(), file_path, True)
+
+        for output in outputs:
+            self.__select_output(output)
+            self.__write_last_token(True)
+
+    def __select_output(self, output: 'OutputState'):
+        if self.__output:
+            self.__output.save(self.__dst, self.__processed_files, self.__cont_lb, self.__prev_raw,
+                               self.__prev_is_line_break,
+                               self.__conditionals.save_macros() if self.__conditionals else None)
+        self.__output = output
+        if self.__minifier:
+            self.__minifier.reset()
+        if self.__conditionals:
+            self.__conditionals.restore_macros(output.macros)
+        self.__dst, self.__processed_files, self.__cont_lb, self.__prev_raw, self.__prev_is_line_break = \
+            output.dst, output.processed_files, output.cont_lb, output.prev_raw, output.prev_is_line_break
 
     def __process_file(self, relative_path: Path, include_path: Path, is_source_file: bool,
-                       is_main_header=False):
-        # First check if file exists relative.
-        file_path = relative_path / include_path
-        if not file_path.exists():
-            # Otherwise search in include directories.
-            for include_directory in self.__include_directories:
-                file_path = include_directory / include_path
-                if file_path.exists():
-                    break
-            else:
-                raise QuomError('Include not found: "{}"'.format(include_path))
+                       is_main_header=False, including_file_path: Path = None):
+        start = perf_counter() if self.__file_stats else None
+
+        file_path = self.__resolve_include(relative_path, include_path)
+        if not file_path:
+            raise QuomError('Include not found: "{}"'.format(include_path))
 
         # Skip already processed files.
-        file_path = file_path.resolve()
+        if self.__hooks:
+            self.__hooks.on_include_resolved(include_path, file_path, including_file_path)
+        if self.__index:
+            self.__index.add_event(['include', str(relative_path), str(include_path), str(file_path),
+                                    file_path in self.__processed_files])
         if file_path in self.__processed_files:
             return
         self.__processed_files.add(file_path)
 
-        # Tokenize the file.
-        tokens = tokenize(file_path.read_text(encoding=self.__encoding))
-
-        for token in tokens:
-            # Find local includes.
-            token = self.__scan_for_include(file_path, token, is_source_file)
-            if not token or self.__scan_for_source_files_stitch(token):
-                continue
-
-            self.__write_token(token, is_main_header)
+        if self.__index:
+            if self.__copy_from_index(file_path, is_source_file, is_main_header):
+                return
+            self.__index.open_segment(file_path, is_source_file, is_main_header, self.__output_boundary(),
+                                      self.__dst.count)
+            # Signature before reading, a file changed afterwards is read again by the next run.
+            signature = self.__signature(file_path)
+
+        stats = self.__start_file_stats(file_path, start) if self.__file_stats else None
+        if self.__hooks and not stats:
+            self.__hooks.on_file_start(file_path)
+
+        prefetched = self.__read_ahead.take(relative_path, include_path, file_path) if self.__read_ahead else None
+        if self.__cache:
+            src = self.__cache.read_text(file_path, self.__encoding, prefetched)
+        elif prefetched:
+            src = prefetched[1]
+        else:
+            src = self.__file_system.read_text(file_path, self.__encoding)
+        if stats:
+            stats.chars_in = len(src)
+            stats.read_time = perf_counter() - start - stats.resolve_time
+        digest = (self.__cache.digest(file_path, src) if self.__cache else text_digest(src)) \
+            if self.__index or self.__unique_files is not None else None
+        if self.__index:
+            self.__index.add_event(['file', str(file_path), signature, digest.hex()])
+
+        # Skip identical copies of files, copy files without anything to resolve as one block, otherwise tokenize them.
+        duplicate_of = self.__find_duplicate(file_path, digest) if self.__unique_files is not None else None
+        if duplicate_of:
+            if stats:
+                stats.duplicate_of = duplicate_of
+                stats.tokenize_time = perf_counter() - start - stats.resolve_time - stats.read_time
+        elif self.__copy_verbatim and can_copy_verbatim(src, self.__stitch_format,
+                                                        self.__include_guard_format is not None,
+                                                        self.__conditionals is not None):
+            if stats:
+                stats.verbatim = True
+                stats.tokenize_time = perf_counter() - start - stats.resolve_time - stats.read_time
+            if self.__unique_files is not None:
+                self.__unique_files[digest][1] = has_include_guard(src)
+            self.__write_verbatim(file_path, src)
+        else:
+            tokens = self.__cache.tokenize(file_path, src) if self.__cache else tokenize(src)
+            if self.__unique_files is not None:
+                self.__unique_files[digest][1] = is_included_once(tokens)
+            if self.__hoister:
+                self.__hoister.scan_file(tokens)
+            if self.__conditionals:
+                self.__conditionals.begin_file(tokens)
+            if self.__comment_deduplicator:
+                self.__comment_deduplicator.begin_file(tokens)
+            if self.__read_ahead:
+                self.__read_includes_ahead(file_path, tokens)
+            if stats:
+                stats.token_counts = Counter(type(token).__name__ for token in tokens[1:-1])
+                stats.tokenize_time = perf_counter() - start - stats.resolve_time - stats.read_time
+
+            if self.__mapping_writer:
+                self.__map_files.append([file_path, src, 0, 1])
+
+            write_token = self.__token_writer
+            tokens_to_write = tokens
+            for transform in self.__transforms:
+                tokens_to_write = apply_transform(transform, file_path, tokens_to_write, stats)
+
+            for token in tokens_to_write:
+                # Skip dead branches, before their includes are processed.
+                if self.__conditionals:
+                    token = self.__conditionals.process(token)
+                    if not token:
+                        continue
+
+                # Find local includes.
+                token = self.__scan_for_include(file_path, token, is_source_file)
+                if not token or self.__scan_for_source_files_stitch(token) or self.__scan_for_hoist_location(token):
+                    continue
+
+                if isinstance(token, PreprocessorEmbedToken):
+                    self.__write_embed(file_path, token)
+                else:
+                    write_token(token, is_main_header)
+
+            if self.__conditionals:
+                self.__conditionals.end_file()
+            if self.__mapping_writer:
+                self.__map_files.pop()
+
+        if stats:
+            self.__end_file_stats()
+        elif self.__hooks:
+            self.__hooks.on_file_end(file_path, FileStats(file_path))
+        # A copy is merged into the original, including the source file the original found.
+        if duplicate_of:
+            return
 
+        header_path = file_path
         file_path = self.__find_possible_source_file(file_path)
+        if self.__index:
+            self.__index.add_event(['source', str(header_path), str(file_path) if file_path else None])
+            self.__index.close_segment(self.__output_boundary(), self.__dst.count)
         if file_path:
-            self.__source_files.put(file_path)
+            self.__source_files.append(file_path)
+            if self.__read_ahead:
+                self.__read_ahead.submit(Path(), file_path)
+
+    def __resolve_include(self, relative_path: Path, include_path: Path) -> Union[Path, None]:
+        # First check if file exists relative.
+        file_path = self.__resolve(relative_path / include_path)
+        if not file_path:
+            # Otherwise search in include directories.
+            for include_directory in self.__include_directories:
+                file_path = self.__resolve(include_directory / include_path)
+                if file_path:
+                    break
+        return file_path
+
+    def __output_boundary(self) -> list:
+        # The state of the output the next file continues with.
+        return [self.__cont_lb, self.__prev_raw, self.__prev_is_line_break]
+
+    def __signature(self, file_path: Path) -> Union[list, None]:
+        signature = stat_signature(file_path) if isinstance(self.__file_system, OsFileSystem) else None
+        return list(signature) if signature else None
+
+    def __copy_from_index(self, file_path: Path, is_source_file: bool, is_main_header: bool) -> bool:
+        # Copies the output of the file and its includes from the previous output, if they give the same output again:
+        # same output state before, same include resolutions, unchanged files and same found source files.
+        segment = self.__index.find(file_path)
+        if not segment or segment['stitch'] or segment['source'] != is_source_file or \
+                segment['main'] != is_main_header or segment['entry'] != self.__output_boundary():
+            return False
+
+        processed_files = set()
+        source_files = []
+        for event in self.__index.previous_events(segment):
+            if event[0] == 'include':
+                _, relative_path, include_path, resolved_path, skipped = event
+                path = self.__resolve_include(Path(relative_path), Path(include_path))
+                if not path or str(path) != resolved_path or \
+                        (path in self.__processed_files or path in processed_files) != skipped:
+                    return False
+                processed_files.add(path)
+            elif event[0] == 'file':
+                _, path, signature, digest = event
+                if signature is None or self.__signature(Path(path)) != signature:
+                    try:
+                        if text_digest(self.__file_system.read_text(Path(path), self.__encoding)).hex() != digest:
+                            return False
+                    except (OSError, ValueError):
+                        return False
+            else:
+                _, header_path, source_path = event
+                path = self.__find_possible_source_file(Path(header_path))
+                if (str(path) if path else None) != source_path:
+                    return False
+                if path:
+                    source_files.append(path)
+
+        self.__processed_files |= processed_files
+        if segment['flushed']:
+            self.__dst.write(self.__prev_raw)
+        self.__dst.write(self.__index.copy_segment(segment, self.__dst.count))
+        self.__cont_lb, self.__prev_raw, self.__prev_is_line_break = segment['exit']
+        self.__source_files.extend(source_files)
+        return True
+
+    def __read_includes_ahead(self, file_path: Path, tokens: List[Token]):
+        # With conditionals, only the includes outside of conditional blocks (besides an include guard) are surely
+        # processed, the ones in blocks may be in dead branches.
+        guard = (find_include_guard(tokens) or ()) if self.__conditionals else None
+        depth = 0
+        for token in tokens:
+            if guard is not None and token not in guard:
+                depth += conditional_depth_change(token)
+            if depth == 0 and isinstance(token, PreprocessorIncludeToken) and token.is_local_include and \
+                    not self.__is_kept_include(token):
+                self.__read_ahead.submit(file_path.parent, Path(str(token.path)))
+
+    def __find_duplicate(self, file_path: Path, digest: bytes) -> Union[Path, None]:
+        # Path of an already processed file of this output with the same content, if it is included once. Whether it
+        # is, is recorded when the original is processed, copies are never tokenized.
+        paths, included_once = self.__unique_files.setdefault(digest, [[], False])
+        original = next((path for path in paths if path in self.__processed_files), None)
+        paths.append(file_path)
+        return original if original and included_once else None
+
+    def __resolve(self, file_path: Path) -> Union[Path, None]:
+        if self.__cache:
+            return self.__cache.resolve(file_path)
+        return self.__file_system.resolve(file_path)
+
+    def __start_file_stats(self, file_path: Path, start: float) -> FileStats:
+        self.__hooks.on_file_start(file_path)
+        stats = FileStats(file_path)
+        stats.start = start
+        stats.resolve_time = perf_counter() - start
+        # Time and characters of included files are subtracted. The pending token belongs to the previous file.
+        self.__stats_stack.append([stats, 0.0, 0, self.__dst.count + len(self.__prev_raw), 0, 0])
+        return stats
+
+    def __end_file_stats(self):
+        stats, children_time, children_chars, chars_start, children_lines, children_bytes = self.__stats_stack.pop()
+        stats.end = perf_counter()
+        stats.emit_time = stats.end - stats.start - stats.resolve_time - stats.read_time - stats.tokenize_time - \
+            stats.transform_time - children_time
+        stats.subtree_chars_out = self.__dst.count + len(self.__prev_raw) - chars_start
+        stats.chars_out = stats.subtree_chars_out - children_chars
+        stats.subtree_lines_out = stats.lines_out + children_lines
+        stats.subtree_bytes_out = stats.bytes_out + children_bytes
+        if self.__stats_stack:
+            self.__stats_stack[-1][1] += stats.end - stats.start
+            self.__stats_stack[-1][2] += stats.subtree_chars_out
+            self.__stats_stack[-1][4] += stats.subtree_lines_out
+            self.__stats_stack[-1][5] += stats.subtree_bytes_out
+        self.__hooks.on_file_end(stats.file_path, stats)
 
     def __write_token(self, token: Token, is_main_header: bool):
         if isinstance(token, StartToken) or isinstance(token, EndToken):
@@ -106,13 +647,188 @@ class Quom:
             if not isinstance(token, LinebreakWhitespaceToken):
                 return
 
+        # Only includes of the main output are hoisted, the source outputs include it.
+        if self.__hoister and self.__output is None and self.__hoister.hoist(token):
+            token = token.preprocessor_tokens[-2]
+            if not isinstance(token, LinebreakWhitespaceToken):
+                return
+
+        if self.__comment_deduplicator and self.__comment_deduplicator.drop(
+                token, not self.__prev_raw or self.__prev_raw[-1] in '\r\n'):
+            if self.__stats_stack:
+                stats = self.__stats_stack[-1][0]
+                stats.duplicate_comments += isinstance(token, CommentToken)
+                stats.duplicate_comment_chars += len(token.raw)
+            return
+
         if self.__is_cont_line_break(token):
             return
 
+        raw = token.raw
+        if self.__minifier:
+            raw = self.__minifier.minify(token, not self.__prev_raw or self.__prev_raw[-1] in '\r\n')
+            if not raw:
+                return
+
+        if self.__stats_stack:
+            self.__count_output({token_kind(token): len(raw)}, raw)
+
         # Write previous token, store current.
-        if self.__prev_token:
-            self.__dst.write(str(self.__prev_token.raw))
-        self.__prev_token = token
+        self.__dst.write(self.__prev_raw)
+        if self.__mapping_writer and self.__output is None and not isinstance(token, LinebreakWhitespaceToken):
+            self.__map_token(token, raw)
+        self.__prev_raw = raw
+        self.__prev_is_line_break = isinstance(token, LinebreakWhitespaceToken)
+
+        # Without a hoist location, the includes are placed after the #pragma once of the main file.
+        if self.__hoister and is_main_header and self.__hoist_format is None and self.__hoist_position is None and \
+                self.__is_pragma_once(token):
+            self.__mark_hoist_position()
+
+    def __write_plain_token(self, token: Token, is_main_header: bool):
+        # __write_token without hooks, hoisting, comment deduplication, minifying and source map.
+        if isinstance(token, (StartToken, EndToken)):
+            return
+
+        if (not is_main_header and isinstance(token, PreprocessorPragmaOnceToken)) or self.__is_include_guard(token):
+            token = token.preprocessor_tokens[-2]
+            if not isinstance(token, LinebreakWhitespaceToken):
+                return
+
+        if self.__is_cont_line_break(token):
+            return
+
+        self.__dst.write(self.__prev_raw)
+        self.__prev_raw = token.raw
+        self.__prev_is_line_break = isinstance(token, LinebreakWhitespaceToken)
+
+    def __write_embed(self, file_path: Path, token: PreprocessorEmbedToken):
+        # Replace the directive with the bytes of the resource as initializer, a quoted path is relative first.
+        embed_path = Path(str(token.path))
+        if token.is_local_embed:
+            resource_path = self.__resolve_include(file_path.parent, embed_path)
+        else:
+            resource_path = next((x for x in (self.__resolve(directory / embed_path)
+                                              for directory in self.__include_directories) if x), None)
+        if not resource_path:
+            raise QuomError('Embedded resource not found: "{}"'.format(embed_path))
+        # The resource is not logged, the files around it are emitted again.
+        if self.__index:
+            self.__index.invalidate_open_segments()
+        data = self.__file_system.read_bytes(resource_path)
+        if self.__hooks:
+            self.__hooks.on_resource_read(resource_path, file_path, len(data))
+        text = embed_text(data, parse_parameters(token.parameters))
+        line_break = token.preprocessor_tokens[-2]
+        line_break = line_break.raw if isinstance(line_break, LinebreakWhitespaceToken) else ''
+
+        # Written like a token followed by the line break of the directive.
+        self.__dst.write(self.__prev_raw)
+        if self.__stats_stack:
+            self.__count_output({'code': len(text), 'whitespace': len(line_break)}, text + line_break)
+        if self.__mapping_writer and self.__output is None:
+            self.__map_token(token, text)
+        self.__dst.write(text)
+        self.__prev_raw = line_break
+        self.__prev_is_line_break = bool(line_break)
+        self.__cont_lb = CONTINUOUS_LINE_BREAK_START + 1 if line_break else CONTINUOUS_LINE_BREAK_START
+        if self.__minifier:
+            self.__minifier.reset()
+
+    def __write_verbatim(self, file_path: Path, src: str):
+        marks = self.__verbatim_marks(src) if self.__mapping_writer and self.__output is None else None
+        if src and self.__trim:
+            src = self.__trim_cont_line_breaks(src)
+        if not src:
+            return
+
+        if self.__stats_stack:
+            self.__count_output(verbatim_kinds(src), src)
+
+        # Write previous token and the source, but store a trailing line break like a token.
+        self.__dst.write(self.__prev_raw)
+        last_line, line_break = LAST_LINE_REGEX.search(src).groups()
+        if line_break and not is_directive_line(last_line):
+            self.__write_mapped(file_path, src[:-len(line_break)], marks)
+            self.__prev_raw = line_break
+            self.__prev_is_line_break = True
+        else:
+            self.__write_mapped(file_path, src, marks)
+            self.__prev_raw = ''
+            self.__prev_is_line_break = False
+
+    def __write_mapped(self, file_path: Path, text: str, marks: Union[List[Tuple[int, int]], None]):
+        start = 0
+        for position, input_line in marks or []:
+            if position >= len(text):
+                break
+            self.__dst.write(text[start:position])
+            start = position
+            if not self.__mapping_writer.at_line_start:
+                # The source continues the line of another file, its next line is mapped.
+                line_break = LINE_BREAK_REGEX.search(text, position)
+                if not line_break:
+                    break
+                self.__dst.write(text[start:line_break.end()])
+                start = line_break.end()
+                input_line += 1
+            if self.__mapping_writer.marked_line != self.__mapping_writer.line:
+                self.__dst.write(self.__mapping_writer.mark(file_path, input_line))
+        self.__dst.write(text[start:])
+
+    def __verbatim_marks(self, src: str) -> List[Tuple[int, int]]:
+        # Positions in the trimmed source and their input lines, where the lines stop to continue the ones before. Same
+        # trimming as __trim_cont_line_breaks.
+        if not self.__trim:
+            return [(0, 1)]
+        kept = 0
+        start = 0
+        input_line = 1
+        leading = LEADING_LINE_BREAKS_REGEX.match(src)
+        if leading:
+            line_breaks = LINE_BREAK_REGEX.findall(leading.group())
+            kept = len(''.join(line_breaks[:max(0, CONTINUOUS_BREAK_REACHED - 1 - self.__cont_lb)]))
+            start = leading.end()
+            input_line += len(line_breaks)
+
+        marks = [(kept, input_line)]
+        removed = 0
+        position = start
+        for match in CONTINUOUS_LINE_BREAKS_REGEX.finditer(src, start):
+            input_line += count_line_breaks(src, position, match.end())
+            position = match.end()
+            removed += len(match.group()) - len(match.group(1))
+            marks.append((kept + position - start - removed, input_line))
+        return marks
+
+    def __map_token(self, token: Token, raw: str):
+        # Only the first token of a line is mapped, or the line after a token which starts behind another file.
+        writer = self.__mapping_writer
+        if writer.at_line_start and writer.marked_line == writer.line:
+            return
+        if not writer.at_line_start and (writer.line_directives or not LINE_BREAK_REGEX.search(raw)):
+            return
+
+        # Tokens of transforms and rewritten directives are not part of the file and not mapped.
+        map_file = self.__map_files[-1]
+        file_path, src, offset, input_line = map_file
+        if token.start.src is not src:
+            return
+        position = token.start.position
+        input_line += count_line_breaks(src, offset, position)
+        map_file[2], map_file[3] = position, input_line
+        if writer.at_line_start:
+            self.__dst.write(writer.mark(file_path, input_line))
+        else:
+            writer.source_map.add(writer.line + 1, file_path, input_line + 1)
+
+    def __count_output(self, chars_by_kind: Dict[str, int], text: str):
+        # The output of the current file, a pending token belongs to the file which stored it.
+        stats = self.__stats_stack[-1][0]
+        for kind, chars in chars_by_kind.items():
+            stats.chars_out_by_kind[kind] = stats.chars_out_by_kind.get(kind, 0) + chars
+        stats.lines_out += count_line_breaks(text)
+        stats.bytes_out += len(text.encode(self.__encoding, 'replace'))
 
     @staticmethod
     def __is_pragma_once(token: Token):
@@ -145,19 +861,20 @@ class Quom:
         for extension in ['.c', '.cpp', '.cxx', '.cc', '.c++', '.cp', '.C']:
             for src_dir in self.__relative_source_directories:
                 file_path = (header_file_path.parent / src_dir / header_file_path.name).with_suffix(extension)
-                if file_path.exists():
+                if self.__file_system.resolve(file_path):
                     return file_path
             for src_dir in self.__source_directories:
-                file_path = (src_dir / header_file_path.name).with_suffix(extension).resolve()
-                if file_path.exists():
+                file_path = self.__file_system.resolve((src_dir / header_file_path.name).with_suffix(extension))
+                if file_path:
                     return file_path
         return None
 
     def __scan_for_include(self, file_path: Path, token: Token, is_source_file: bool) -> Union[Token, None]:
-        if not isinstance(token, PreprocessorIncludeToken) or not token.is_local_include:
+        if not isinstance(token, PreprocessorIncludeToken) or not token.is_local_include or \
+                self.__is_kept_include(token):
             return token
 
-        self.__process_file(file_path.parent, Path(str(token.path)), is_source_file)
+        self.__process_file(file_path.parent, Path(str(token.path)), is_source_file, including_file_path=file_path)
         # Take include tokens line break token if any.
         token = token.preprocessor_tokens[-2]
         if isinstance(token, LinebreakWhitespaceToken):
@@ -165,15 +882,29 @@ class Quom:
 
         return None
 
+    def __is_kept_include(self, token: PreprocessorIncludeToken) -> bool:
+        return bool(self.__keep_include_regex and self.__keep_include_regex.match(str(token.path).replace('\\', '/')))
+
     def __scan_for_source_files_stitch(self, token: Token) -> bool:
         if not isinstance(token, CommentToken) or str(token.content).strip() != self.__stitch_format:
             return False
 
-        while not self.__source_files.empty():
-            self.__process_file(Path(), self.__source_files.get(), True)
+        if self.__index:
+            self.__index.invalidate_open_segments()
+
+        while self.__source_files:
+            self.__process_file(Path(), self.__source_files.popleft(), True)
 
         return True
 
+    def __scan_for_hoist_location(self, token: Token) -> bool:
+        if not self.__hoister or self.__hoist_format is None or self.__output is not None or \
+                not isinstance(token, CommentToken) or str(token.content).strip() != self.__hoist_format:
+            return False
+
+        self.__mark_hoist_position()
+        return True
+
     def __is_cont_line_break(self, token: Token) -> bool:
         if not self.__trim:
             return False
@@ -187,3 +918,45 @@ class Quom:
             self.__cont_lb = CONTINUOUS_LINE_BREAK_START
 
         return self.__cont_lb >= CONTINUOUS_BREAK_REACHED
+
+    def __trim_cont_line_breaks(self, src: str) -> str:
+        # Line based equivalent of __is_cont_line_break for a whole block of source.
+        cont_lb = self.__cont_lb
+        leading = LEADING_LINE_BREAKS_REGEX.match(src)
+        if leading:
+            line_breaks = LINE_BREAK_REGEX.findall(leading.group())
+            kept = ''.join(line_breaks[:max(0, CONTINUOUS_BREAK_REACHED - 1 - cont_lb)])
+            if leading.end() == len(src):
+                self.__cont_lb = cont_lb + len(line_breaks)
+                return kept
+            src = kept + src[leading.end():]
+
+        trailing = TRAILING_LINE_BREAKS_REGEX.search(src)
+        if trailing:
+            self.__cont_lb = CONTINUOUS_LINE_BREAK_START + len(LINE_BREAK_REGEX.findall(trailing.group()))
+        else:
+            self.__cont_lb = CONTINUOUS_LINE_BREAK_START
+        return CONTINUOUS_LINE_BREAKS_REGEX.sub(r'\1', src)
+
+
+class Quom:
+    # Amalgamates a single file, same as a QuomSession which does not keep the files for following runs.
+    def __init__(self, src_file_path: Union[Path, str], dst: TextIO, stitch_format: str = None,
+                 include_guard_format: str = None, trim: bool = True,
+                 include_directories: List[Union[Path, str]] = None,
+                 relative_source_directories: List[Union[Path]] = None,
+                 source_directories: List[Union[Path]] = None,
+                 encoding: str = 'utf-8', hooks: QuomHooks = None, cache: FileCache = None, read_ahead: int = 0,
+                 source_dsts: List[TextIO] = None, header_include: str = None, minify: int = 0,
+                 keep_comment_format: str = None, hoist_includes: bool = False, hoist_format: str = None,
+                 defines: List[str] = None, undefines: List[str] = None, dedupe_content: bool = False,
+                 transforms: List[Transform] = None, file_system: FileSystem = None, index: OutputIndex = None,
+                 source_map: SourceMap = None, line_directives: bool = False, dedupe_comments: bool = False,
+                 dedupe_comment_format: str = None, keep_includes: List[str] = None):
+        session = QuomSession(stitch_format, include_guard_format, trim, include_directories,
+                              relative_source_directories, source_directories, encoding, hooks, cache, read_ahead,
+                              minify, keep_comment_format, hoist_includes, hoist_format, defines, undefines,
+                              dedupe_content, transforms, file_system, keep_files=False,
+                              line_directives=line_directives, dedupe_comments=dedupe_comments,
+                              dedupe_comment_format=dedupe_comment_format, keep_includes=keep_includes)
+        session.run(src_file_path, dst, source_dsts, header_include, index, source_map)
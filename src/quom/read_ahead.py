@@ -0,0 +1,93 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Set, Tuple, Union
+
+from .file_cache import Signature
+from .file_system import FileSystem, OsFileSystem
+
+
+def advise_will_need(file_path: Path):
+    # Hints the kernel to read the file into the page cache in the background.
+    try:
+        fd = os.open(str(file_path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ReadAhead:
+    # Reads files, which are about to be included, in background threads to overlap the I/O latency with the
+    # tokenization. Only the reading is done ahead: Quom still resolves every include itself and uses the read content
+    # only if it belongs to the resolved file.
+    def __init__(self, workers: int, include_directories: List[Path], encoding: str, file_system: FileSystem = None):
+        self.__executor = ThreadPoolExecutor(workers, thread_name_prefix='quom-read-ahead')
+        self.__include_directories = include_directories
+        self.__encoding = encoding
+        self.__file_system = file_system or OsFileSystem()
+        self.__advise = hasattr(os, 'posix_fadvise') and isinstance(self.__file_system, OsFileSystem)
+        self.__futures: Dict[Tuple[Path, Path], Future] = {}
+        self.__submitted: Set[Tuple[Path, Path]] = set()
+        # Resolved paths already read by a thread, shared between the threads.
+        self.__claimed: Set[Path] = set()
+        self.__lock = threading.Lock()
+
+    def submit(self, relative_path: Path, include_path: Path):
+        # Same arguments as Quom.__process_file.
+        key = (relative_path, include_path)
+        if key not in self.__submitted:
+            self.__submitted.add(key)
+            file_path = None
+            if self.__advise:
+                # The kernel starts reading right away, even if all threads are still busy.
+                file_path = self.__resolve(relative_path, include_path)
+                if file_path:
+                    advise_will_need(file_path)
+            self.__futures[key] = self.__executor.submit(self.__read, relative_path, include_path, file_path)
+
+    def take(self, relative_path: Path, include_path: Path, file_path: Path) -> Union[Tuple[Signature, str], None]:
+        # Signature and content of the resolved file, or None if it has to be read synchronously.
+        future = self.__futures.pop((relative_path, include_path), None)
+        # Do not wait for a read which has not even started.
+        if future is None or future.cancel():
+            return None
+        try:
+            result = future.result()
+        except (OSError, ValueError):
+            # Reported again by the synchronous read.
+            return None
+        if result is None or result[0] != file_path:
+            return None
+        return result[1], result[2]
+
+    def close(self):
+        for future in self.__futures.values():
+            future.cancel()
+        self.__futures.clear()
+        self.__executor.shutdown()
+
+    def __resolve(self, relative_path: Path, include_path: Path) -> Union[Path, None]:
+        # Mirrors the include resolution of Quom.
+        for directory in [relative_path] + self.__include_directories:
+            file_path = self.__file_system.resolve(directory / include_path)
+            if file_path:
+                return file_path
+        return None
+
+    def __read(self, relative_path: Path, include_path: Path,
+               file_path: Union[Path, None]) -> Union[Tuple[Path, Signature, str], None]:
+        file_path = file_path or self.__resolve(relative_path, include_path)
+        if not file_path:
+            return None
+
+        with self.__lock:
+            if file_path in self.__claimed:
+                return None
+            self.__claimed.add(file_path)
+        return (file_path,) + self.__file_system.read(file_path, self.__encoding)
@@ -0,0 +1,161 @@
+import struct
+from bisect import bisect_right
+from pathlib import Path
+from typing import List, TextIO, Tuple, Union
+
+# Binary format (little endian): magic, number of files, every file as length and UTF-8 path, number of entries and
+# the entries as triples of output line, file index and input line.
+MAGIC = b'QMAP'
+VERSION = 1
+NO_FILE = 0xffffffff
+
+
+def count_line_breaks(src: str, start: int = 0, end: int = None) -> int:
+    # Same as len(LINE_BREAK_REGEX.findall(src[start:end])) without copying the source.
+    end = len(src) if end is None else end
+    line_breaks = src.count('\n', start, end)
+    if '\r' in src:
+        line_breaks += src.count('\r', start, end) - src.count('\r\n', start, end)
+    return line_breaks
+
+
+def line_directive(input_line: int, file_path: Path) -> str:
+    return '#line {} "{}"\n'.format(input_line, str(file_path).replace('\\', '\\\\').replace('"', '\\"'))
+
+
+class SourceMap:
+    # The input line of every output line: sorted ranges of output lines, each one continues line by line from an
+    # input line of a file (or of no file, e.g. for hoisted includes). Lines start at 1.
+    def __init__(self):
+        self.files: List[str] = []
+        self.output_lines: List[int] = []
+        self.file_indices: List[int] = []
+        self.input_lines: List[int] = []
+        self.__file_index = {}
+
+    def __len__(self):
+        return len(self.output_lines)
+
+    def locate(self, output_line: int) -> Union[Tuple[Path, int], None]:
+        # Input file and line of the output line or None if it does not come from an input.
+        i = bisect_right(self.output_lines, output_line) - 1
+        if i < 0 or self.file_indices[i] == NO_FILE:
+            return None
+        return Path(self.files[self.file_indices[i]]), self.input_lines[i] + output_line - self.output_lines[i]
+
+    def continues(self, output_line: int, file_path: Path, input_line: int) -> bool:
+        # Checks if the last range already maps the output line to the input line.
+        if not self.output_lines or self.file_indices[-1] == NO_FILE:
+            return False
+        return self.input_lines[-1] + output_line - self.output_lines[-1] == input_line and \
+            self.files[self.file_indices[-1]] == str(file_path)
+
+    def add(self, output_line: int, file_path: Union[Path, None], input_line: int):
+        # Starts a new range, which replaces a range starting at the same line.
+        if file_path is None:
+            file_index = NO_FILE
+        else:
+            file_index = self.__file_index.get(str(file_path))
+            if file_index is None:
+                file_index = self.__file_index[str(file_path)] = len(self.files)
+                self.files.append(str(file_path))
+        if self.output_lines and self.output_lines[-1] == output_line:
+            self.file_indices[-1] = file_index
+            self.input_lines[-1] = input_line
+        else:
+            self.output_lines.append(output_line)
+            self.file_indices.append(file_index)
+            self.input_lines.append(input_line)
+
+    def insert_lines(self, output_line: int, count: int):
+        # Lines of no input (e.g. hoisted includes) were inserted before the output line.
+        if not count:
+            return
+        i = bisect_right(self.output_lines, output_line - 1)
+        location = self.locate(output_line)
+        for j in range(i, len(self.output_lines)):
+            self.output_lines[j] += count
+        entries = [(output_line, NO_FILE, 0)]
+        # The range containing the output line continues after the inserted lines.
+        if location and (i == len(self.output_lines) or self.output_lines[i] != output_line + count):
+            entries.append((output_line + count, self.file_indices[i - 1], location[1]))
+        for k, (line, file_index, input_line) in enumerate(entries):
+            self.output_lines.insert(i + k, line)
+            self.file_indices.insert(i + k, file_index)
+            self.input_lines.insert(i + k, input_line)
+
+    def to_bytes(self) -> bytes:
+        data = [MAGIC, struct.pack('<II', VERSION, len(self.files))]
+        for file in self.files:
+            path = file.encode('utf-8', 'surrogatepass')
+            data.append(struct.pack('<I', len(path)))
+            data.append(path)
+        entries = [x for entry in zip(self.output_lines, self.file_indices, self.input_lines) for x in entry]
+        data.append(struct.pack('<I{}I'.format(len(entries)), len(self.output_lines), *entries))
+        return b''.join(data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'SourceMap':
+        if data[:4] != MAGIC:
+            raise ValueError('Not a Quom source map.')
+        version, file_count = struct.unpack_from('<II', data, 4)
+        if version != VERSION:
+            raise ValueError('Unsupported source map version: {}'.format(version))
+        source_map = cls()
+        pos = 12
+        for _ in range(file_count):
+            length, = struct.unpack_from('<I', data, pos)
+            source_map.files.append(data[pos + 4:pos + 4 + length].decode('utf-8', 'surrogatepass'))
+            pos += 4 + length
+        count, = struct.unpack_from('<I', data, pos)
+        entries = struct.unpack_from('<{}I'.format(count * 3), data, pos + 4)
+        source_map.output_lines = list(entries[0::3])
+        source_map.file_indices = list(entries[1::3])
+        source_map.input_lines = list(entries[2::3])
+        return source_map
+
+    def save(self, file_path: Union[Path, str]):
+        Path(file_path).write_bytes(self.to_bytes())
+
+    @classmethod
+    def load(cls, file_path: Union[Path, str]) -> 'SourceMap':
+        return cls.from_bytes(Path(file_path).read_bytes())
+
+
+def locate(source_map: Union[SourceMap, Path, str], output_line: int) -> Union[Tuple[Path, int], None]:
+    # Input file and line of a line of the output, the source map is loaded from the path if needed.
+    if not isinstance(source_map, SourceMap):
+        source_map = SourceMap.load(source_map)
+    return source_map.locate(output_line)
+
+
+class MappingWriter:
+    # Counts the lines of the output and maps the start of every line to its input line. With line directives, a #line
+    # directive is returned for every line which does not continue the lines before.
+    def __init__(self, dst: TextIO, source_map: SourceMap, line_directives: bool):
+        self.dst = dst
+        self.source_map = source_map
+        self.line_directives = line_directives
+        # Line of the next character, the last mapped line and if the next character starts a line.
+        self.line = 1
+        self.marked_line = 0
+        self.at_line_start = True
+
+    def write(self, text: str):
+        if text:
+            self.line += count_line_breaks(text)
+            self.at_line_start = text[-1] in '\r\n'
+            self.dst.write(text)
+
+    def mark(self, file_path: Path, input_line: int) -> str:
+        # The next character comes from the input line, returns the #line directive to write before it. Only the
+        # start of a line is mapped, a line continuing the output of another file keeps its location.
+        self.marked_line = self.line
+        if not self.at_line_start or self.source_map.continues(self.line, file_path, input_line):
+            return ''
+        if not self.line_directives:
+            self.source_map.add(self.line, file_path, input_line)
+            return ''
+        self.marked_line += 1
+        self.source_map.add(self.line + 1, file_path, input_line)
+        return line_directive(input_line, file_path)
@@ -0,0 +1,145 @@
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Dict, TextIO, List, Union
+
+from .hooks import QuomHooks, FileStats
+
+
+class Stats(QuomHooks):
+    def __init__(self):
+        self.files: List[FileStats] = []
+        self.resolved = Counter()
+        # The file which included a file (or embedded a resource) first.
+        self.parents: Dict[Path, Path] = {}
+        # Resources of #embed and their size in bytes.
+        self.resources: Dict[Path, int] = {}
+
+    def on_include_resolved(self, include_path: Path, file_path: Path, including_file_path: Union[Path, None]):
+        self.resolved[file_path] += 1
+        if including_file_path is not None and file_path not in self.parents:
+            self.parents[file_path] = including_file_path
+
+    def on_file_end(self, file_path: Path, stats: FileStats):
+        self.files.append(stats)
+
+    def on_resource_read(self, file_path: Path, including_file_path: Path, size: int):
+        self.resources[file_path] = size
+        self.parents.setdefault(file_path, including_file_path)
+
+    @property
+    def hits(self) -> int:
+        # Resolved files which were already processed.
+        return sum(self.resolved.values()) - len(self.files)
+
+    @property
+    def misses(self) -> int:
+        return len(self.files)
+
+    def slowest_files(self, top: int) -> List[FileStats]:
+        return sorted(self.files, key=lambda stats: stats.time, reverse=True)[:top]
+
+    def include_chain(self, file_path: Path) -> List[Path]:
+        # The files which included the file first, starting with the main or a source file.
+        chain = []
+        while file_path in self.parents and self.parents[file_path] not in chain:
+            file_path = self.parents[file_path]
+            chain.insert(0, file_path)
+        return chain
+
+    def report(self) -> dict:
+        # Contribution of every file to the output, the files with the most bytes first.
+        files = sorted(self.files, key=lambda stats: (-stats.bytes_out, str(stats.file_path)))
+        return {'bytes_out': sum(stats.bytes_out for stats in self.files),
+                'chars_out': sum(stats.chars_out for stats in self.files),
+                'lines_out': sum(stats.lines_out for stats in self.files),
+                'files': [{'file_path': str(stats.file_path), 'bytes_out': stats.bytes_out,
+                           'chars_out': stats.chars_out, 'lines_out': stats.lines_out,
+                           'subtree_bytes_out': stats.subtree_bytes_out, 'subtree_chars_out': stats.subtree_chars_out,
+                           'subtree_lines_out': stats.subtree_lines_out, 'chars_out_by_kind': stats.chars_out_by_kind,
+                           'include_chain': [str(x) for x in self.include_chain(stats.file_path)]}
+                          for stats in files],
+                'resources': [{'file_path': str(file_path), 'bytes_in': size,
+                               'include_chain': [str(x) for x in self.include_chain(file_path)]}
+                              for file_path, size in sorted(self.resources.items(), key=lambda x: (-x[1], str(x[0])))]}
+
+    def write_report(self, stream: TextIO, top: int = None):
+        report = self.report()
+        stream.write('{:>10} {:>6} {:>8} {:>10} {:>6} {:>8} {:>10}  {}\n'.format(
+            'bytes out', 'share', 'lines', 'subtree', 'code', 'comment', 'whitespace', 'file'))
+        for file in report['files'][:top]:
+            chars_out = file['chars_out']
+            kinds = ['{:.1%}'.format(file['chars_out_by_kind'].get(kind, 0) / chars_out) if chars_out else '-'
+                     for kind in ('code', 'comment', 'whitespace')]
+            share = file['bytes_out'] / report['bytes_out'] if report['bytes_out'] else 0
+            stream.write('{:>10} {:>6.1%} {:>8} {:>10} {:>6} {:>8} {:>10}  {}\n'.format(
+                file['bytes_out'], share, file['lines_out'], file['subtree_bytes_out'], *kinds, file['file_path']))
+            if file['include_chain']:
+                stream.write('{:>66}via {}\n'.format('', ' > '.join(Path(x).name for x in file['include_chain'])))
+        stream.write('{:>10} {:>6} {:>8}  total\n'.format(report['bytes_out'], '', report['lines_out']))
+
+    def write_summary(self, stream: TextIO, top: int = 10):
+        token_counts = Counter()
+        transform_times = Counter()
+        for stats in self.files:
+            token_counts.update(stats.token_counts)
+            transform_times.update(stats.transform_times)
+
+        stream.write('Files: {} processed ({} verbatim), {} already processed\n'.format(
+            self.misses, sum(stats.verbatim for stats in self.files), self.hits))
+        stream.write('Time: resolve {:.3f}s, read {:.3f}s, tokenize {:.3f}s, emit {:.3f}s, total {:.3f}s\n'.format(
+            sum(stats.resolve_time for stats in self.files), sum(stats.read_time for stats in self.files),
+            sum(stats.tokenize_time for stats in self.files), sum(stats.emit_time for stats in self.files),
+            sum(stats.time for stats in self.files)))
+        stream.write('Characters: {} in, {} out\n'.format(sum(stats.chars_in for stats in self.files),
+                                                          sum(stats.chars_out for stats in self.files)))
+        if self.resources:
+            stream.write('Resources: {} embedded, {} bytes\n'.format(len(self.resources), sum(self.resources.values())))
+        stream.write('Tokens: {}\n'.format(', '.join('{} {}'.format(name, count)
+                                                     for name, count in token_counts.most_common())))
+
+        if transform_times:
+            stream.write('Transforms: {}\n'.format(', '.join('{} {:.3f}s'.format(name, time) for name, time in
+                                                             transform_times.most_common())))
+
+        duplicate_comments = sum(stats.duplicate_comments for stats in self.files)
+        if duplicate_comments:
+            stream.write('Duplicate comments: {} dropped, {} characters saved\n'.format(
+                duplicate_comments, sum(stats.duplicate_comment_chars for stats in self.files)))
+
+        for stats in self.files:
+            if stats.duplicate_of:
+                stream.write('Duplicate: {} merged into {}\n'.format(stats.file_path, stats.duplicate_of))
+
+        stream.write('Slowest files:\n')
+        stream.write('{:>9} {:>9} {:>9} {:>9} {:>9} {:>10} {:>10}  {}\n'.format(
+            'total', 'resolve', 'read', 'tokenize', 'emit', 'chars in', 'chars out', 'file'))
+        for stats in self.slowest_files(top):
+            stream.write('{:>9.4f} {:>9.4f} {:>9.4f} {:>9.4f} {:>9.4f} {:>10} {:>10}  {}\n'.format(
+                stats.time, stats.resolve_time, stats.read_time, stats.tokenize_time, stats.emit_time,
+                stats.chars_in, stats.chars_out, stats.file_path))
+
+    def write_trace(self, stream: TextIO):
+        # Writes the processing steps of all files in the Chrome trace event format.
+        origin = min((stats.start for stats in self.files), default=0.0)
+
+        def event(name: str, category: str, start: float, duration: float, args: dict = None):
+            return {'name': name, 'cat': category, 'ph': 'X', 'pid': 0, 'tid': 0,
+                    'ts': (start - origin) * 1e6, 'dur': duration * 1e6, 'args': args or {}}
+
+        events = []
+        for stats in self.files:
+            events.append(event(str(stats.file_path), 'file', stats.start, stats.end - stats.start, {
+                'tokens': stats.token_counts, 'chars_in': stats.chars_in, 'chars_out': stats.chars_out,
+                'verbatim': stats.verbatim, 'duplicate_of': str(stats.duplicate_of) if stats.duplicate_of else None}))
+            start = stats.start
+            phases = [('resolve', stats.resolve_time), ('read', stats.read_time), ('tokenize', stats.tokenize_time)]
+            if stats.transform_times:
+                # Transforming and emitting alternate, the transform phase is shown as one block.
+                phases.append(('transform', stats.transform_time))
+            for name, duration in phases:
+                events.append(event(name, 'phase', start, duration))
+                start += duration
+            events.append(event('emit', 'phase', start, stats.end - start))
+
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, stream)
@@ -0,0 +1,46 @@
+from typing import TextIO
+
+# Characters collected before they are written and flushed to the stream.
+CHUNK_SIZE = 1 << 16
+
+
+class StreamWriter:
+    # Text output to a stream (e.g. stdout), which is written and flushed in chunks, so a pipe gets the output while
+    # it is generated. Encoded with the given encoding, if the stream has a binary buffer. The stream is not closed.
+    def __init__(self, stream: TextIO, encoding: str = 'utf-8'):
+        self.__stream = stream
+        self.__buffer = getattr(stream, 'buffer', None)
+        self.__encoding = encoding
+        self.__chunk = []
+        self.__chunk_size = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, text: str) -> int:
+        self.__chunk.append(text)
+        self.__chunk_size += len(text)
+        if self.__chunk_size >= CHUNK_SIZE:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        text = ''.join(self.__chunk)
+        self.__chunk = []
+        self.__chunk_size = 0
+        if self.__buffer is not None:
+            self.__stream.flush()
+            self.__buffer.write(text.encode(self.__encoding))
+            self.__buffer.flush()
+        else:
+            self.__stream.write(text)
+            self.__stream.flush()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.flush()
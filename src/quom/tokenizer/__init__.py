@@ -1,15 +1,64 @@
 # flake8: noqa Q003
-# Tokenizer
+import sys
+
+# Bound eagerly, importing the submodule .tokenize would otherwise bind the module to the name.
 from .tokenize import tokenize
-from .token import Token, EmptyToken, StartToken, EndToken
-from .tokenize_error import TokenizeError
-
-# Tokens
-from .comment_tokenizer import CommentToken, CppCommentToken, CCommentToken
-from .number_tokenizer import NumberToken
-from .preprocessor_tokenizer import PreprocessorToken, PreprocessorIncludeToken, PreprocessorUnknownIncludeToken, \
-    PreprocessorPragmaToken, PreprocessorPragmaOnceToken, PreprocessorDefineToken, PreprocessorIfNotDefinedToken, \
-    PreprocessorEndIfToken
-from .quote_tokenizer import QuoteToken, SingleQuoteToken, DoubleQuoteToken
-from .remaining_tokenizer import RemainingToken
-from .whitespace_tokenizer import WhitespaceToken, WhitespaceWhitespaceToken, LinebreakWhitespaceToken
+
+# Public names of the tokenizer and the submodules defining them, imported on first access.
+_LAZY_ATTRIBUTES = {
+    # Tokenizer
+    'Token': 'token',
+    'EmptyToken': 'token',
+    'StartToken': 'token',
+    'EndToken': 'token',
+    'TokenizeError': 'tokenize_error',
+
+    # Tokens
+    'CommentToken': 'comment_tokenizer',
+    'CppCommentToken': 'comment_tokenizer',
+    'CCommentToken': 'comment_tokenizer',
+    'NumberToken': 'number_tokenizer',
+    'PreprocessorToken': 'preprocessor_tokenizer',
+    'PreprocessorIncludeToken': 'preprocessor_tokenizer',
+    'PreprocessorUnknownIncludeToken': 'preprocessor_tokenizer',
+    'PreprocessorEmbedToken': 'preprocessor_tokenizer',
+    'PreprocessorPragmaToken': 'preprocessor_tokenizer',
+    'PreprocessorPragmaOnceToken': 'preprocessor_tokenizer',
+    'PreprocessorDefineToken': 'preprocessor_tokenizer',
+    'PreprocessorIfNotDefinedToken': 'preprocessor_tokenizer',
+    'PreprocessorEndIfToken': 'preprocessor_tokenizer',
+    'QuoteToken': 'quote_tokenizer',
+    'SingleQuoteToken': 'quote_tokenizer',
+    'DoubleQuoteToken': 'quote_tokenizer',
+    'RemainingToken': 'remaining_tokenizer',
+    'WhitespaceToken': 'whitespace_tokenizer',
+    'WhitespaceWhitespaceToken': 'whitespace_tokenizer',
+    'LinebreakWhitespaceToken': 'whitespace_tokenizer',
+}
+
+__all__ = ['tokenize'] + list(_LAZY_ATTRIBUTES)
+
+
+def _import(module_name: str):
+    # Same as the import statement, unlike importlib.import_module it shows up in -X importtime.
+    __import__(module_name, globals(), level=1)
+    return sys.modules['{}.{}'.format(__name__, module_name)]
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    value = getattr(_import(_LAZY_ATTRIBUTES[name]), name)
+    # Cache the value, following accesses do not reach __getattr__ anymore.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+if sys.version_info[:2] < (3, 7):
+    # Module level __getattr__ is not supported, resolve everything eagerly.
+    for _name in _LAZY_ATTRIBUTES:  # pragma: no cover
+        __getattr__(_name)
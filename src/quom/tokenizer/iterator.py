@@ -68,6 +68,15 @@ class RawIterator:
     def curr(self):
         return self._it.curr
 
+    @property
+    def src(self) -> str:
+        return self._it.src
+
+    @property
+    def position(self) -> int:
+        # Index of the current character in the source.
+        return self._it.curr_pos
+
     @property
     def lookahead(self):
         if self._it.curr_pos + 1 >= self._it.length:
@@ -91,6 +100,20 @@ class RawIterator:
         self.__step()
         return True if self._it.curr != '\0' else False
 
+    def skip_to_end_of(self, text: str):
+        # Move to the last character of the next occurrence of the raw text after the current character (or to the end)
+        # without stepping through the characters in between.
+        src = self._it.src
+        pos = src.find(text, self._it.curr_pos + 1)
+        if pos == -1:
+            self._it.prev = src[-1:] or '\0'
+            self._it.curr = '\0'
+            self._it.curr_pos = self._it.length
+        else:
+            self._it.curr_pos = pos + len(text) - 1
+            self._it.prev = src[self._it.curr_pos - 1]
+            self._it.curr = src[self._it.curr_pos]
+
     def __step(self):
         self._it.prev = self._it.curr
 
@@ -24,6 +24,14 @@ class PreprocessorToken(Token):
     def preprocessor_arguments(self):
         return self.preprocessor_tokens[self.preprocessor_arguments_idx:-1]
 
+    @property
+    def preprocessor_name(self):
+        # Name of the directive (e.g. define), empty for the null directive.
+        instruction = self.preprocessor_instruction
+        if len(instruction) < 2 or not isinstance(instruction[-1], RemainingToken):
+            return ''
+        return str(instruction[-1])
+
 
 class PreprocessorIncludeToken(PreprocessorToken):
     def __init__(self, start, end, is_local_include: bool, path_start, path_end):
@@ -36,6 +44,19 @@ class PreprocessorUnknownIncludeToken(PreprocessorToken):
     pass
 
 
+class PreprocessorEmbedToken(PreprocessorToken):
+    # C23 #embed of a resource, the parameters (e.g. limit(4)) follow the path.
+    def __init__(self, start, end, is_local_embed: bool, path_start, path_end):
+        super().__init__(start, end)
+        self.is_local_embed = is_local_embed
+        self.path = Span(path_start, path_end)
+        self.parameters_idx = None
+
+    @property
+    def parameters(self):
+        return self.preprocessor_tokens[self.parameters_idx:-1]
+
+
 class PreprocessorPragmaToken(PreprocessorToken):
     pass
 
@@ -79,10 +100,12 @@ def scan_for_line_end(it: LineWrapIterator, tokens: List[Token]):
             scan_for_remaining(tokens, it)
 
 
-def scan_for_preprocessor_include(start: LineWrapIterator, it: LineWrapIterator, tokens: List[Token]):
+def scan_for_preprocessor_include(start: LineWrapIterator, it: LineWrapIterator, tokens: List[Token],
+                                  is_embed: bool = False):
     if scan_for_whitespaces_and_comments(it, tokens) or it.curr != '"' and it.curr != '<':
         scan_for_line_end(it, tokens)
-        return PreprocessorUnknownIncludeToken(start, it)
+        # Embeds of a macro are left as they are.
+        return PreprocessorToken(start, it) if is_embed else PreprocessorUnknownIncludeToken(start, it)
 
     it = LineWrapIterator(it)
     it.next()
@@ -115,7 +138,12 @@ def scan_for_preprocessor_include(start: LineWrapIterator, it: LineWrapIterator,
     path_end = it.copy()
     it.next()
 
+    parameters_idx = len(tokens)
     scan_for_line_end(it, tokens)
+    if is_embed:
+        token = PreprocessorEmbedToken(start, it, is_local_include, path_start, path_end)
+        token.parameters_idx = parameters_idx
+        return token
     return PreprocessorIncludeToken(start, it, is_local_include, path_start, path_end)
 
 
@@ -151,6 +179,8 @@ def scan_for_preprocessor(tokens: List[Token], it: LineWrapIterator):
 
         if name == 'include':
             preprocessor_token = scan_for_preprocessor_include(start, it, preprocessor_tokens)
+        elif name == 'embed':
+            preprocessor_token = scan_for_preprocessor_include(start, it, preprocessor_tokens, True)
         elif name == 'pragma':
             preprocessor_token = scan_for_preprocessor_pragma(start, it, preprocessor_tokens)
         elif name == 'define':
@@ -81,13 +81,8 @@ def scan_for_quote_double(tokens: List[Token], it: LineWrapIterator):
         delimiter = ')' + delimiter + '"'
         it = RawIterator(it)
 
-        # Parse until delimiter occours again.
-        # TODO: Please optimize me.
-        string = ''
-        while it.next():
-            string += it.curr
-            if len(string) > len(delimiter) and string.endswith(delimiter):
-                break
+        # Search the delimiter in the raw characters after the parenthesis.
+        it.skip_to_end_of(delimiter)
 
         if it.curr != '"':
             raise TokenizeError('No terminating delimiter inside raw string literal found!', it)
@@ -0,0 +1,32 @@
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Iterable, Iterator, Union
+
+from .hooks import FileStats
+from .tokenizer import tokenize, Token
+
+# A stage between the tokenizer and the output. It is called with the file path and every token of the file (including
+# the start and end token) and yields the tokens to write instead. Yielded text is tokenized, the next stage gets the
+# tokens of it.
+Transform = Callable[[Path, Token], Iterable[Union[Token, str]]]
+
+
+def transform_name(transform: Transform) -> str:
+    return getattr(transform, '__name__', type(transform).__name__)
+
+
+def apply_transform(transform: Transform, file_path: Path, tokens: Iterable[Token],
+                    stats: FileStats = None) -> Iterator[Token]:
+    # Tokens are transformed one by one while they are written, the time spent in the stage is added to the stats.
+    name = transform_name(transform)
+    for token in tokens:
+        start = perf_counter() if stats else None
+        transformed = []
+        for result in transform(file_path, token):
+            if isinstance(result, str):
+                transformed.extend(tokenize(result)[1:-1])
+            else:
+                transformed.append(result)
+        if stats:
+            stats.transform_times[name] = stats.transform_times.get(name, 0.0) + perf_counter() - start
+        yield from transformed
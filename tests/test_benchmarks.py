@@ -0,0 +1,72 @@
+from io import StringIO
+from pathlib import Path
+
+from benchmarks.generator import ProjectConfig, generate_project
+from benchmarks.memory import create_memory_benchmarks
+from benchmarks.parse import create_parse_benchmarks
+from benchmarks.speed import create_benchmarks
+from quom import Quom
+
+CONFIG = ProjectConfig(header_count=12, fan_out=2, depth=3, file_size=400, comment_density=0.3,
+                       raw_string_density=0.1, macro_density=0.2, splice_frequency=0.2, seed=1)
+
+
+def amalgamate(project):
+    dst = StringIO()
+    Quom(project.main_path, dst, include_directories=project.include_directories,
+         source_directories=project.source_directories or None)
+    return dst.getvalue()
+
+
+def test_generate_project(fs):
+    flat_project = generate_project(Path('flat'), CONFIG)
+    directory_project = generate_project(Path('directories'), CONFIG, use_directories=True)
+
+    source_count = sum(path.suffix == '.cpp' for path in flat_project.files)
+    assert len(flat_project.files) == len(directory_project.files) == 12 + source_count + 1
+
+    for project in (flat_project, directory_project):
+        result = amalgamate(project)
+        assert result.count('#pragma once') == 1
+        assert result.count('#include <cstddef>') == 12
+        assert result.count('#include <vector>') == source_count
+        assert '#include "' not in result
+
+    assert amalgamate(flat_project) == amalgamate(directory_project)
+
+
+def test_benchmarks(fs):
+    projects = {'flat': generate_project(Path('flat'), CONFIG),
+                'directories': generate_project(Path('directories'), CONFIG, use_directories=True)}
+
+    benchmarks = create_benchmarks(projects, CONFIG)
+    assert [benchmark.name for benchmark in benchmarks] == [
+        'tokenize.flat', 'tokenize.directories', 'quom_tokens.flat', 'quom_tokens.directories', 'scan_for_whitespace',
+        'scan_for_comment', 'scan_for_quote', 'scan_for_number', 'scan_for_preprocessor', 'scan_for_remaining',
+        'iterator.splice', 'quom.flat', 'quom.directories', 'quom_cached.flat', 'quom_cached.directories']
+
+    for benchmark in benchmarks:
+        result = benchmark.run(1)
+        assert result['size'] > 0
+        assert len(result['times']) == 1
+
+
+def test_memory_benchmarks(fs):
+    projects = {'flat': generate_project(Path('flat'), CONFIG)}
+
+    for benchmark in create_memory_benchmarks(projects):
+        result = benchmark.run(top=3)
+        assert result['size'] > 0
+        assert result['peak'] > 0
+        assert result['live_objects']['LineWrapIterator'] > 0
+        assert 1 <= len(result['allocation_sites']) <= 3
+
+
+def test_parse_benchmarks(tmp_path):
+    projects = {'flat': generate_project(tmp_path / 'flat', CONFIG)}
+
+    results = [benchmark.run(1) for benchmark in create_parse_benchmarks(projects, tmp_path)]
+    assert [result['minify'] for result in results] == [0, 1, 2]
+    assert results[0]['size'] > results[1]['size'] >= results[2]['size']
+    # Every minified output compiles, if a compiler is found.
+    assert all(len(result['times']) == (1 if result['compiler'] else 0) for result in results)
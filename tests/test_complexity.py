@@ -0,0 +1,74 @@
+import gc
+from time import perf_counter
+
+import pytest
+
+from quom.tokenizer import tokenize
+
+# Pathological inputs of about n characters for every scanner. Each one stresses a single construct, which grows with
+# n: long tokens, long runs of characters with a special meaning and many tokens in one construct.
+GENERATORS = {
+    'quote.string': lambda n: '"' + 'a' * n + '";\n',
+    'quote.escapes': lambda n: '"' + '\\\\' * (n // 2) + '\\"";\n',
+    'quote.char': lambda n: "'" + '\\\\' * (n // 2) + "';\n",
+    'quote.raw_string': lambda n: 'R"x(' + 'a)x' * (n // 3) + ')x";\n',
+    'quote.raw_string_lines': lambda n: 'R"(' + 'a\\\n' * (n // 3) + ')";\n',
+    'comment.line': lambda n: '//' + 'a' * n + '\n',
+    'comment.block': lambda n: '/*' + 'a*' * (n // 2) + '*/\n',
+    'comment.block_lines': lambda n: '/*' + '*\n' * (n // 2) + '*/\n',
+    'number.digits': lambda n: '1' * n + ';\n',
+    'number.separators': lambda n: "1'" * (n // 2) + '1;\n',
+    'number.exponents': lambda n: '1.' + '0e+' * (n // 3) + ';\n',
+    'remaining.identifier': lambda n: 'a' * n + ';\n',
+    'remaining.operators': lambda n: '+-' * (n // 2) + ';\n',
+    'remaining.tokens': lambda n: 'a b ' * (n // 4) + '\n',
+    'whitespace.line_breaks': lambda n: '\n' * n,
+    'whitespace.spaces': lambda n: ' ' * n + '\n',
+    'preprocessor.macro': lambda n: '#define A ' + 'x + ' * (n // 4) + '\n',
+    'preprocessor.macro_lines': lambda n: '#define A ' + 'x + \\\n' * (n // 6) + '\n',
+    'preprocessor.include': lambda n: '#include "' + 'a' * n + '"\n',
+    'preprocessor.condition': lambda n: '#if ' + '(1 + ' * (n // 10) + '1' + ')' * (n // 10) + '\n#endif\n',
+    'preprocessor.pragma': lambda n: '#pragma ' + 'a ' * (n // 2) + '\n',
+    'splice.run': lambda n: 'a' + '\\\n' * (n // 2) + 'b;\n',
+    'splice.run_crlf': lambda n: 'a' + '\\\r\n' * (n // 3) + 'b;\n',
+    'splice.in_tokens': lambda n: 'int abc\\\n' * (n // 9) + ';\n',
+    'splice.backslashes': lambda n: '\\' * n + '\n',
+    'splice.backslashes_in_macro': lambda n: '#define A ' + '\\' * n + '\n',
+}
+
+# Geometric series of input sizes.
+SIZES = [1000 * 4 ** step for step in range(4)]
+# Runs of every input, the best one is used.
+REPEAT = 5
+# Allowed growth of the time per character from one size to the next. Quadratic scaling would give 4.
+MAX_SLOWDOWN = 3
+
+
+def tokenize_time(src: str, repeat: int) -> float:
+    # Best of some runs, without the garbage collector, which takes longer with more live objects.
+    gc.collect()
+    gc.disable()
+    try:
+        times = []
+        for _ in range(repeat):
+            start = perf_counter()
+            tokenize(src)
+            times.append(perf_counter() - start)
+        return min(times)
+    finally:
+        gc.enable()
+
+
+# Times depend on the machine and its load, run on a quiet one with -m timing.
+@pytest.mark.timing
+@pytest.mark.parametrize('name', GENERATORS)
+def test_linear_scaling(name):
+    generator = GENERATORS[name]
+    inputs = [generator(size) for size in SIZES]
+
+    # Warm up, the first run pays for imports and caches.
+    tokenize(inputs[0])
+    times = [tokenize_time(src, REPEAT) / len(src) for src in inputs]
+    for size, next_size, time, next_time in zip(SIZES, SIZES[1:], times, times[1:]):
+        assert next_time < time * MAX_SLOWDOWN, '{} scales worse than linear: {:.2f}x time per character from {} ' \
+                                                'to {} characters'.format(name, next_time / time, size, next_size)
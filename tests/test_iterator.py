@@ -175,3 +175,21 @@ def test_span():
     span = Span(it1, it2)
     assert ''.join(span) == 'a'
     assert ''.join(span) == 'a'
+
+
+def test_skip_to_end_of():
+    it = RawIterator('(a)"b)"c')
+    it.skip_to_end_of(')"')
+    assert it.prev == ')'
+    assert it.curr == '"'
+    it.next()
+    assert it.curr == 'b'
+
+    it.skip_to_end_of(')"')
+    assert it.curr == '"'
+    it.next()
+    assert it.curr == 'c'
+
+    it.skip_to_end_of(')"')
+    assert it.curr == '\0'
+    assert it.next() is False
@@ -0,0 +1,126 @@
+import bz2
+import gzip
+import lzma
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from quom.__main__ import main
+from quom.compress import CompressingWriter, output_codec
+import quom.compress
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "foo.hpp"
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+
+int foo();
+"""
+
+FILE_FOO_CPP = """\
+#include "foo.hpp"
+
+int foo() { return 0; }
+"""
+
+RESULT = """\
+#pragma once
+
+int foo();
+
+int foo() { return 0; }
+"""
+
+RESULT_HPP = """\
+#pragma once
+
+int foo();
+"""
+
+RESULT_CPP = """\
+#include "main.hpp"
+
+int foo() { return 0; }
+"""
+
+DECOMPRESS = {'gzip': gzip.decompress, 'bz2': bz2.decompress, 'lzma': lzma.decompress}
+
+
+def init():
+    for file_path, content in [('main.hpp', FILE_MAIN_HPP), ('foo.hpp', FILE_FOO_HPP), ('foo.cpp', FILE_FOO_CPP)]:
+        with open(file_path, 'w') as file:
+            file.write(content)
+
+
+def test_output_codec():
+    assert output_codec(Path('lib.hpp.gz'), None) == 'gzip'
+    assert output_codec(Path('lib.hpp.bz2'), None) == 'bz2'
+    assert output_codec(Path('lib.hpp.xz'), None) == 'lzma'
+    assert output_codec(Path('lib.hpp'), None) is None
+    assert output_codec(Path('lib.hpp'), 'bz2') == 'bz2'
+    assert output_codec(Path('lib.hpp.gz'), 'none') is None
+
+
+@pytest.mark.parametrize('codec', ['gzip', 'bz2', 'lzma'])
+def test_compressing_writer(codec, monkeypatch):
+    # Small chunks, so the text is passed in many parts.
+    monkeypatch.setattr(quom.compress, 'CHUNK_SIZE', 7)
+
+    file = BytesIO()
+    file.close = lambda: None
+    text = ''.join('line {} ä\n'.format(i) for i in range(1000))
+    with CompressingWriter(file, codec) as writer:
+        for line in text.splitlines(keepends=True):
+            assert writer.write(line) == len(line)
+    assert DECOMPRESS[codec](file.getvalue()).decode('utf-8') == text
+
+
+def test_compressing_writer_error():
+    class BrokenFile(BytesIO):
+        def write(self, data):
+            raise OSError('Disk full')
+
+    writer = CompressingWriter(BrokenFile(), 'bz2')
+    writer.write('x' * 1000000)
+    with pytest.raises(OSError, match='Disk full'):
+        writer.close()
+    # Closing again does nothing.
+    writer.close()
+
+
+def test_deterministic_gzip():
+    outputs = []
+    for _ in range(2):
+        file = BytesIO()
+        file.close = lambda: None
+        with CompressingWriter(file, 'gzip') as writer:
+            writer.write(RESULT)
+        outputs.append(file.getvalue())
+    assert outputs[0] == outputs[1]
+
+
+def test_main_compress(fs):
+    init()
+
+    main(['main.hpp', 'lib.hpp.gz'])
+    assert gzip.decompress(Path('lib.hpp.gz').read_bytes()).decode() == RESULT
+
+    main(['main.hpp', 'lib.hpp', '--compress', 'lzma'])
+    assert lzma.decompress(Path('lib.hpp').read_bytes()).decode() == RESULT
+
+    main(['main.hpp', 'plain.hpp.gz', '--compress', 'none'])
+    assert Path('plain.hpp.gz').read_text() == RESULT
+
+
+def test_main_compress_source_output(fs):
+    init()
+
+    # The source output keeps the extension of the compressed output, but includes the decompressed name.
+    main(['main.hpp', 'main.hpp.xz', '--shards', '1'])
+    assert lzma.decompress(Path('main.hpp.xz').read_bytes()).decode() == RESULT_HPP
+    assert lzma.decompress(Path('main_0.cpp.xz').read_bytes()).decode() == RESULT_CPP
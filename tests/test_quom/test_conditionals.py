@@ -0,0 +1,207 @@
+from io import StringIO
+from pathlib import Path
+
+import pytest
+
+from quom import Quom, QuomError
+from quom.__main__ import main
+from quom.conditionals import Conditionals
+from quom.tokenizer import tokenize
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "config.hpp"
+
+#if defined(_WIN32)
+#include "win.hpp"
+#elif defined(__APPLE__)
+#include "mac.hpp"
+#elif HAS_LINUX
+#include "linux.hpp"
+#else
+#error Unknown platform
+#endif
+
+#ifdef FEATURE
+int feature;
+#endif
+
+#if VERSION >= 3 && UNKNOWN
+int v3;
+#elif VERSION > 1
+int v2;
+#else
+int v1;
+#endif
+"""
+
+FILE_CONFIG_HPP = """\
+#ifndef CONFIG_HPP
+#define CONFIG_HPP
+
+#define HAS_LINUX 1
+#define VERSION (1 + 1)
+
+#endif // CONFIG_HPP
+"""
+
+FILE_WIN_HPP = """\
+#pragma once
+int win;
+"""
+
+FILE_MAC_HPP = """\
+#pragma once
+int mac;
+"""
+
+FILE_LINUX_HPP = """\
+#pragma once
+int linux;
+"""
+
+RESULT_WITHOUT_WIN32 = """\
+#pragma once
+
+#ifndef CONFIG_HPP
+#define CONFIG_HPP
+
+#define HAS_LINUX 1
+#define VERSION (1 + 1)
+
+#endif // CONFIG_HPP
+
+#if defined(__APPLE__)
+
+int mac;
+
+#elif HAS_LINUX
+
+int linux;
+
+#endif
+
+int feature;
+
+int v2;"""
+
+RESULT_WITH_WIN32 = """\
+#pragma once
+
+#ifndef CONFIG_HPP
+#define CONFIG_HPP
+
+#define HAS_LINUX 1
+#define VERSION (1 + 1)
+
+#endif // CONFIG_HPP
+
+int win;
+
+#ifdef FEATURE
+int feature;
+#endif
+
+int v2;"""
+
+
+def init():
+    for file_path, content in [('main.hpp', FILE_MAIN_HPP), ('config.hpp', FILE_CONFIG_HPP),
+                               ('win.hpp', FILE_WIN_HPP), ('mac.hpp', FILE_MAC_HPP), ('linux.hpp', FILE_LINUX_HPP)]:
+        with open(file_path, 'w') as file:
+            file.write(content)
+
+
+def process(conditionals: Conditionals, src: str) -> str:
+    tokens = tokenize(src)
+    conditionals.begin_file(tokens)
+    result = ''
+    for token in tokens:
+        token = conditionals.process(token)
+        if token:
+            result += token.raw
+    conditionals.end_file()
+    return result
+
+
+def test_conditionals(fs):
+    init()
+
+    dst = StringIO()
+    Quom('main.hpp', dst, defines=['FEATURE'], undefines=['_WIN32'])
+    assert dst.getvalue() == RESULT_WITHOUT_WIN32
+
+    dst = StringIO()
+    Quom('main.hpp', dst, defines=['_WIN32=0'])
+    assert dst.getvalue() == RESULT_WITH_WIN32
+
+
+def test_conditionals_without_macros(fs):
+    init()
+
+    # Without any given macro, nothing is evaluated.
+    dst = StringIO()
+    Quom('main.hpp', dst)
+    assert '#if VERSION >= 3 && UNKNOWN\n' in dst.getvalue()
+    assert 'int win;' in dst.getvalue()
+
+
+def test_conditionals_cli(fs):
+    init()
+
+    main(['main.hpp', 'result.hpp', '-D', 'FEATURE', '-U', '_WIN32'])
+    assert Path('result.hpp').read_text() == RESULT_WITHOUT_WIN32
+
+    with pytest.raises(QuomError):
+        main(['main.hpp', 'result.hpp', '-D', '1=2'])
+
+
+@pytest.mark.parametrize('expression,result', [
+    ('1', '+'), ('0', '-'), ('A', '+'), ('B', '-'), ('UNKNOWN', '?'),
+    ('defined(A) && !defined B', '+'), ('defined UNKNOWN', '?'), ('UNKNOWN || A', '+'), ('UNKNOWN && B', '-'),
+    ('UNKNOWN * 0', '?'), ('(1 + 2) * 3 == 9', '+'), ('-7 / 2 == -3 && -7 % 2 == -1', '+'), ('1 / 0', '?'),
+    ('1 << 70', '?'), ("0x10 + 010 + 0b1 + 1'000 == 1025", '+'), ('1u', '?'), ("'a'", '?'), ('"a"', '?'),
+    ('VERSION >= 11 ? A : B', '+'), ('UNKNOWN ? A : A', '+'), ('UNKNOWN ? A : B', '?'), ('EMPTY', '?'),
+    ('SELF', '?'), ('__has_include(<vector>)', '?'), ('F(1)', '?'), ('true && !false', '+'), ('(1', '?'),
+    ('1 +', '?')])
+def test_evaluate(expression, result):
+    conditionals = Conditionals(['A', 'VERSION=10 + 1', 'EMPTY=', 'SELF=SELF', 'F(x)=x'], ['B'])
+    src = '#if {}\n+\n#else\n-\n#endif\n'.format(expression)
+    assert process(conditionals, src) == (src if result == '?' else result + '\n')
+
+
+def test_branches():
+    conditionals = Conditionals([], ['A', 'B'])
+
+    # The first undecidable branch opens the block, branches after a taken one are removed.
+    assert process(conditionals, '#if A\na\n#elif U\nu\n#elif 1\none\n#elif V\nv\n#else\nelse\n#endif\n') == \
+        '#if U\nu\n#elif 1\none\n#endif\n'
+    assert process(conditionals, '#ifdef A\na\n#elifndef U\nu\n#endif\n') == '#ifndef U\nu\n#endif\n'
+    # Nested blocks in removed branches are removed too.
+    assert process(conditionals, '#if A\n#if U\nu\n#else\n#endif\n#else\nb\n#endif\n') == 'b\n'
+
+    # Macros defined in decided branches are known, in undecidable ones not.
+    assert process(conditionals, '#ifndef A\n#define A 2\n#undef B\n#endif\n#if A == 2\na\n#endif\n') == \
+        '#define A 2\n#undef B\na\n'
+    assert process(conditionals, '#if U\n#define A 3\n#endif\n#if A == 2\na\n#endif\n') == \
+        '#if U\n#define A 3\n#endif\n#if A == 2\na\n#endif\n'
+
+    # Blocks left open by a file are closed.
+    assert process(conditionals, '#if B\nb\n') == ''
+    assert process(conditionals, 'x\n#endif\n') == 'x\n#endif\n'
+
+
+def test_conditionals_shards(fs):
+    files = [('main.hpp', '#pragma once\n#include "a.hpp"\n#include "b.hpp"\n'), ('a.hpp', 'int a();\n'),
+             ('b.hpp', 'int b();\n'), ('a.cpp', '#define FAST 1\nint a() { return FAST; } // aaaaaaaaaaaaaaaaaaaa\n'),
+             ('b.cpp', '#ifdef FAST\nint b() { return 1; }\n#else\nint b() { return 0; }\n#endif\n')]
+    for file_path, content in files:
+        with open(file_path, 'w') as file:
+            file.write(content)
+
+    # Macros defined by the source files of one shard are not defined in the other ones.
+    source_dsts = [StringIO(), StringIO()]
+    Quom('main.hpp', StringIO(), source_dsts=source_dsts, undefines=['FAST'])
+    assert source_dsts[0].getvalue() == 'int b() { return 0; }\n'
+    assert source_dsts[1].getvalue() == '#define FAST 1\nint a() { return FAST; } // aaaaaaaaaaaaaaaaaaaa\n'
@@ -0,0 +1,122 @@
+from io import StringIO
+from pathlib import Path
+
+from quom import Quom, Stats
+from quom.__main__ import main
+
+FILE_MAIN_HPP = """\
+// Copyright (c) Example
+// MIT License
+
+// The main file.
+#pragma once
+
+#include "foo.hpp"
+#include "bar.hpp"
+
+int main();
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+// Copyright (c) Example
+// MIT License
+
+/* The foo file. */
+int foo(); // Copyright (c) Example
+// Copyright (c) Example
+int foo_bar;
+"""
+
+FILE_BAR_HPP = """\
+// Copyright (c) Example
+// MIT License
+#pragma once
+
+// Copyright (c) Example
+int bar();
+"""
+
+RESULT = """\
+// Copyright (c) Example
+// MIT License
+
+// The main file.
+#pragma once
+
+/* The foo file. */
+int foo(); // Copyright (c) Example
+// Copyright (c) Example
+int foo_bar;
+
+// Copyright (c) Example
+int bar();
+
+int main();"""
+
+RESULT_FORMAT = """\
+// Copyright (c) Example
+// MIT License
+
+// The main file.
+#pragma once
+
+/* The foo file. */
+int foo(); // Copyright (c) Example
+// Copyright (c) Example
+int foo_bar;
+
+int bar();
+
+int main();"""
+
+
+def init():
+    for file_path, content in [('main.hpp', FILE_MAIN_HPP), ('foo.hpp', FILE_FOO_HPP), ('bar.hpp', FILE_BAR_HPP)]:
+        with open(file_path, 'w') as file:
+            file.write(content)
+
+
+def test_dedupe_comments(fs):
+    init()
+
+    dst = StringIO()
+    stats = Stats()
+    Quom('main.hpp', dst, hooks=stats, dedupe_comments=True)
+    assert dst.getvalue() == RESULT
+
+    # The banners of foo.hpp and bar.hpp are dropped with their line breaks.
+    dropped = {stats.file_path.name: (stats.duplicate_comments, stats.duplicate_comment_chars) for stats in stats.files}
+    assert dropped == {'main.hpp': (0, 0), 'foo.hpp': (2, 40), 'bar.hpp': (2, 40)}
+
+    summary = StringIO()
+    stats.write_summary(summary)
+    assert 'Duplicate comments: 4 dropped, 80 characters saved' in summary.getvalue()
+
+
+def test_dedupe_comments_format(fs):
+    init()
+
+    # Comments matching the regex are written once, also in the middle of a file. Only comments at the start of a
+    # line are dropped.
+    dst = StringIO()
+    Quom('main.hpp', dst, dedupe_comment_format='Copyright')
+    assert dst.getvalue() == RESULT_FORMAT
+
+
+def test_dedupe_comments_disabled(fs):
+    init()
+
+    dst = StringIO()
+    Quom('main.hpp', dst)
+    assert dst.getvalue().count('// MIT License') == 3
+
+
+def test_dedupe_comments_cli(fs):
+    init()
+
+    main(['main.hpp', 'result.hpp', '--dedupe_comments'])
+    assert Path('result.hpp').read_text() == RESULT
+
+    main(['--dedupe_comments', '--dedupe_comment_regex', 'Copyright', 'main.hpp', 'result.hpp'])
+    assert Path('result.hpp').read_text() == RESULT_FORMAT
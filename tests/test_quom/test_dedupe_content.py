@@ -0,0 +1,152 @@
+from io import StringIO
+from pathlib import Path
+
+import quom.file_cache
+import quom.quom
+from quom import FileCache, Quom, Stats
+from quom.__main__ import main
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "a/util.hpp"
+#include "b/util.hpp"
+#include "a/plain.hpp"
+#include "b/plain.hpp"
+#include "b/once.hpp"
+#include "a/once.hpp"
+"""
+
+FILE_UTIL_HPP = """\
+#ifndef UTIL_HPP
+#define UTIL_HPP
+
+int util();
+
+#endif
+"""
+
+FILE_PLAIN_HPP = """\
+int plain;
+"""
+
+FILE_ONCE_HPP = """\
+#pragma once
+
+int once();
+"""
+
+RESULT = """\
+#pragma once
+
+#ifndef UTIL_HPP
+#define UTIL_HPP
+
+int util();
+
+#endif
+
+int plain;
+
+int plain;
+
+int once();
+"""
+
+
+def init():
+    for directory in ('a', 'b'):
+        Path(directory).mkdir()
+        for file_path, content in [('util.hpp', FILE_UTIL_HPP), ('plain.hpp', FILE_PLAIN_HPP),
+                                   ('once.hpp', FILE_ONCE_HPP)]:
+            with open(directory + '/' + file_path, 'w') as file:
+                file.write(content)
+    with open('main.hpp', 'w') as file:
+        file.write(FILE_MAIN_HPP)
+
+
+def test_dedupe_content(fs):
+    init()
+
+    dst = StringIO()
+    stats = Stats()
+    Quom('main.hpp', dst, hooks=stats, dedupe_content=True)
+    assert dst.getvalue() == RESULT
+
+    duplicates = {stats.file_path.relative_to(Path.cwd()).as_posix(): stats.duplicate_of.relative_to(Path.cwd())
+                  .as_posix() for stats in stats.files if stats.duplicate_of}
+    assert duplicates == {'b/util.hpp': 'a/util.hpp', 'a/once.hpp': 'b/once.hpp'}
+
+    summary = StringIO()
+    stats.write_summary(summary)
+    assert 'Duplicate: {} merged into {}'.format(Path('b/util.hpp').resolve(), Path('a/util.hpp').resolve()) in \
+        summary.getvalue()
+
+
+def test_dedupe_content_disabled(fs):
+    init()
+
+    dst = StringIO()
+    Quom('main.hpp', dst)
+    assert dst.getvalue().count('int util();') == 2
+    assert dst.getvalue().count('int once();') == 2
+
+
+def test_dedupe_content_with_shards(fs):
+    init()
+    with open('main.hpp', 'w') as file:
+        file.write('#pragma once\n#include "foo.hpp"\n#include "bar.hpp"\n')
+    for name, directory in (('foo', 'a'), ('bar', 'b')):
+        with open(name + '.hpp', 'w') as file:
+            file.write('int {}();\n'.format(name))
+        with open(name + '.cpp', 'w') as file:
+            file.write('#include "{}/util.hpp"\nint {}() {{ return util(); }}\n'.format(directory, name))
+
+    # Every shard is compiled on its own and needs its own copy.
+    shards = [StringIO(), StringIO()]
+    Quom('main.hpp', StringIO(), source_dsts=shards, dedupe_content=True)
+    assert [shard.getvalue().count('int util();') for shard in shards] == [1, 1]
+
+
+def test_dedupe_content_source_files(fs):
+    init()
+    with open('main.hpp', 'w') as file:
+        file.write('#pragma once\n#include "a/foo.hpp"\n#include "b/foo.hpp"\n')
+    for directory in ('a', 'b'):
+        with open(directory + '/foo.hpp', 'w') as file:
+            file.write('#pragma once\nint foo();\n')
+        with open(directory + '/foo.cpp', 'w') as file:
+            file.write('#include "foo.hpp"\nint foo() { return 1; }\n')
+
+    # The copy does not add its source file, the definition is written once.
+    dst = StringIO()
+    Quom('main.hpp', dst, dedupe_content=True)
+    assert dst.getvalue().count('int foo() { return 1; }') == 1
+    assert dst.getvalue().count('int foo();') == 1
+
+
+def test_dedupe_content_without_tokenizing(fs, monkeypatch):
+    init()
+    tokenized = []
+
+    def tokenize(src):
+        tokenized.append(src)
+        return quom.tokenizer.tokenize(src)
+
+    monkeypatch.setattr(quom.quom, 'tokenize', tokenize)
+    monkeypatch.setattr(quom.file_cache, 'tokenize', tokenize)
+
+    # Only the originals (with #pragma once, the main file) are tokenized, the include guards are found without.
+    for cache in (None, FileCache()):
+        tokenized.clear()
+        dst = StringIO()
+        Quom('main.hpp', dst, dedupe_content=True, cache=cache)
+        assert dst.getvalue() == RESULT
+        assert sorted(tokenized) == [FILE_MAIN_HPP, FILE_ONCE_HPP]
+
+
+def test_dedupe_content_cli(fs):
+    init()
+
+    main(['main.hpp', 'result.hpp', '--dedupe_content'])
+    assert Path('result.hpp').read_text() == RESULT
@@ -0,0 +1,121 @@
+import json
+import os
+from io import StringIO
+from pathlib import Path
+
+import pytest
+
+from quom import MemoryFileSystem, Quom, QuomError, Stats
+from quom.__main__ import main, worker
+from quom.embed import format_bytes
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "foo.hpp"
+
+const unsigned char empty[] = {
+#embed "empty.bin" if_empty(0)
+};
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+
+const unsigned char foo[] = {
+#embed "res/foo.bin" prefix(0x01, ) __suffix__(, 0x00) // foo
+};
+const unsigned char bar[] = {
+#embed <bar.bin> limit(0x2)
+};
+"""
+
+RESULT = """\
+#pragma once
+
+const unsigned char foo[] = {
+0x01,0x41, 0x42, 0x00, 0xff, 0x00
+};
+const unsigned char bar[] = {
+0x62, 0x61
+};
+
+const unsigned char empty[] = {
+0
+};"""
+
+
+def init():
+    os.mkdir('res')
+    os.mkdir('include')
+    for file_path, content in [('main.hpp', FILE_MAIN_HPP), ('foo.hpp', FILE_FOO_HPP)]:
+        with open(file_path, 'w') as file:
+            file.write(content)
+    for file_path, content in [('res/foo.bin', b'AB\x00\xff'), ('include/bar.bin', b'bar'), ('empty.bin', b'')]:
+        with open(file_path, 'wb') as file:
+            file.write(content)
+
+
+def test_embed(fs):
+    init()
+
+    dst = StringIO()
+    Quom('main.hpp', dst, include_directories=['include'])
+    assert dst.getvalue() == RESULT
+
+    main(['main.hpp', 'result.hpp', '-I', 'include', '--incremental'])
+    assert Path('result.hpp').read_text() == RESULT
+
+    # The files with an embedded resource are emitted again.
+    with open('include/bar.bin', 'wb') as file:
+        file.write(b'\x00\x01')
+    main(['main.hpp', 'result.hpp', '-I', 'include', '--incremental'])
+    assert Path('result.hpp').read_text() == RESULT.replace('0x62, 0x61', '0x00, 0x01')
+
+
+def test_embed_hooks(fs):
+    init()
+
+    stats = Stats()
+    Quom('main.hpp', StringIO(), include_directories=['include'], hooks=stats)
+    assert {file_path.name: size for file_path, size in stats.resources.items()} == {'foo.bin': 4, 'bar.bin': 3,
+                                                                                     'empty.bin': 0}
+    resources = stats.report()['resources']
+    assert [Path(resource['file_path']).name for resource in resources] == ['foo.bin', 'bar.bin', 'empty.bin']
+    assert resources[0]['include_chain'] == [str(Path('main.hpp').resolve()), str(Path('foo.hpp').resolve())]
+
+    # The resources are inputs of the persistent worker.
+    for options in ([], ['--stats']):
+        stdout = StringIO()
+        worker(StringIO(json.dumps({'arguments': ['main.hpp', 'result.hpp', '-I', 'include'] + options}) + '\n'),
+               stdout)
+        inputs = json.loads(stdout.getvalue())['inputs']
+        assert sorted(Path(x).name for x in inputs) == ['bar.bin', 'empty.bin', 'foo.bin', 'foo.hpp', 'main.hpp']
+
+
+def test_embed_memory_file_system():
+    file_system = MemoryFileSystem({'main.hpp': '#embed "text.txt"\n', 'text.txt': '\xe4'})
+    dst = StringIO()
+    Quom('main.hpp', dst, file_system=file_system)
+    assert dst.getvalue() == '0xc3, 0xa4'
+
+
+def test_embed_errors(fs):
+    init()
+
+    for directive in ('#embed "missing.bin"', '#embed <empty.bin>', '#embed "empty.bin" offset(1)',
+                      '#embed "empty.bin" limit(N)', '#embed "empty.bin" limit', '#embed "empty.bin" prefix(1'):
+        with open('main.hpp', 'w') as file:
+            file.write(directive + '\n')
+        with pytest.raises(QuomError):
+            Quom('main.hpp', StringIO(), include_directories=['res'])
+
+
+def test_format_bytes():
+    assert format_bytes(b'') == ''
+    assert format_bytes(b'\x00') == '0x00'
+    assert format_bytes(bytes(range(5)), 2) == '0x00, 0x01,\n0x02, 0x03,\n0x04'
+    assert format_bytes(bytes(range(4)), 2) == '0x00, 0x01,\n0x02, 0x03'
+
+    data = bytes(range(256)) * 9
+    assert format_bytes(data).replace('\n', ' ') == ', '.join('0x{:02x}'.format(x) for x in data)
@@ -0,0 +1,93 @@
+import io
+import tarfile
+import zipfile
+from io import StringIO
+from pathlib import Path
+
+import pytest
+
+from quom import ArchiveFileSystem, FileCache, MemoryFileSystem, Quom, QuomError
+from quom.__main__ import main
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "foo.hpp"
+#include "bar.hpp"
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+
+int foo();
+"""
+
+FILE_FOO_CPP = """\
+#include "foo.hpp"
+
+int foo() { return 42; }
+"""
+
+FILE_BAR_HPP = """\
+int bar();
+"""
+
+RESULT = """\
+#pragma once
+
+int foo();
+
+int bar();
+
+int foo() { return 42; }
+"""
+
+FILES = {'lib/main.hpp': FILE_MAIN_HPP, 'lib/foo.hpp': FILE_FOO_HPP, 'lib/src/foo.cpp': FILE_FOO_CPP,
+         'lib/include/bar.hpp': FILE_BAR_HPP.encode()}
+
+
+def test_memory_file_system(fs):
+    file_system = MemoryFileSystem(FILES)
+    assert file_system.resolve(Path('lib/include/../foo.hpp')) == Path('/lib/foo.hpp')
+    assert file_system.resolve(Path('lib')) is None
+    assert file_system.size(Path('/lib/include/bar.hpp')) == len(FILE_BAR_HPP)
+
+    dst = StringIO()
+    Quom('lib/main.hpp', dst, include_directories=['lib/include', 'lib'], relative_source_directories=[Path('src')],
+         file_system=file_system, read_ahead=2)
+    assert dst.getvalue() == RESULT
+
+    # Nothing is read from the file system of the OS.
+    assert not Path('lib').exists()
+
+    with pytest.raises(QuomError):
+        Quom('lib/main.hpp', StringIO(), file_system=file_system)
+
+    with pytest.raises(QuomError):
+        Quom('lib/main.hpp', StringIO(), file_system=file_system, cache=FileCache())
+
+
+def test_archive_file_system(fs):
+    with zipfile.ZipFile('lib.zip', 'w') as archive:
+        for file_path, content in FILES.items():
+            archive.writestr(file_path, content)
+
+    with tarfile.open('lib.tar.gz', 'w:gz') as archive:
+        for file_path, content in FILES.items():
+            content = content.encode() if isinstance(content, str) else content
+            info = tarfile.TarInfo(file_path)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+
+    for archive_path in ('lib.zip', 'lib.tar.gz'):
+        dst = StringIO()
+        Quom('lib/main.hpp', dst, include_directories=['lib/include', 'lib'], relative_source_directories=[Path('src')],
+             file_system=ArchiveFileSystem(archive_path))
+        assert dst.getvalue() == RESULT
+
+    main(['lib/main.hpp', 'result.hpp', '--archive', 'lib.tar.gz', '-I', 'lib/include', '-I', 'lib', '-S', './src'])
+    assert Path('result.hpp').read_text() == RESULT
+
+    Path('lib.txt').write_text('no archive')
+    with pytest.raises(QuomError):
+        ArchiveFileSystem('lib.txt')
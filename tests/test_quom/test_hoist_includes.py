@@ -0,0 +1,134 @@
+from io import StringIO
+from pathlib import Path
+
+import pytest
+
+from quom import Quom, QuomError
+from quom.__main__ import main
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include <vector>
+#include "foo.hpp"
+#include "bar.hpp"
+
+std::vector<int> values;
+"""
+
+FILE_FOO_HPP = """\
+#ifndef FOO_HPP
+#define FOO_HPP
+
+#include <string>
+#include <vector>
+
+#ifdef _WIN32
+#include <windows.h>
+#endif
+
+std::string foo();
+
+#endif // FOO_HPP
+"""
+
+FILE_BAR_HPP = """\
+#pragma once
+
+#if defined(BAR_THREADS)
+#   include <thread>
+#elif 0
+#   include <future>
+#else
+#endif
+#include <map>  // map
+
+std::map<int, int> bar;
+"""
+
+FILE_FOO_CPP = """\
+#include "foo.hpp"
+#include <string>
+#include <sstream>
+
+std::string foo() { return "foo"; }
+"""
+
+RESULT = """\
+#pragma once
+#include <vector>
+#include <string>
+#include <map>
+#include <sstream>
+
+#ifndef FOO_HPP
+#define FOO_HPP
+
+#ifdef _WIN32
+#include <windows.h>
+#endif
+
+std::string foo();
+
+#endif // FOO_HPP
+
+#if defined(BAR_THREADS)
+#   include <thread>
+#elif 0
+#   include <future>
+#else
+#endif
+
+std::map<int, int> bar;
+
+std::vector<int> values;
+
+std::string foo() { return "foo"; }
+"""
+
+
+def init():
+    for file_path, content in [('main.hpp', FILE_MAIN_HPP), ('foo.hpp', FILE_FOO_HPP), ('bar.hpp', FILE_BAR_HPP),
+                               ('foo.cpp', FILE_FOO_CPP)]:
+        with open(file_path, 'w') as file:
+            file.write(content)
+
+
+def test_hoist_includes(fs):
+    init()
+
+    dst = StringIO()
+    Quom('main.hpp', dst, hoist_includes=True)
+    assert dst.getvalue() == RESULT
+
+
+def test_hoist_includes_at_location(fs):
+    init()
+    with open('main.hpp', 'w') as file:
+        file.write('// License\n\n// ~> includes <~\n' + FILE_MAIN_HPP)
+
+    dst = StringIO()
+    Quom('main.hpp', dst, hoist_includes=True, hoist_format='~> includes <~')
+    assert dst.getvalue().startswith('// License\n\n#include <vector>\n#include <string>\n#include <map>\n'
+                                     '#include <sstream>\n#pragma once\n')
+
+    with pytest.raises(QuomError):
+        Quom('main.hpp', StringIO(), hoist_includes=True, hoist_format='~> missing <~')
+
+
+def test_hoist_includes_with_source_output(fs):
+    init()
+
+    dst = StringIO()
+    source_dst = StringIO()
+    Quom('main.hpp', dst, hoist_includes=True, source_dsts=[source_dst], header_include='main.hpp')
+    assert dst.getvalue().startswith('#pragma once\n#include <vector>\n#include <string>\n#include <map>\n\n')
+    # Source outputs are not hoisted.
+    assert '#include <sstream>' in source_dst.getvalue()
+
+
+def test_hoist_includes_cli(fs):
+    init()
+
+    main(['main.hpp', 'result.hpp', '--hoist_includes'])
+    assert Path('result.hpp').read_text() == RESULT
@@ -0,0 +1,194 @@
+import os
+from io import StringIO
+from pathlib import Path
+
+import pytest
+
+from quom import Quom, QuomError, Stats
+from quom.__main__ import main
+from quom.incremental import OutputIndex, index_path, load_index
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "foo.hpp"
+#include "bar.hpp"
+
+int main();
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+
+#include "bar.hpp"
+
+int foo();
+"""
+
+FILE_BAR_HPP = """\
+#pragma once
+
+int bar();
+"""
+
+FILE_FOO_CPP = """\
+#include "foo.hpp"
+
+int foo() { return 0; }
+"""
+
+FILE_BAR_CPP = """\
+#include "bar.hpp"
+
+int bar() { return 1; }
+"""
+
+FILE_BAR_CPP_CHANGED = """\
+#include "bar.hpp"
+
+
+int bar() { return 2; }
+"""
+
+FILE_INCLUDE_BAR_HPP = """\
+#pragma once
+
+int include_bar();
+"""
+
+RESULT = """\
+#pragma once
+
+int bar();
+
+int foo();
+
+int main();
+
+int bar() { return 1; }
+
+int foo() { return 0; }
+"""
+
+RESULT_CHANGED = """\
+#pragma once
+
+int bar();
+
+int foo();
+
+int main();
+
+int bar() { return 2; }
+
+int foo() { return 0; }
+"""
+
+RESULT_INCLUDE_BAR = """\
+#pragma once
+
+int include_bar();
+
+int foo();
+
+int main();
+
+int bar() { return 2; }
+
+int foo() { return 0; }
+"""
+
+TICK = 10 ** 9
+
+
+def write(file_path: str, content: str, tick: int):
+    with open(file_path, 'w') as file:
+        file.write(content)
+    # The modification time changes with every write.
+    os.utime(file_path, ns=(tick, tick))
+
+
+def init():
+    for tick, (file_path, content) in enumerate([('main.hpp', FILE_MAIN_HPP), ('foo.hpp', FILE_FOO_HPP),
+                                                 ('bar.hpp', FILE_BAR_HPP), ('foo.cpp', FILE_FOO_CPP),
+                                                 ('bar.cpp', FILE_BAR_CPP)], 1):
+        write(file_path, content, tick * TICK)
+    os.mkdir('include')
+
+
+def amalgamate(**kwargs) -> Stats:
+    # Runs Quom with the index of the previous run and returns the stats of the emitted (not copied) files.
+    output_path = Path('result.hpp')
+    index = load_index(index_path(output_path), output_path, 'utf-8')
+    stats = Stats()
+    with output_path.open('w') as file:
+        Quom('main.hpp', file, hooks=stats, include_directories=['include'], index=index, **kwargs)
+    index.save(index_path(output_path))
+    return stats
+
+
+def emitted_files(stats: Stats):
+    return sorted(file.file_path.name for file in stats.files)
+
+
+def test_incremental(fs):
+    init()
+
+    assert emitted_files(amalgamate()) == ['bar.cpp', 'bar.hpp', 'foo.cpp', 'foo.hpp', 'main.hpp']
+    assert Path('result.hpp').read_text() == RESULT
+
+    # Nothing changed, the whole output is copied.
+    assert emitted_files(amalgamate()) == []
+    assert Path('result.hpp').read_text() == RESULT
+
+    # Only the changed file is emitted again.
+    write('bar.cpp', FILE_BAR_CPP_CHANGED, 10 * TICK)
+    assert emitted_files(amalgamate()) == ['bar.cpp']
+    assert Path('result.hpp').read_text() == RESULT_CHANGED
+
+    # A file with the same content, but another modification time is copied.
+    write('foo.cpp', FILE_FOO_CPP, 11 * TICK)
+    assert emitted_files(amalgamate()) == []
+    assert Path('result.hpp').read_text() == RESULT_CHANGED
+
+
+def test_incremental_include_graph(fs):
+    init()
+    amalgamate()
+    write('bar.cpp', FILE_BAR_CPP_CHANGED, 10 * TICK)
+
+    # bar.hpp is resolved from the include directory now, every file including it is emitted again.
+    os.remove('bar.hpp')
+    write('include/bar.hpp', FILE_INCLUDE_BAR_HPP, 11 * TICK)
+    assert emitted_files(amalgamate()) == ['bar.cpp', 'bar.hpp', 'foo.hpp', 'main.hpp']
+    assert Path('result.hpp').read_text() == RESULT_INCLUDE_BAR
+
+
+def test_incremental_fallback(fs):
+    init()
+    amalgamate()
+
+    # An index of another output or configuration is not used.
+    Path('result.hpp').write_text(RESULT + '\n')
+    assert len(emitted_files(amalgamate())) == 5
+    assert len(emitted_files(amalgamate(trim=False))) == 5
+    Path('result.hpp.quom-index').write_text('{')
+    assert len(emitted_files(amalgamate(trim=False))) == 5
+
+    with pytest.raises(QuomError):
+        Quom('main.hpp', StringIO(), minify=1, index=OutputIndex())
+
+
+def test_main_incremental(fs):
+    init()
+
+    main(['main.hpp', 'result.hpp', '--incremental'])
+    assert Path('result.hpp').read_text() == RESULT
+    assert Path('result.hpp.quom-index').exists()
+
+    write('bar.cpp', FILE_BAR_CPP_CHANGED, 10 * TICK)
+    main(['main.hpp', 'result.hpp', '--incremental'])
+    assert Path('result.hpp').read_text() == RESULT_CHANGED
+
+    with pytest.raises(QuomError):
+        main(['main.hpp', 'result.hpp.gz', '--incremental'])
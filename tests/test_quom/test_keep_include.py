@@ -0,0 +1,90 @@
+import os
+from io import StringIO
+from pathlib import Path
+
+from quom import Quom, Stats
+from quom.__main__ import main
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "foo.hpp"
+#include "vendor/json/json.hpp"
+#include "fmt.hpp"
+
+int main();
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+
+#include "vendor/json/json.hpp"
+
+int foo();
+"""
+
+FILE_FMT_HPP = """\
+#pragma once
+
+int fmt();
+"""
+
+RESULT = """\
+#pragma once
+
+#include "vendor/json/json.hpp"
+
+int foo();
+
+#include "vendor/json/json.hpp"
+
+int fmt();
+
+int main();"""
+
+RESULT_FILE_NAME = """\
+#pragma once
+
+#include "vendor/json/json.hpp"
+
+int foo();
+
+#include "vendor/json/json.hpp"
+#include "fmt.hpp"
+
+int main();"""
+
+
+def init():
+    os.makedirs('vendor/json')
+    for file_path, content in [('main.hpp', FILE_MAIN_HPP), ('foo.hpp', FILE_FOO_HPP), ('fmt.hpp', FILE_FMT_HPP)]:
+        with open(file_path, 'w') as file:
+            file.write(content)
+    # Never read, the content would break the output.
+    with open('vendor/json/json.hpp', 'w') as file:
+        file.write('"')
+
+
+def test_keep_include(fs):
+    init()
+
+    dst = StringIO()
+    stats = Stats()
+    Quom('main.hpp', dst, hooks=stats, keep_includes=['vendor/*'], read_ahead=2)
+    assert dst.getvalue() == RESULT
+    assert sorted(file.file_path.name for file in stats.files) == ['fmt.hpp', 'foo.hpp', 'main.hpp']
+
+    # A glob without a slash matches the file name.
+    dst = StringIO()
+    Quom('main.hpp', dst, keep_includes=['json.hpp', 'f?t.*'])
+    assert dst.getvalue() == RESULT_FILE_NAME
+
+
+def test_keep_include_cli(fs):
+    init()
+
+    main(['main.hpp', 'result.hpp', '--keep_include', 'vendor/json/*'])
+    assert Path('result.hpp').read_text() == RESULT
+
+    main(['main.hpp', 'result.hpp', '--keep_include', 'json.hpp', '--keep_include', 'fmt.hpp'])
+    assert Path('result.hpp').read_text() == RESULT_FILE_NAME
@@ -0,0 +1,108 @@
+from io import StringIO
+from pathlib import Path
+
+from quom import Quom
+from quom.__main__ import main
+
+FILE_MAIN_HPP = """\
+// Copyright 2024 Foo. License: MIT
+#pragma once
+
+/* Block
+   comment */
+#include <vector>   // For std::vector.
+#include "foo.hpp"
+
+namespace foo {
+    int a/**/= 1;   // Trailing comment.
+
+    const char* s = "a  // no comment";
+    const char* r = R"(raw /* no comment */
+
+   two)";
+    int b = a \\
+        + 2;
+}
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+
+#  define  FOO(x) /* c */ x \\
+   + 1 // d
+
+#define BAR 1 \\
+
+int bar = BAR;
+"""
+
+RESULT_1 = """\
+#pragma once
+#include <vector>
+#  define  FOO(x)  x + 1
+#define BAR 1
+int bar = BAR;
+namespace foo {
+    int a = 1;
+    const char* s = "a  // no comment";
+    const char* r = R"(raw /* no comment */
+
+   two)";
+    int b = a + 2;
+}"""
+
+RESULT_2 = """\
+// Copyright 2024 Foo. License: MIT
+#pragma once
+#include <vector>
+# define FOO(x) x + 1
+#define BAR 1
+int bar = BAR;
+namespace foo {
+int a = 1;
+const char* s = "a  // no comment";
+const char* r = R"(raw /* no comment */
+
+   two)";
+int b = a + 2;
+}"""
+
+
+def init():
+    with open('main.hpp', 'w') as file:
+        file.write(FILE_MAIN_HPP)
+    with open('foo.hpp', 'w') as file:
+        file.write(FILE_FOO_HPP)
+
+
+def test_minify(fs):
+    init()
+
+    dst = StringIO()
+    Quom('main.hpp', dst, minify=1)
+    assert dst.getvalue() == RESULT_1
+
+    dst = StringIO()
+    Quom('main.hpp', dst, minify=2, keep_comment_format='Copyright|License')
+    assert dst.getvalue() == RESULT_2
+
+
+def test_minify_without_trim(fs):
+    init()
+
+    dst = StringIO()
+    Quom('main.hpp', dst, trim=False, minify=1)
+    assert dst.getvalue() == RESULT_1 + '\n'
+
+
+def test_minify_cli(fs):
+    init()
+
+    main(['main.hpp', 'result.hpp', '--minify', '--minify_level', '2', '--keep_comment', 'Copyright'])
+    assert Path('result.hpp').read_text() == RESULT_2
+
+    main(['-m', 'main.hpp', 'result.hpp'])
+    assert Path('result.hpp').read_text() == RESULT_1
+
+    main(['main.hpp', 'result.hpp', '--minify_level', '2'])
+    assert '/* Block' in Path('result.hpp').read_text()
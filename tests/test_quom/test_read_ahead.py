@@ -0,0 +1,153 @@
+import os
+from concurrent.futures import wait
+from io import StringIO
+from pathlib import Path
+
+from quom import FileCache, MemoryFileSystem, Quom
+from quom.file_cache import read_file
+from quom.read_ahead import ReadAhead
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "a.hpp"
+#include "b.hpp"
+#include "lib/c.hpp"
+"""
+
+FILE_A_HPP = """\
+#pragma once
+
+#include "b.hpp"
+
+int a();
+"""
+
+FILE_A_CPP = """\
+#include "a.hpp"
+
+int a() { return 1; }
+"""
+
+FILE_B_HPP = """\
+#pragma once
+
+int b();
+"""
+
+FILE_C_HPP = """\
+#pragma once
+
+#include "../b.hpp"
+#include "d.hpp"
+
+int c();
+"""
+
+FILE_D_HPP = """\
+int d();\r
+"""
+
+
+def init():
+    os.makedirs('include/lib')
+    for file_path, content in [('main.hpp', FILE_MAIN_HPP), ('a.hpp', FILE_A_HPP), ('a.cpp', FILE_A_CPP),
+                               ('b.hpp', FILE_B_HPP), ('include/lib/c.hpp', FILE_C_HPP),
+                               ('include/lib/d.hpp', FILE_D_HPP)]:
+        with open(file_path, 'w', newline='') as file:
+            file.write(content)
+
+
+def amalgamate(**kwargs):
+    dst = StringIO()
+    Quom('main.hpp', dst, include_directories=['include'], **kwargs)
+    return dst.getvalue()
+
+
+def test_read_ahead(fs):
+    init()
+
+    result = amalgamate()
+    assert 'int d();\n' in result
+    assert amalgamate(read_ahead=1) == result
+    assert amalgamate(read_ahead=4) == result
+    assert amalgamate(read_ahead=2, cache=FileCache()) == result
+
+
+def test_read_ahead_take(fs):
+    init()
+    read_ahead = ReadAhead(2, [Path('include')], 'utf-8')
+
+    read_ahead.submit(Path(), Path('lib/d.hpp'))
+    read_ahead.submit(Path('include/lib'), Path('../../b.hpp'))
+    read_ahead.submit(Path(), Path('b.hpp'))
+    read_ahead.submit(Path(), Path('missing.hpp'))
+    # Reads which have not started yet are not waited for but done synchronously.
+    wait(read_ahead._ReadAhead__futures.values())
+
+    signature, src = read_ahead.take(Path(), Path('lib/d.hpp'), Path('include/lib/d.hpp').resolve())
+    assert (signature, src) == read_file(Path('include/lib/d.hpp'), 'utf-8')
+    assert src == 'int d();\n'
+
+    # The same file is read only once.
+    results = [read_ahead.take(Path('include/lib'), Path('../../b.hpp'), Path('b.hpp').resolve()),
+               read_ahead.take(Path(), Path('b.hpp'), Path('b.hpp').resolve())]
+    assert [result[1] for result in results if result] == [FILE_B_HPP]
+    # Belongs to another file than Quom resolved.
+    read_ahead.submit(Path(), Path('a.cpp'))
+    wait(read_ahead._ReadAhead__futures.values())
+    assert read_ahead.take(Path(), Path('a.cpp'), Path('a.hpp').resolve()) is None
+
+    assert read_ahead.take(Path(), Path('missing.hpp'), Path('missing.hpp').resolve()) is None
+    assert read_ahead.take(Path(), Path('a.hpp'), Path('a.hpp').resolve()) is None
+    read_ahead.close()
+
+
+def test_read_ahead_advise(fs, monkeypatch):
+    init()
+    advised = []
+    monkeypatch.setattr(os, 'posix_fadvise', lambda fd, offset, length, advice: advised.append(advice),
+                        raising=False)
+    monkeypatch.setattr(os, 'POSIX_FADV_WILLNEED', 3, raising=False)
+
+    read_ahead = ReadAhead(1, [Path('include')], 'utf-8')
+    read_ahead.submit(Path(), Path('lib/d.hpp'))
+    read_ahead.submit(Path(), Path('missing.hpp'))
+    # Hinted when scheduled, not when read.
+    assert advised == [3]
+    read_ahead.close()
+
+    # Neither by synchronous reads nor for other file systems.
+    read_file(Path('a.hpp'), 'utf-8')
+    files = MemoryFileSystem({'main.hpp': '#include "a.hpp"\n', 'a.hpp': FILE_B_HPP})
+    Quom('main.hpp', StringIO(), read_ahead=2, file_system=files)
+    assert advised == [3]
+
+
+def test_read_ahead_conditionals(monkeypatch):
+    files = MemoryFileSystem({'main.hpp': '#ifndef MAIN_HPP\n#define MAIN_HPP\n#include "a.hpp"\n#ifdef DEBUG\n'
+                                          '#include "debug.hpp"\n#endif\n#endif\n',
+                              'a.hpp': 'int a();\n', 'debug.hpp': 'int debug();\n'})
+    submitted = []
+    monkeypatch.setattr(ReadAhead, 'submit', lambda self, relative_path, include_path: submitted.append(include_path))
+
+    # Includes in dead branches are not read ahead.
+    dst = StringIO()
+    Quom('main.hpp', dst, read_ahead=2, undefines=['DEBUG'], file_system=files)
+    assert 'debug' not in dst.getvalue()
+    assert submitted == [Path('a.hpp')]
+
+    submitted.clear()
+    Quom('main.hpp', StringIO(), read_ahead=2, file_system=files)
+    assert submitted == [Path('a.hpp'), Path('debug.hpp')]
+
+
+def test_read_ahead_cli(fs):
+    from quom.__main__ import main
+
+    init()
+    main(['main.hpp', 'result.hpp', '-I', 'include', '--read_ahead'])
+    assert Path('result.hpp').read_text() == amalgamate()
+
+    main(['--read_ahead', '--read_ahead_threads', '1', 'main.hpp', 'result.hpp', '-I', 'include'])
+    assert Path('result.hpp').read_text() == amalgamate()
@@ -0,0 +1,132 @@
+import os
+from io import StringIO
+
+import pytest
+
+from quom import FileCache, MemoryFileSystem, QuomError, QuomSession, Stats
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "foo.hpp"
+
+int main();
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+
+int foo();
+"""
+
+FILE_FOO_HPP_CHANGED = """\
+#pragma once
+
+int foo(int);
+"""
+
+FILE_FOO_CPP = """\
+#include "foo.hpp"
+
+int foo() { return 0; }
+"""
+
+RESULT = """\
+#pragma once
+
+int foo();
+
+int main();
+
+int foo() { return 0; }
+"""
+
+RESULT_CHANGED = """\
+#pragma once
+
+int foo(int);
+
+int main();
+
+int foo() { return 0; }
+"""
+
+RESULT_HPP = """\
+#pragma once
+
+int foo();
+
+int main();"""
+
+RESULT_CPP = """\
+#include "main.hpp"
+
+int foo() { return 0; }
+"""
+
+
+def init():
+    for file_path, content in [('main.hpp', FILE_MAIN_HPP), ('foo.hpp', FILE_FOO_HPP), ('foo.cpp', FILE_FOO_CPP)]:
+        with open(file_path, 'w') as file:
+            file.write(content)
+
+
+def run(session: QuomSession, *args) -> str:
+    dst = StringIO()
+    session.run('main.hpp', dst, *args)
+    return dst.getvalue()
+
+
+def test_session(fs):
+    init()
+
+    session = QuomSession()
+    assert isinstance(session.cache, FileCache)
+
+    # Every run starts with an empty output state, the files are read once.
+    assert run(session) == RESULT
+    assert run(session) == RESULT
+    assert session.cache.misses == 3
+    assert session.cache.hits == 3
+
+    # Changed files are read again.
+    with open('foo.hpp', 'w') as file:
+        file.write(FILE_FOO_HPP_CHANGED)
+    os.utime('foo.hpp', ns=(1, 1))
+    assert run(session) == RESULT_CHANGED
+    assert session.cache.misses == 4
+
+    # The outputs can change from run to run.
+    with open('foo.hpp', 'w') as file:
+        file.write(FILE_FOO_HPP)
+    os.utime('foo.hpp', ns=(2, 2))
+    source_dst = StringIO()
+    assert run(session, [source_dst], 'main.hpp') == RESULT_HPP
+    assert source_dst.getvalue() == RESULT_CPP
+    assert run(session) == RESULT
+
+
+def test_session_options(fs):
+    init()
+
+    stats = Stats()
+    session = QuomSession(hooks=stats, minify=1, hoist_includes=True, defines=['A'], dedupe_content=True)
+    for _ in range(2):
+        assert run(session) == '#pragma once\nint foo();\nint main();\nint foo() { return 0; }\n'
+    assert len(stats.files) == 6
+
+    with pytest.raises(QuomError):
+        QuomSession(stitch_format='~> stitch <~').run('main.hpp', StringIO(), [StringIO()])
+
+
+def test_session_without_cache(fs):
+    init()
+
+    assert QuomSession(keep_files=False).cache is None
+    assert QuomSession(file_system=MemoryFileSystem({})).cache is None
+    with pytest.raises(QuomError):
+        QuomSession(cache=FileCache(), file_system=MemoryFileSystem({}))
+
+    session = QuomSession(file_system=MemoryFileSystem({'main.hpp': FILE_MAIN_HPP, 'foo.hpp': FILE_FOO_HPP}))
+    for _ in range(2):
+        assert run(session) == RESULT_HPP
@@ -0,0 +1,122 @@
+from io import StringIO
+from pathlib import Path
+
+import pytest
+
+from quom import Quom, QuomError, Stats
+from quom.__main__ import main
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "a.hpp"
+#include "b.hpp"
+#include "c.hpp"
+"""
+
+FILE_UTIL_HPP = """\
+#pragma once
+
+int util();
+"""
+
+FILE_UTIL_CPP = """\
+#include "util.hpp"
+
+int util() { return 1; }
+"""
+
+RESULT_HPP = """\
+#pragma once
+
+int a();
+
+int b();
+
+int c();
+"""
+
+RESULT_0_CPP = """\
+#include "lib.hpp"
+
+int util();
+
+int a() { return 0; } // aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa
+
+int util() { return 1; }
+"""
+
+RESULT_1_CPP = """\
+#include "lib.hpp"
+
+int util();
+
+int b() { return 0; } // bbbbbbbbbb
+
+int c() { return 0; } // cccccccccccccccccccccccccccccc
+"""
+
+
+def init():
+    with open('main.hpp', 'w') as file:
+        file.write(FILE_MAIN_HPP)
+    for name, size in [('a', 50), ('b', 10), ('c', 30)]:
+        with open(name + '.hpp', 'w') as file:
+            file.write('#pragma once\n\nint {}();\n'.format(name))
+        with open(name + '.cpp', 'w') as file:
+            file.write('#include "{0}.hpp"\n#include "util.hpp"\n\n\nint {0}() {{ return 0; }} // {1}\n'
+                       .format(name, name * size))
+    with open('util.hpp', 'w') as file:
+        file.write(FILE_UTIL_HPP)
+    with open('util.cpp', 'w') as file:
+        file.write(FILE_UTIL_CPP)
+
+
+def amalgamate(shards: int, **kwargs):
+    dst = StringIO()
+    source_dsts = [StringIO() for _ in range(shards)]
+    Quom('main.hpp', dst, source_dsts=source_dsts, header_include='lib.hpp', **kwargs)
+    return dst.getvalue(), [source_dst.getvalue() for source_dst in source_dsts]
+
+
+def test_shards(fs):
+    init()
+
+    assert amalgamate(2) == (RESULT_HPP, [RESULT_0_CPP, RESULT_1_CPP])
+    assert amalgamate(2, hooks=Stats(), read_ahead=2) == (RESULT_HPP, [RESULT_0_CPP, RESULT_1_CPP])
+
+    header, sources = amalgamate(1)
+    assert header == RESULT_HPP
+    assert sources[0].count('int util();') == 1
+    assert sources[0].count('int util() { return 1; }') == 1
+
+    # Every source file is written exactly once.
+    header, sources = amalgamate(5)
+    assert sorted(source.count('return') for source in sources) == [0, 1, 1, 1, 1]
+
+
+def test_shards_without_header_include(fs):
+    init()
+
+    dst = StringIO()
+    source_dst = StringIO()
+    Quom('main.hpp', dst, source_dsts=[source_dst])
+    assert dst.getvalue() == RESULT_HPP
+    assert source_dst.getvalue().startswith('int util();\n\nint a()')
+
+
+def test_shards_with_stitch(fs):
+    init()
+
+    with pytest.raises(QuomError):
+        Quom('main.hpp', StringIO(), stitch_format='~> stitch <~', source_dsts=[StringIO()])
+
+
+def test_shards_cli(fs):
+    init()
+    Path('out').mkdir()
+
+    main(['main.hpp', 'out/lib.hpp', '--shards', '2'])
+    assert Path('out/lib.hpp').read_text() == RESULT_HPP
+    assert Path('out/lib_0.cpp').read_text() == RESULT_0_CPP
+    assert Path('out/lib_1.cpp').read_text() == RESULT_1_CPP
@@ -0,0 +1,152 @@
+from io import StringIO
+from pathlib import Path
+
+import pytest
+
+import quom
+from quom import Quom, QuomError, SourceMap
+from quom.__main__ import main
+from quom.incremental import OutputIndex
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "foo.hpp"
+#include <vector>
+
+int main();
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+#include <string>
+
+int foo();
+"""
+
+FILE_FOO_CPP = """\
+#include "foo.hpp"
+
+int foo() { return 0; }
+"""
+
+RESULT = """\
+#pragma once
+
+#include <string>
+
+int foo();
+
+#include <vector>
+
+int main();
+
+int foo() { return 0; }
+"""
+
+RESULT_LINE_DIRECTIVES = """\
+#line 1 "/main.hpp"
+#pragma once
+
+#line 2 "/foo.hpp"
+#include <string>
+
+int foo();
+
+#line 4 "/main.hpp"
+#include <vector>
+
+int main();
+
+#line 3 "/foo.cpp"
+int foo() { return 0; }
+"""
+
+RESULT_HOISTED = """\
+#pragma once
+#include <string>
+#include <vector>
+
+int foo();
+
+int main();
+
+int foo() { return 0; }
+"""
+
+
+def init():
+    for file_path, content in [('main.hpp', FILE_MAIN_HPP), ('foo.hpp', FILE_FOO_HPP), ('foo.cpp', FILE_FOO_CPP)]:
+        with open(file_path, 'w') as file:
+            file.write(content)
+
+
+def locations(source_map: SourceMap, lines: int):
+    return [source_map.locate(line) for line in range(1, lines + 1)]
+
+
+def test_source_map(fs):
+    init()
+
+    dst = StringIO()
+    source_map = SourceMap()
+    Quom('main.hpp', dst, source_map=source_map)
+    assert dst.getvalue() == RESULT
+
+    main_hpp, foo_hpp, foo_cpp = Path('/main.hpp'), Path('/foo.hpp'), Path('/foo.cpp')
+    expected = [(main_hpp, 1), (main_hpp, 2), (foo_hpp, 2), (foo_hpp, 3), (foo_hpp, 4), (foo_hpp, 5), (main_hpp, 4),
+                (main_hpp, 5), (main_hpp, 6), (main_hpp, 7), (foo_cpp, 3), (foo_cpp, 4)]
+    assert locations(source_map, 12) == expected
+    assert source_map.locate(0) is None
+
+    # The binary format keeps every entry.
+    loaded = SourceMap.from_bytes(source_map.to_bytes())
+    assert locations(loaded, 12) == expected
+    assert len(loaded) == len(source_map)
+
+    with pytest.raises(ValueError):
+        SourceMap.from_bytes(b'QMAX')
+
+
+def test_source_map_hoisted_includes(fs):
+    init()
+
+    dst = StringIO()
+    source_map = SourceMap()
+    Quom('main.hpp', dst, source_map=source_map, hoist_includes=True)
+    assert dst.getvalue() == RESULT_HOISTED
+
+    # The hoisted includes have no input line, the lines after them are shifted.
+    main_hpp, foo_hpp = Path('/main.hpp'), Path('/foo.hpp')
+    assert locations(source_map, 8) == [(main_hpp, 1), None, None, (main_hpp, 2), (foo_hpp, 4), (foo_hpp, 5),
+                                        (main_hpp, 6), (main_hpp, 7)]
+
+
+def test_line_directives(fs):
+    init()
+
+    dst = StringIO()
+    source_map = SourceMap()
+    Quom('main.hpp', dst, source_map=source_map, line_directives=True)
+    assert dst.getvalue() == RESULT_LINE_DIRECTIVES
+
+    # The directives themselves have no input line.
+    assert source_map.locate(1) is None
+    assert source_map.locate(2) == (Path('/main.hpp'), 1)
+    assert source_map.locate(5) == (Path('/foo.hpp'), 2)
+    assert source_map.locate(15) == (Path('/foo.cpp'), 3)
+
+    with pytest.raises(QuomError):
+        Quom('main.hpp', StringIO(), line_directives=True, index=OutputIndex())
+
+
+def test_main_source_map(fs):
+    init()
+
+    main(['main.hpp', 'result.hpp', '--source_map', 'result.hpp.qmap'])
+    assert Path('result.hpp').read_text() == RESULT
+    assert quom.locate('result.hpp.qmap', 3) == (Path('/foo.hpp'), 2)
+    assert quom.locate(Path('result.hpp.qmap'), 11) == (Path('/foo.cpp'), 3)
+
+    main(['main.hpp', 'result.hpp', '--line_directives'])
+    assert Path('result.hpp').read_text() == RESULT_LINE_DIRECTIVES
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+from quom.__main__ import main
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "foo.hpp"
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+
+#include "detail/bar.hpp"
+
+int foo();
+"""
+
+FILE_FOO_CPP = """\
+#include "foo.hpp"
+#include "detail/baz.hpp"
+
+int foo() { return bar() + baz(); }
+"""
+
+FILE_BAR_HPP = """\
+#pragma once
+
+inline int bar() { return 1; }
+"""
+
+FILE_BAZ_HPP = """\
+#pragma once
+
+inline int baz() { return 2; }
+"""
+
+RESULT_HPP = """\
+#pragma once
+
+inline int bar() { return 1; }
+
+int foo();
+"""
+
+RESULT_CPP = """\
+#include "../include/lib.hpp"
+
+inline int baz() { return 2; }
+
+int foo() { return bar() + baz(); }
+"""
+
+
+def init():
+    Path('detail').mkdir()
+    for file_path, content in [('main.hpp', FILE_MAIN_HPP), ('foo.hpp', FILE_FOO_HPP), ('foo.cpp', FILE_FOO_CPP),
+                               ('detail/bar.hpp', FILE_BAR_HPP), ('detail/baz.hpp', FILE_BAZ_HPP)]:
+        with open(file_path, 'w') as file:
+            file.write(content)
+    Path('include').mkdir()
+    Path('src').mkdir()
+
+
+def test_source_output(fs, capsys):
+    init()
+
+    main(['main.hpp', 'include/lib.hpp', '--source_output', 'src/lib.cpp', '--stats'])
+    assert Path('include/lib.hpp').read_text() == RESULT_HPP
+    assert Path('src/lib.cpp').read_text() == RESULT_CPP
+    # Every file is read and tokenized once for both outputs.
+    assert capsys.readouterr().err.startswith('Files: 5 processed')
+
+
+def test_source_output_shards(fs):
+    init()
+
+    main(['main.hpp', 'include/lib.hpp', '--source_output', 'src/lib.cpp', '--shards', '2'])
+    assert Path('include/lib.hpp').read_text() == RESULT_HPP
+    assert Path('src/lib_0.cpp').read_text() == RESULT_CPP
+    assert Path('src/lib_1.cpp').read_text() == '#include "../include/lib.hpp"\n'
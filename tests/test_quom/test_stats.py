@@ -0,0 +1,167 @@
+import json
+from io import StringIO
+from pathlib import Path
+
+from quom import Quom, QuomHooks, Stats
+from quom.__main__ import main
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "foo.hpp"
+#include "bar.hpp"
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+
+#include "bar.hpp"
+
+int foo();
+"""
+
+FILE_FOO_CPP = """\
+int foo() { return 42; }
+"""
+
+FILE_BAR_HPP = """\
+int bar();
+"""
+
+
+class RecordingHooks(QuomHooks):
+    def __init__(self):
+        self.events = []
+
+    def on_file_start(self, file_path):
+        self.events.append(('start', file_path.name))
+
+    def on_file_end(self, file_path, stats):
+        self.events.append(('end', file_path.name))
+
+    def on_include_resolved(self, include_path, file_path, including_file_path):
+        self.events.append(('resolved', str(include_path), including_file_path and including_file_path.name))
+
+
+def init():
+    with open('main.hpp', 'w+', encoding='utf-8') as file:
+        file.write(FILE_MAIN_HPP)
+
+    with open('foo.hpp', 'w+', encoding='utf-8') as file:
+        file.write(FILE_FOO_HPP)
+
+    with open('foo.cpp', 'w+', encoding='utf-8') as file:
+        file.write(FILE_FOO_CPP)
+
+    with open('bar.hpp', 'w+', encoding='utf-8') as file:
+        file.write(FILE_BAR_HPP)
+
+
+def test_hooks(fs):
+    init()
+
+    hooks = RecordingHooks()
+    Quom(Path('main.hpp'), StringIO(), hooks=hooks)
+
+    assert hooks.events == [
+        ('resolved', 'main.hpp', None), ('start', 'main.hpp'),
+        ('resolved', 'foo.hpp', 'main.hpp'), ('start', 'foo.hpp'),
+        ('resolved', 'bar.hpp', 'foo.hpp'), ('start', 'bar.hpp'), ('end', 'bar.hpp'),
+        ('end', 'foo.hpp'),
+        ('resolved', 'bar.hpp', 'main.hpp'),
+        ('end', 'main.hpp'),
+        ('resolved', '/foo.cpp', None), ('start', 'foo.cpp'), ('end', 'foo.cpp')]
+
+
+def test_stats(fs):
+    init()
+
+    dst = StringIO()
+    stats = Stats()
+    Quom(Path('main.hpp'), dst, hooks=stats)
+
+    files = {file.file_path.name: file for file in stats.files}
+    assert list(files) == ['bar.hpp', 'foo.hpp', 'main.hpp', 'foo.cpp']
+    assert stats.hits == 1
+    assert stats.misses == 4
+
+    assert files['bar.hpp'].verbatim
+    assert not files['foo.hpp'].verbatim
+    assert files['foo.hpp'].token_counts['PreprocessorIncludeToken'] == 1
+    assert files['main.hpp'].chars_in == len(FILE_MAIN_HPP)
+
+    # Output of included files is only part of the subtree.
+    assert files['bar.hpp'].chars_out == len(FILE_BAR_HPP)
+    assert files['foo.hpp'].subtree_chars_out == files['foo.hpp'].chars_out + files['bar.hpp'].chars_out
+    assert files['main.hpp'].subtree_chars_out + files['foo.cpp'].chars_out == len(dst.getvalue())
+
+    for file in stats.files:
+        assert file.start <= file.end
+        assert file.time <= file.end - file.start
+
+    summary = StringIO()
+    stats.write_summary(summary, 2)
+    assert 'Files: 4 processed (2 verbatim), 1 already processed' in summary.getvalue()
+    assert len(summary.getvalue().splitlines()) == 4 + 2 + 2
+
+    trace = StringIO()
+    stats.write_trace(trace)
+    events = json.loads(trace.getvalue())['traceEvents']
+    assert [event['name'] for event in events if event['cat'] == 'file'] == [str(file.file_path)
+                                                                             for file in stats.files]
+    assert len(events) == 5 * len(stats.files)
+
+
+def test_main_stats(fs, capsys):
+    init()
+
+    main(['main.hpp', 'result.hpp', '--stats', '--trace', 'trace.json'])
+
+    assert 'Slowest files:' in capsys.readouterr().err
+    assert json.loads(Path('trace.json').read_text())['traceEvents']
+
+    Path('result.hpp').unlink()
+    main(['--stats', '--stats_top', '1', 'main.hpp', 'result.hpp'])
+
+    assert len(capsys.readouterr().err.split('Slowest files:\n')[1].splitlines()) == 2
+    assert Path('result.hpp').exists()
+
+
+def test_report(fs):
+    init()
+    with open('bar.hpp', 'w+', encoding='utf-8') as file:
+        file.write('// B\xe4r\nint bar();\n')
+
+    dst = StringIO()
+    stats = Stats()
+    Quom(Path('main.hpp'), dst, hooks=stats)
+
+    report = stats.report()
+    assert report['chars_out'] == len(dst.getvalue())
+    assert report['bytes_out'] == len(dst.getvalue().encode('utf-8'))
+    assert report['lines_out'] == dst.getvalue().count('\n')
+    files = {Path(file['file_path']).name: file for file in report['files']}
+    assert [Path(file['file_path']).name for file in report['files']] == ['foo.cpp', 'bar.hpp', 'main.hpp',
+                                                                          'foo.hpp']
+    assert files['bar.hpp']['chars_out_by_kind'] == {'code': 9, 'comment': 6, 'whitespace': 3}
+    assert files['bar.hpp']['include_chain'] == [str(Path('main.hpp').resolve()), str(Path('foo.hpp').resolve())]
+    assert files['foo.hpp']['lines_out'] == 2
+    assert files['foo.hpp']['subtree_lines_out'] == 4
+    assert (files['bar.hpp']['bytes_out'], files['bar.hpp']['chars_out']) == (19, 18)
+    assert files['foo.hpp']['subtree_bytes_out'] == files['foo.hpp']['bytes_out'] + 19
+    for file in report['files']:
+        assert sum(file['chars_out_by_kind'].values()) == file['chars_out']
+
+    output = StringIO()
+    stats.write_report(output, 2)
+    assert len(output.getvalue().splitlines()) == 1 + 2 + 1 + 1
+    assert 'via main.hpp > foo.hpp' in output.getvalue()
+
+
+def test_main_report(fs, capsys):
+    init()
+
+    main(['main.hpp', 'result.hpp', '--report', 'report.json'])
+
+    assert 'bytes out' in capsys.readouterr().err
+    assert len(json.loads(Path('report.json').read_text())['files']) == 4
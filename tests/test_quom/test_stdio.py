@@ -0,0 +1,120 @@
+import io
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from quom import QuomError
+from quom.__main__ import main
+from quom.stream import CHUNK_SIZE, StreamWriter
+
+FILE_MAIN_HPP = """\
+#pragma once\r
+\r
+#include "foo.hpp"\r
+\r
+int main();\r
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+
+int foo();
+"""
+
+FILE_FOO_CPP = """\
+#include "foo.hpp"
+
+int foo() { return 0; }
+"""
+
+RESULT = """\
+#pragma once
+
+int foo();
+
+int main();
+
+int foo() { return 0; }
+"""
+
+
+class Stream(io.TextIOWrapper):
+    # Text stream over bytes, which counts the flushes of its buffer.
+    def __init__(self, data: bytes = b''):
+        super().__init__(io.BytesIO(data), encoding='utf-8')
+        self.flushes = 0
+
+    def flush(self):
+        super().flush()
+        self.flushes += 1
+
+    def value(self) -> bytes:
+        self.flush()
+        return self.buffer.getvalue()
+
+
+def init():
+    os.mkdir('lib')
+    for file_path, content in [('lib/main.hpp', FILE_MAIN_HPP), ('lib/foo.hpp', FILE_FOO_HPP),
+                               ('lib/foo.cpp', FILE_FOO_CPP)]:
+        with open(file_path, 'w', newline='') as file:
+            file.write(content)
+
+
+def test_stdout(fs, monkeypatch):
+    init()
+    stdout = Stream()
+    monkeypatch.setattr(sys, 'stdout', stdout)
+
+    main(['lib/main.hpp', '-'])
+    assert stdout.value() == RESULT.encode()
+    assert not Path('-').exists()
+
+
+def test_stdin(fs, monkeypatch):
+    init()
+    monkeypatch.setattr(sys, 'stdin', Stream(FILE_MAIN_HPP.encode()))
+    stdout = Stream()
+    monkeypatch.setattr(sys, 'stdout', stdout)
+
+    # The includes of the main file are resolved against the base directory.
+    main(['-', '-', '--base_dir', 'lib'])
+    assert stdout.value() == RESULT.encode()
+
+    monkeypatch.setattr(sys, 'stdin', Stream(FILE_MAIN_HPP.encode()))
+    main(['-', 'result.hpp', '--base_dir', 'lib'])
+    assert Path('result.hpp').read_text() == RESULT
+
+    # Without it, the includes are not found.
+    monkeypatch.setattr(sys, 'stdin', Stream(FILE_MAIN_HPP.encode()))
+    with pytest.raises(QuomError):
+        main(['-', 'result.hpp'])
+
+
+def test_stdout_unsupported(fs):
+    init()
+
+    with pytest.raises(QuomError):
+        main(['lib/main.hpp', '-', '--source_output', 'result.cpp'])
+    with pytest.raises(QuomError):
+        main(['lib/main.hpp', '-', '--incremental'])
+    with pytest.raises(QuomError):
+        main(['lib/main.hpp', '-', '--compress', 'gzip'])
+
+
+def test_stream_writer():
+    stream = Stream()
+    writer = StreamWriter(stream, 'latin-1')
+
+    # Written in chunks, the rest on close.
+    writer.write('\xe4' * (CHUNK_SIZE - 1))
+    assert stream.flushes == 0
+    writer.write('\xe4\xe4')
+    assert stream.flushes == 1
+    assert len(stream.buffer.getvalue()) == CHUNK_SIZE + 1
+    writer.write('a')
+    writer.close()
+    assert stream.value() == b'\xe4' * (CHUNK_SIZE + 1) + b'a'
+    assert not stream.closed
@@ -0,0 +1,102 @@
+from io import StringIO
+
+from quom import Quom, Stats
+from quom.tokenizer import RemainingToken, StartToken
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "foo.hpp"
+
+namespace lib {
+LIB_EXPORT int main_function();
+}
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+
+namespace lib {
+LIB_EXPORT int foo();
+}
+"""
+
+RESULT = """\
+#pragma once
+
+// foo.hpp
+
+namespace lib_v2 {
+ int foo();
+}
+
+namespace lib_v2 {
+ int main_function();
+}"""
+
+
+def init():
+    with open('main.hpp', 'w') as file:
+        file.write(FILE_MAIN_HPP)
+    with open('foo.hpp', 'w') as file:
+        file.write(FILE_FOO_HPP)
+
+
+def rename_namespace(file_path, token):
+    if isinstance(token, RemainingToken) and str(token) == 'lib':
+        yield 'lib_v2'
+    else:
+        yield token
+
+
+def strip_export(file_path, token):
+    if not isinstance(token, RemainingToken) or str(token) != 'LIB_EXPORT':
+        yield token
+
+
+class FileComment:
+    def __init__(self, names):
+        self.names = names
+
+    def __call__(self, file_path, token):
+        if isinstance(token, StartToken) and file_path.name in self.names:
+            yield '// {}\n'.format(file_path.name)
+        yield token
+
+
+def test_transform(fs):
+    init()
+
+    dst = StringIO()
+    Quom('main.hpp', dst, transforms=[rename_namespace, strip_export, FileComment(['foo.hpp'])])
+    assert dst.getvalue() == RESULT
+
+
+def test_transform_yielding_include(fs):
+    init()
+    with open('bar.hpp', 'w') as file:
+        file.write('int bar();\n')
+
+    def add_include(file_path, token):
+        yield token
+        if isinstance(token, StartToken) and file_path.name == 'foo.hpp':
+            yield '#include "bar.hpp"\n'
+
+    dst = StringIO()
+    Quom('main.hpp', dst, transforms=[add_include])
+    assert dst.getvalue().startswith('#pragma once\n\nint bar();\n\nnamespace lib {\n')
+
+
+def test_transform_stats(fs):
+    init()
+
+    stats = Stats()
+    Quom('main.hpp', StringIO(), hooks=stats, transforms=[rename_namespace, strip_export])
+
+    for file in stats.files:
+        assert list(file.transform_times) == ['rename_namespace', 'strip_export']
+        assert file.time <= file.end - file.start
+
+    summary = StringIO()
+    stats.write_summary(summary)
+    assert 'Transforms: ' in summary.getvalue()
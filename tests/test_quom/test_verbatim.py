@@ -0,0 +1,182 @@
+from io import StringIO
+from pathlib import Path
+
+from quom import Quom, QuomError
+from quom.quom import can_copy_verbatim
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "plain.hpp"
+
+
+#include "directive.hpp"
+int main();
+"""
+
+FILE_PLAIN_HPP = """\
+
+
+
+// Doesn't need tokenizing.
+int a = 1'000;
+
+
+
+char c = '"';
+
+
+"""
+
+FILE_PLAIN_CPP = """\
+
+
+
+int b = 2;
+
+
+
+# pragma warning
+"""
+
+FILE_DIRECTIVE_HPP = """\
+#include <vector>
+
+
+
+#if defined(X)
+#define STR(x) #x
+#endif
+
+
+"""
+
+RESULT = """\
+#pragma once
+
+// Doesn't need tokenizing.
+int a = 1'000;
+
+char c = '"';
+
+#include <vector>
+
+#if defined(X)
+#define STR(x) #x
+#endif
+
+int main();
+
+int b = 2;
+
+# pragma warning
+"""
+
+RESULT_WITHOUT_TRIM = """\
+#pragma once
+
+
+
+
+// Doesn't need tokenizing.
+int a = 1'000;
+
+
+
+char c = '"';
+
+
+
+
+
+#include <vector>
+
+
+
+#if defined(X)
+#define STR(x) #x
+#endif
+
+
+
+int main();
+
+
+
+int b = 2;
+
+
+
+# pragma warning
+"""
+
+
+def init():
+    with open('main.hpp', 'w+', encoding='utf-8') as file:
+        file.write(FILE_MAIN_HPP)
+
+    with open('plain.hpp', 'w+', encoding='utf-8') as file:
+        file.write(FILE_PLAIN_HPP)
+
+    with open('plain.cpp', 'w+', encoding='utf-8') as file:
+        file.write(FILE_PLAIN_CPP)
+
+    with open('directive.hpp', 'w+', encoding='utf-8') as file:
+        file.write(FILE_DIRECTIVE_HPP)
+
+
+def test_verbatim(fs):
+    init()
+
+    dst = StringIO()
+    Quom(Path('main.hpp'), dst)
+
+    assert dst.getvalue() == RESULT
+
+
+def test_verbatim_without_trim(fs):
+    init()
+
+    dst = StringIO()
+    Quom(Path('main.hpp'), dst, trim=False)
+
+    assert dst.getvalue() == RESULT_WITHOUT_TRIM
+
+
+def test_can_copy_verbatim():
+    assert can_copy_verbatim('int a;\n', None, False)
+    assert can_copy_verbatim('#include <vector>\n', None, False)
+    assert can_copy_verbatim('#ifndef A\n', None, False)
+
+    assert not can_copy_verbatim('#pragma once\n', None, False)
+    assert not can_copy_verbatim('#include "a.hpp"\n', None, False)
+    assert not can_copy_verbatim('#ifndef A\n', None, True)
+    assert not can_copy_verbatim('// ~> stitch <~\n', '~> stitch <~', False)
+    assert not can_copy_verbatim('/* a */', None, False)
+    assert not can_copy_verbatim('R"(a)"', None, False)
+    assert not can_copy_verbatim('a \\\nb', None, False)
+    assert not can_copy_verbatim('"a\nb"', None, False)
+    assert not can_copy_verbatim("'", None, False)
+    assert not can_copy_verbatim('#pragma#define A "q"#endif', None, False)
+    assert not can_copy_verbatim("#pragma'c'\n", None, False)
+
+
+def test_verbatim_equivalence(fs):
+    # The verbatim copy gives the same output as the tokenizer (a transform forces the file to be tokenized).
+    def identity(file_path, token):
+        yield token
+
+    for content in ('#pragma#define A "q"#endif', '#pragma#define A "q"#endif\n', "#pragma'c'\n", '#include<a>\n',
+                    '#  define A 1 // a\nint a;\n', '#pragma once\nint a;\n'):
+        with open('main.hpp', 'w') as file:
+            file.write(content)
+
+        results = []
+        for transforms in (None, [identity]):
+            dst = StringIO()
+            try:
+                Quom('main.hpp', dst, transforms=transforms)
+                results.append(dst.getvalue())
+            except QuomError as error:
+                results.append(type(error))
+        assert results[0] == results[1], content
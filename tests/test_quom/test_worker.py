@@ -0,0 +1,130 @@
+import json
+from io import StringIO
+from pathlib import Path
+
+from quom import FileCache, Quom
+from quom.__main__ import worker
+
+FILE_MAIN_HPP = """\
+#pragma once
+
+#include "foo.hpp"
+
+int main_value = FOO;
+"""
+
+FILE_FOO_HPP = """\
+#pragma once
+
+#define FOO 42
+"""
+
+RESULT = """\
+#pragma once
+
+#define FOO 42
+
+int main_value = FOO;"""
+
+RESULT_CHANGED = """\
+#pragma once
+
+#define FOO 1337
+
+int main_value = FOO;"""
+
+
+def init():
+    with open('main.hpp', 'w') as file:
+        file.write(FILE_MAIN_HPP)
+    with open('foo.hpp', 'w') as file:
+        file.write(FILE_FOO_HPP)
+
+
+def run_worker(*requests):
+    stdout = StringIO()
+    worker(StringIO(''.join(json.dumps(request) + '\n' if isinstance(request, dict) else request
+                            for request in requests)), stdout)
+    return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+def test_file_cache(fs):
+    init()
+    cache = FileCache()
+
+    for _ in range(2):
+        dst = StringIO()
+        Quom('main.hpp', dst, cache=cache)
+        assert dst.getvalue() == RESULT
+    assert cache.misses == 2
+    assert cache.hits == 2
+
+    src = cache.read_text(Path('main.hpp').resolve(), 'utf-8')
+    assert cache.tokenize(Path('main.hpp').resolve(), src) is cache.tokenize(Path('main.hpp').resolve(), src)
+
+    with open('foo.hpp', 'w') as file:
+        file.write(FILE_FOO_HPP.replace('42', '1337'))
+    dst = StringIO()
+    Quom('main.hpp', dst, cache=cache)
+    assert dst.getvalue() == RESULT_CHANGED
+    assert cache.misses == 3
+
+
+def test_file_cache_resolve(fs):
+    init()
+    cache = FileCache()
+
+    assert cache.resolve(Path('main.hpp')) == Path('main.hpp').resolve()
+    assert cache.resolve(Path('main.hpp')) == Path('main.hpp').resolve()
+    assert cache.resolve(Path('missing.hpp')) is None
+
+    Path('main.hpp').unlink()
+    assert cache.resolve(Path('main.hpp')) is None
+
+    cache.clear()
+    assert cache.resolve(Path('foo.hpp')) == Path('foo.hpp').resolve()
+
+
+def test_file_cache_eviction(fs):
+    init()
+    cache = FileCache(max_files=1)
+    main_path = Path('main.hpp').resolve()
+
+    cache.read_text(main_path, 'utf-8')
+    cache.read_text(main_path, 'utf-8')
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # The least recently used file is dropped.
+    cache.read_text(Path('foo.hpp').resolve(), 'utf-8')
+    cache.read_text(main_path, 'utf-8')
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_worker(fs):
+    init()
+
+    responses = run_worker({'arguments': ['main.hpp', 'result.hpp'], 'requestId': 1},
+                           {'arguments': ['main.hpp', 'result2.hpp'], 'requestId': 2})
+    assert [response['exitCode'] for response in responses] == [0, 0]
+    assert [response['requestId'] for response in responses] == [1, 2]
+    assert responses[0]['output'] == ''
+    assert sorted(responses[0]['inputs']) == [str(Path('foo.hpp').resolve()), str(Path('main.hpp').resolve())]
+    assert Path('result.hpp').read_text() == RESULT
+    assert Path('result2.hpp').read_text() == RESULT
+
+
+def test_worker_errors(fs):
+    init()
+
+    responses = run_worker('\n', 'no json\n', '[]\n', {'arguments': ['missing.hpp', 'result.hpp'], 'requestId': 1},
+                           {'arguments': ['--unknown']}, {'arguments': ['--version']},
+                           {'arguments': ['main.hpp', 'result.hpp', '--stats']})
+    assert [response['exitCode'] for response in responses] == [1, 1, 1, 2, 0, 0]
+    assert responses[0]['output'].startswith('quom: error: ')
+    assert responses[1]['output'] == 'quom: error: Request must be a JSON object.\n'
+    assert responses[2]['output'] == 'quom: error: Include not found: "missing.hpp"\n'
+    assert responses[2]['requestId'] == 1
+    assert 'usage: quom' in responses[3]['output']
+    assert responses[4]['output'].startswith('quom ')
+    assert responses[5]['output'].startswith('Files: 2 processed')
+    assert Path('result.hpp').read_text() == RESULT
@@ -0,0 +1,67 @@
+import subprocess
+import sys
+
+import pytest
+
+import quom
+from benchmarks.startup import import_times, quom_import_time
+from quom.__main__ import main
+
+
+def imported_modules(args):
+    return {name for name, _, _ in import_times(args)}
+
+
+def test_import_is_lazy():
+    modules = imported_modules(['-c', 'import quom'])
+    assert 'quom' in modules
+    assert not {'quom.quom', 'quom.tokenizer', 'quom.stats', 'importlib.metadata', 'queue'} & modules
+
+
+def test_version_is_lazy(capsys):
+    modules = imported_modules(['-m', 'quom', '--version'])
+    assert 'importlib.metadata' in modules
+    assert not {'quom.quom', 'quom.tokenizer', 'quom.stats'} & modules
+
+    with pytest.raises(SystemExit):
+        main(['--version'])
+    assert capsys.readouterr().out == 'quom {}\n'.format(quom.__version__)
+
+
+def test_import_time():
+    times = import_times(['-c', 'from quom import Quom'])
+    assert {'quom', 'quom.quom', 'quom.tokenizer.tokenize'} <= {name for name, _, _ in times}
+    assert quom_import_time(times) > 0
+
+
+def test_lazy_attributes():
+    from quom.tokenizer import tokenize, Token
+
+    assert quom.Quom is quom.quom.Quom
+    assert quom.tokenizer.Token is Token
+    assert callable(tokenize)
+    assert {'Quom', 'QuomError', 'Stats', 'tokenizer', '__version__'} <= set(dir(quom))
+    assert 'PreprocessorIncludeToken' in dir(quom.tokenizer)
+
+    with pytest.raises(AttributeError):
+        quom.Missing
+    with pytest.raises(AttributeError):
+        quom.tokenizer.Missing
+
+
+def test_star_import():
+    namespace = {}
+    exec('from quom import *', namespace)
+    assert {'Quom', 'QuomError', 'Stats', 'tokenizer'} <= set(namespace)
+
+    namespace = {}
+    exec('from quom.tokenizer import *', namespace)
+    assert {'tokenize', 'Token', 'PreprocessorIncludeToken'} <= set(namespace)
+    assert callable(namespace['tokenize'])
+
+
+def test_tokenize_submodule():
+    # The submodule of the same name does not replace the function, also if it is imported first.
+    code = 'import quom.tokenizer.tokenize; from quom.tokenizer import tokenize; print(callable(tokenize))'
+    result = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    assert result.stdout == 'True\n'
@@ -6,7 +6,7 @@ from quom.tokenizer import CommentToken, CppCommentToken, CCommentToken, NumberT
     PreprocessorIncludeToken, PreprocessorUnknownIncludeToken, QuoteToken, SingleQuoteToken, DoubleQuoteToken, \
     RemainingToken, WhitespaceToken, WhitespaceWhitespaceToken, LinebreakWhitespaceToken, PreprocessorPragmaToken, \
     PreprocessorPragmaOnceToken, PreprocessorDefineToken, PreprocessorIfNotDefinedToken, PreprocessorEndIfToken, \
-    tokenize, TokenizeError, Token, StartToken, EndToken
+    PreprocessorEmbedToken, tokenize, TokenizeError, Token, StartToken, EndToken
 
 
 def check_tokens(tokens: List[Token], res):
@@ -157,6 +157,12 @@ def test_quote_double():
     check_tokens(tokens, [RemainingToken, DoubleQuoteToken])
     assert tokens[2].is_raw_encoding
 
+    tokens = tokenize('R"()" R"x()x"')
+    check_tokens(tokens, [RemainingToken, DoubleQuoteToken, WhitespaceWhitespaceToken, RemainingToken,
+                          DoubleQuoteToken])
+    assert str(tokens[2]) == '"()"'
+    assert str(tokens[5]) == '"x()x"'
+
     tokens = tokenize('u8R"(abc)"')
     check_tokens(tokens, [RemainingToken, DoubleQuoteToken])
     assert tokens[2].is_raw_encoding
@@ -376,6 +382,16 @@ def test_preprocessor():
     tokens = tokenize('#include ')
     check_tokens(tokens, [PreprocessorUnknownIncludeToken])
 
+    tokens = tokenize('#embed <a b.bin> limit(4)')
+    check_tokens(tokens, [PreprocessorEmbedToken])
+    assert str(tokens[1].path) == 'a b.bin'
+    assert not tokens[1].is_local_embed
+    assert ''.join(str(token) for token in tokens[1].parameters) == ' limit(4)'
+
+    tokens = tokenize('#embed RESOURCE')
+    check_tokens(tokens, [PreprocessorToken])
+    assert not isinstance(tokens[1], PreprocessorEmbedToken)
+
     tokens = tokenize('#define')
     check_tokens(tokens, [PreprocessorDefineToken])
 
@@ -410,6 +426,15 @@ def test_preprocessor():
     assert isinstance(tokens[1].preprocessor_arguments[1], CCommentToken)
 
 
+def test_preprocessor_name():
+    assert tokenize('#endif /*asd*/')[1].preprocessor_name == 'endif'
+    assert tokenize('# /* abc */ define X')[1].preprocessor_name == 'define'
+    assert tokenize('#  elif X')[1].preprocessor_name == 'elif'
+    assert tokenize('#include <vector>')[1].preprocessor_name == 'include'
+    assert tokenize('#\n')[1].preprocessor_name == ''
+    assert tokenize('#')[1].preprocessor_name == ''
+
+
 def test_remaining():
     tokens = tokenize('abc')
     check_tokens(tokens, [RemainingToken])